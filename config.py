@@ -8,8 +8,112 @@ INPUT_DIR = PDF_DATA_PATH / "input"
 OUTPUT_DIR = PDF_DATA_PATH / "output"
 LOG_PATH = PDF_DATA_PATH / "logs" / "metadata_log.csv"
 LOOKUPS_PATH = PDF_DATA_PATH / "lookups"
+CACHE_DIR = PDF_DATA_PATH / "cache"
 
 # Paths for evaluation
 EVALUATION_DIR = PDF_DATA_PATH / "evaluation"
 GOLD_FILES_DIR = PDF_DATA_PATH / "gold_files"
-GOLD_METADATA_PATH = LOOKUPS_PATH / "clean_metadata.csv"
\ No newline at end of file
+GOLD_METADATA_PATH = LOOKUPS_PATH / "clean_metadata.csv"
+
+# Staged pipeline (main.py): extract -> llm -> classify -> dedup -> organize.
+# Files are processed one at a time unless a stage has more than one worker.
+WORKERS = 1              # LLM stage workers
+EXTRACT_WORKERS = 1      # PDF text extraction stage workers
+CLASSIFY_WORKERS = 1     # document type classification stage workers
+PIPELINE_QUEUE_SIZE = 8  # capacity of each queue between stages
+
+# PDF text extraction process pool (utils/loader.py). None = one process per CPU core, 1 = in-process.
+EXTRACT_PROCESSES = None
+
+# Persistent cache of extracted page text, keyed by PDF content hash (utils/loader.py)
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_PATH = CACHE_DIR / "page_text.sqlite"
+PAGE_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Text budget of the extraction stage: pages are parsed only until the cleaned text reaches this
+# many characters (at most 8 pages). None = always the first 8 pages.
+EXTRACT_MAX_CHARS = 20000
+
+# OCR fallback for scanned pages without a text layer (utils/loader.py), through PyMuPDF's Tesseract support.
+# Needs Tesseract installed (TESSDATA_PREFIX); results are cached by the hash of the rendered page image
+OCR_ENABLED = False
+OCR_LANGUAGE = "eng"
+OCR_DPI = 300
+OCR_CACHE_ENABLED = True
+OCR_CACHE_PATH = CACHE_DIR / "ocr_text.sqlite"
+OCR_CACHE_MAX_BYTES = 1024 ** 3
+
+# Persistent MinHash LSH index of organized documents, used to pick duplicate candidates (utils/dedup_index.py).
+# Its exact-hash registry is used even when DEDUP_INDEX_ENABLED is off, which only turns candidate selection off
+DEDUP_INDEX_ENABLED = True
+DEDUP_INDEX_PATH = CACHE_DIR / "dedup_index.sqlite"
+# Candidate cutoffs: lower similarity / more candidates find more OCR-noisy duplicates at the cost of more comparisons.
+# Sites with fewer indexed documents than DEDUP_INDEX_FULL_SCAN_BELOW are compared against every file
+DEDUP_INDEX_MIN_SIMILARITY = 0.3
+DEDUP_INDEX_MAX_CANDIDATES = 10
+DEDUP_INDEX_FULL_SCAN_BELOW = 20
+
+# Persistent LLM response cache keyed by model, prompt and generation options (utils/llm_interface.py)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH = CACHE_DIR / "llm_responses.sqlite"
+LLM_CACHE_MAX_BYTES = 512 * 1024 ** 2
+
+# Estimated token budget for the document text in each LLM prompt; longer documents are cut down to the
+# spans with the most field cues (To:, From:, Re:, Site ID, addresses) instead of their first 3000 characters
+LLM_CONTEXT_TOKENS = 1000
+
+# Rule-based pre-extraction (utils/metadata_rules.py): fields read from literal labels ("Site ID:", "Re:", "To:",
+# "From:", "located at") with at least this confidence are not asked of the LLM; with all filled, the LLM is skipped
+RULES_ENABLED = True
+RULES_MIN_CONFIDENCE = 0.8
+
+# Field validation (utils/field_verifier.py): every word of an extracted field must occur in the document text.
+# With fuzzy matching, a word of 4+ letters also matches a document word with this RapidFuzz ratio (0-100),
+# so fields whose words carry OCR errors are not re-prompted
+FIELD_FUZZY_MATCH = False
+FIELD_FUZZY_THRESHOLD = 90
+
+# Readability triage (utils/triage.py): documents classed as image-only (scans without a text layer) or garbled
+# (OCR noise) from PyMuPDF page metadata and text statistics are flagged for review without an LLM call
+TRIAGE_ENABLED = True
+
+# LLM model cascade, cheapest first: an answer is escalated to the next model only if it fails validation.
+# The last model is used for retries and for any query that names no model; e.g. ["llama3.2:3b", "mistral"]
+LLM_MODELS = ["mistral"]
+
+# Ask Ollama for JSON constrained to the metadata schema (needs Ollama 0.5+); False sends the prompt unconstrained
+LLM_STRUCTURED_OUTPUT = True
+
+# "combined": re-prompt all invalid fields in one request per attempt; "concurrent": each field's own re-prompt
+# loop, all fields at once (ollama.AsyncClient); "per_field": one retry loop per field, one after another
+REPROMPT_MODE = "combined"
+
+# LLM retry policy (utils/retry_policy.py): limits per retry loop, per document and per run (None = no limit),
+# a per-document deadline in seconds, and the temperature/seed schedule that makes each retry a new sample
+LLM_MAX_RETRIES = 5
+LLM_MAX_CALLS_PER_DOCUMENT = 12
+LLM_MAX_CALLS_PER_RUN = None
+LLM_DOCUMENT_DEADLINE = 300
+LLM_RETRY_TEMPERATURE = 0.4
+LLM_RETRY_TEMPERATURE_STEP = 0.2
+LLM_RETRY_SEED = 0
+
+# Ollama session (utils/llm_interface.py): server addresses (empty = OLLAMA_HOST environment variable or localhost),
+# how long models stay loaded between requests, model warm-up at startup, request timeout in seconds, and the
+# per-host circuit breaker that skips a host after LLM_BREAKER_FAILURES consecutive server errors for LLM_BREAKER_RESET
+# seconds. Requests go to the host with the fewest in flight, at most LLM_HOST_MAX_CONCURRENCY per host (None = no
+# limit; match the servers' OLLAMA_NUM_PARALLEL), and fail over to another host on errors.
+# e.g. ["http://10.0.0.11:11434", "http://10.0.0.12:11434"]; raise WORKERS to keep every host busy.
+OLLAMA_HOSTS = []
+LLM_HOST_MAX_CONCURRENCY = 2
+
+# Per-call prompt/generated token counts and durations reported by Ollama (utils/llm_interface.py); None = off
+LLM_USAGE_LOG_PATH = PDF_DATA_PATH / "logs" / "llm_usage.csv"
+LLM_KEEP_ALIVE = "30m"
+LLM_WARM_UP = True
+LLM_TIMEOUT = 300
+LLM_BREAKER_FAILURES = 3
+LLM_BREAKER_RESET = 30
+
+# Skip the online duplicate check and reconcile duplicate clusters after the run (utils/batch_dedup.py)
+DEDUP_BATCH = False
@@ -0,0 +1,67 @@
+from pathlib import Path
+from utils.batch_dedup import reconcile_duplicates
+from utils.loader import open_page_cache, close_page_cache, open_ocr, close_ocr
+from utils.metadata_extractor import open_dedup_index, close_dedup_index
+import config
+import argparse
+
+
+def main(log_path=None, rouge_th=0.75, rapid_th=78.0, min_containment=0.5):
+    """
+    Reconciles duplicate clusters across the organized output listed in the metadata log.
+
+    Intended for runs made with `main.py --dedup-batch`. On output already checked online it
+    only adds duplicates that the order-dependent check missed.
+
+    Parameters:
+    ----------
+    log_path : str or Path, optional
+        Metadata log to reconcile (default is `config.LOG_PATH`).
+    rouge_th : float
+        ROUGE-1 recall threshold (default is 0.75).
+    rapid_th : float
+        RapidFuzz token-sort ratio threshold (default is 78.0).
+    min_containment : float
+        Minimum distinct-token containment for a pair to be scored (default is 0.5).
+
+    Returns:
+    -------
+    None
+    """
+    log_path = Path(log_path) if log_path else config.LOG_PATH
+    if not log_path.exists():
+        print(f"[ERROR] Metadata log not found: {log_path}")
+        return
+
+    if config.PAGE_CACHE_ENABLED:
+        open_page_cache(config.PAGE_CACHE_PATH, config.PAGE_CACHE_MAX_BYTES)
+    if config.OCR_ENABLED:
+        open_ocr(config.OCR_LANGUAGE, config.OCR_DPI,
+                 config.OCR_CACHE_PATH if config.OCR_CACHE_ENABLED else None, config.OCR_CACHE_MAX_BYTES)
+    open_dedup_index(config.DEDUP_INDEX_PATH, config.DEDUP_INDEX_MIN_SIMILARITY,
+                     config.DEDUP_INDEX_MAX_CANDIDATES, config.DEDUP_INDEX_FULL_SCAN_BELOW,
+                     candidates=config.DEDUP_INDEX_ENABLED)
+    try:
+        reconcile_duplicates(log_path, config.OUTPUT_DIR, rouge_th=rouge_th, rapid_th=rapid_th, min_containment=min_containment)
+    finally:
+        close_page_cache()
+        close_ocr()
+        close_dedup_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Duplicate detection over already organized documents: clusters duplicates per site and "
+                    "applies -DUP renames and log updates in one pass.")
+    parser.add_argument('--log-path', default=None,
+                        help="Metadata log to reconcile (default: config.LOG_PATH)")
+    parser.add_argument('--rouge-th', type=float, default=0.75,
+                        help="ROUGE-1 recall threshold (default: %(default)s)")
+    parser.add_argument('--rapid-th', type=float, default=78.0,
+                        help="RapidFuzz token-sort ratio threshold (default: %(default)s)")
+    parser.add_argument('--min-containment', type=float, default=0.5,
+                        help="Minimum distinct-token containment for a pair to be scored (default: %(default)s)")
+    args = parser.parse_args()
+
+    main(log_path=args.log_path, rouge_th=args.rouge_th, rapid_th=args.rapid_th,
+         min_containment=args.min_containment)
@@ -3,8 +3,8 @@ import pandas as pd
 from sklearn.metrics import f1_score, precision_score, recall_score
 from pathlib import Path
 from config import INPUT_DIR, OUTPUT_DIR, LOG_PATH, GOLD_FILES_DIR, GOLD_METADATA_PATH, EVALUATION_DIR
-from main import main
-from rouge_score import rouge_scorer
+from main import main, default_options
+from utils.rouge_engine import rouge1_recall_text
 import os
 from utils.checks import verify_required_dirs, verify_required_files
 from utils.gold_data_extraction import loading_gold_metadata_csv
@@ -139,7 +139,7 @@ def load_evaluation_dataframe(gold_metadata_path=config.GOLD_METADATA_PATH):
     # Normalize Duplicate_pred from prediction strings to 'yes'/'no'
     merged_df["Duplicate_pred"] = merged_df["Duplicate_pred"].astype(str).str.strip().str.lower().map(
         lambda x: "yes" if x in ["contained",
-                                 "likely_duplicate_ocr", "yes"] else "no"
+                                 "likely_duplicate_ocr", "exact", "yes"] else "no"
     )
 
     # Normalize Site_Registry_Releaseable columns
@@ -166,18 +166,19 @@ def load_evaluation_dataframe(gold_metadata_path=config.GOLD_METADATA_PATH):
     return merged_df
 
 
-def compute_row_rouge_recalls(row, col_pairs, scorer):
+def compute_row_rouge_recalls(row, col_pairs):
     """
     Calculates ROUGE-1 recall for each (gold, pred) text column pair in a row.
 
+    Uses `utils.rouge_engine`, which matches `RougeScorer(['rouge1'], use_stemmer=True)` exactly
+    while caching stemming across rows.
+
     Parameters:
     ----------
     row : pandas.Series
         A single row from a DataFrame, containing gold and predicted text columns.
     col_pairs : list of tuple(str, str)
         List of tuples, where each tuple is (gold_column_name, pred_column_name).
-    scorer : rouge_score.rouge_scorer.RougeScorer
-        A ROUGE scorer instance, typically initialized with `use_stemmer=True`.
 
     Returns:
     -------
@@ -188,7 +189,7 @@ def compute_row_rouge_recalls(row, col_pairs, scorer):
     for gold_col, pred_col in col_pairs:
         gold, pred = row[gold_col], row[pred_col]
         if isinstance(gold, str) and isinstance(pred, str):
-            score = scorer.score(gold, pred)['rouge1'].recall
+            score = rouge1_recall_text(gold, pred)
         else:
             score = 0.0
         attr_name = gold_col.replace('_gold', '')  # safer and clearer
@@ -215,7 +216,6 @@ def compute_scores(merged_df):
     # -----------------------
     # Compute ROUGE-1 recalls
     # -----------------------
-    scorer = rouge_scorer.RougeScorer(['rouge1'], use_stemmer=True)
     rouge_col_pairs = [
         ('Title_gold', 'Title_pred'),
         ('Receiver_gold', 'Receiver_pred'),
@@ -224,7 +224,7 @@ def compute_scores(merged_df):
     ]
 
     recall_df = merged_df.apply(lambda row: compute_row_rouge_recalls(
-        row, rouge_col_pairs, scorer), axis=1)
+        row, rouge_col_pairs), axis=1)
     merged_df = pd.concat([merged_df, recall_df], axis=1)
 
     # ----------------------------------
@@ -293,6 +293,17 @@ if __name__ == '__main__':
         description="Evaluation script with optional test metadata switch.")
     parser.add_argument('--use-test-metadata', action='store_true',
                         help="Use 'test_metadata.csv' instead of 'clean_metadata.csv'")
+    parser.add_argument('--workers', type=int, default=config.WORKERS,
+                        help="Number of documents to process concurrently (default: %(default)s)")
+    parser.add_argument('--no-llm-cache', dest='llm_cache', action='store_false', default=config.LLM_CACHE_ENABLED,
+                        help="Always query the LLM instead of reusing cached responses")
+    traffic = parser.add_mutually_exclusive_group()
+    traffic.add_argument('--llm-record', metavar='DIR', default=None,
+                         help="Record every LLM request, response and latency to DIR")
+    traffic.add_argument('--llm-replay', metavar='DIR', default=None,
+                         help="Serve LLM responses recorded in DIR instead of querying Ollama")
+    parser.add_argument('--llm-replay-latency', type=float, default=0.0, metavar='SCALE',
+                        help="During replay, sleep for the recorded latency times SCALE (default: %(default)s)")
     args = parser.parse_args()
 
     # Lookup File checks, if they do not exist program shuts down gracefully
@@ -322,12 +333,14 @@ if __name__ == '__main__':
     files_preparation()
 
     # Step 2: Run the pipeline
+    options = default_options(workers=args.workers, llm_cache=args.llm_cache, llm_record=args.llm_record,
+                              llm_replay=args.llm_replay, llm_replay_latency=args.llm_replay_latency)
     if args.use_test_metadata:
-        main(gold_metadata_path=gold_metadata_path)
+        main(gold_metadata_path=gold_metadata_path, options=options)
         merged_df = load_evaluation_dataframe(
             gold_metadata_path=gold_metadata_path)
     else:
-        main()
+        main(options=options)
         merged_df = load_evaluation_dataframe()
 
     # Step 3: Load evaluation dataframe
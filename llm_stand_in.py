@@ -0,0 +1,114 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.llm_interface import _LLMTraffic
+import argparse
+import json
+import threading
+
+
+def make_handler(traffic, parallel):
+    """
+    Builds a request handler that answers Ollama API calls from recorded traffic.
+
+    Parameters:
+    ----------
+    traffic : _LLMTraffic
+        Recorded exchanges in replay mode.
+    parallel : int
+        Requests answered at once; further requests wait, like Ollama's OLLAMA_NUM_PARALLEL.
+
+    Returns:
+    -------
+    type
+        BaseHTTPRequestHandler subclass.
+    """
+    slots = threading.Semaphore(parallel)
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, body):
+            payload = json.dumps(body, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == "/api/ps":
+                self._reply(200, {"models": []})
+            else:
+                self._reply(404, {"error": f"unknown endpoint {self.path}"})
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.path == "/api/generate":
+                # Model warm-up: nothing to load.
+                self._reply(200, {"model": request.get("model"), "created_at": "", "response": "", "done": True})
+            elif self.path == "/api/chat":
+                with slots:
+                    try:
+                        response = traffic.chat(request.get("model"), request.get("messages"),
+                                                options=request.get("options"), format=request.get("format"))
+                    except LookupError as e:
+                        self._reply(404, {"error": str(e)})
+                        return
+                self._reply(200, response)
+            else:
+                self._reply(404, {"error": f"unknown endpoint {self.path}"})
+
+    return StandInHandler
+
+
+def main(replay_dir, port=11435, latency_scale=1.0, parallel=1):
+    """
+    Serves recorded LLM traffic over the Ollama HTTP API, as a stand-in inference host.
+
+    Record a run with `main.py --llm-record DIR`, start one stand-in per simulated host on its own
+    port, and point `main.py --ollama-hosts` at them to exercise load balancing and failover (stop a
+    stand-in mid-run) without any model server. Each stand-in replays repeated prompts in recorded
+    order on its own, so a retry answered by a different host may get the first recorded answer again.
+
+    Parameters:
+    ----------
+    replay_dir : str or Path
+        Directory written by `--llm-record`.
+    port : int
+        Port to listen on (default is 11435).
+    latency_scale : float
+        Multiplier applied to the recorded latencies (default is 1.0).
+    parallel : int
+        Requests answered at once; the rest queue, like a real server (default is 1).
+
+    Returns:
+    -------
+    None
+    """
+    traffic = _LLMTraffic(replay_dir, "replay", latency_scale)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(traffic, parallel))
+    print(f"[LLM stand-in] Replaying {replay_dir} on http://127.0.0.1:{port} "
+          f"(latency scale {latency_scale}, {parallel} parallel)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        traffic.report()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Stand-in Ollama host that replays recorded LLM traffic.")
+    parser.add_argument('replay_dir',
+                        help="Directory of traffic recorded with main.py --llm-record")
+    parser.add_argument('--port', type=int, default=11435,
+                        help="Port to listen on (default: %(default)s)")
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help="Sleep for the recorded latency times this factor (default: %(default)s)")
+    parser.add_argument('--parallel', type=int, default=1,
+                        help="Requests answered at once, like OLLAMA_NUM_PARALLEL (default: %(default)s)")
+    args = parser.parse_args()
+
+    main(args.replay_dir, port=args.port, latency_scale=args.latency_scale, parallel=args.parallel)
@@ -1,154 +1,297 @@
 import torch
 import re
 from pathlib import Path
-from utils.loader import load_pdfs, extract_text_from_pdf, clean_ocr_text
+from utils.loader import (load_pdfs, join_pages, start_extraction_pool, shutdown_extraction_pool, open_page_cache,
+                          close_page_cache, open_ocr, close_ocr)
 from utils.rename import generate_new_filename
 from utils.classifier import classify_document, load_huggingface_model
 from utils.file_organizer import organize_files
-from utils.llm_interface import query_llm, llm_single_field_query, load_prompt_template, field_is_well_formed, validate_and_reprompt_field, keys_are_well_formed
+from utils.llm_interface import (query_llm, llm_single_field_query, load_prompt_parts, field_is_well_formed,
+                                 validate_and_reprompt_field, reprompt_invalid_fields, reprompt_fields_concurrently,
+                                 repair_metadata, keys_are_well_formed, metadata_is_usable, FIELD_LENGTHS,
+                                 cascade_query, open_model_cascade, close_model_cascade, open_response_cache,
+                                 close_response_cache, open_llm_traffic, close_llm_traffic, open_llm_session,
+                                 close_llm_session, open_usage_log, close_usage_log, LLMUnavailableError)
 from utils.logger import init_log, log_metadata, update_log_row
-from utils.metadata_extractor import extract_site_id_from_filename, check_duplicate_by_rouge, get_site_registry_releasable
-from utils.gold_data_extraction import load_gold_data
+from utils.metadata_extractor import (check_duplicate_by_rouge, get_site_registry_releasable, open_dedup_index,
+                                      close_dedup_index, index_organized_file, reindex_renamed_file)
 from utils.site_id_to_address import get_site_address
 from utils.checks import verify_required_dirs, verify_required_files
+from utils.concurrency import OrderedTurnstile
+from utils.pipeline import Stage, run_pipeline
+from utils.batch_dedup import reconcile_duplicates
+from utils.retry_policy import start_retry_policy, document_budget, close_retry_policy
+from utils.context_builder import build_context
+from utils.metadata_rules import (rule_prefill, fields_to_ask, restrict_prompt, record_rule_coverage,
+                                  report_rule_coverage)
+from utils.triage import triage_document, report_triage, TEXT_LAYER
+from utils.document_context import DocumentContext
+from utils.field_verifier import enable_fuzzy_matching, disable_fuzzy_matching
 import config
-import ollama
 from collections import defaultdict
+import argparse
 import os
+import sys
 
 
-def process_file(config, file_path, flagged_for_review, site_id_address_dict, USE_ML_CLASSIFIER, gold_metadata_path):
+# Main prompt to extract metadata fields
+PROMPT_PATH = Path("prompts/metadata_prompt.txt")
+
+# Additional re-prompts for the LLM, only called if the first pass misses an important field
+# ADDRESS_REPROMPT_PATH = Path("prompts/address_reprompt.txt")
+SITE_ID_REPROMPT_PATH = Path("prompts/site_id_reprompt.txt")
+TITLE_REPROMPT_PATH = Path("prompts/title_reprompt.txt")
+SENDER_REPROMPT_PATH = Path("prompts/sender_reprompt.txt")
+RECEIVER_REPROMPT_PATH = Path("prompts/receiver_reprompt.txt")
+# Combined re-prompt asking for every invalid field in one request
+MULTI_FIELD_REPROMPT_PATH = Path("prompts/multi_field_reprompt.txt")
+
+# Single-field templates used when re-prompting fields concurrently
+REPROMPT_PATHS = {
+    'title': TITLE_REPROMPT_PATH,
+    'sender': SENDER_REPROMPT_PATH,
+    'receiver': RECEIVER_REPROMPT_PATH,
+    'site_id': SITE_ID_REPROMPT_PATH,
+}
+
+
+def registry_address(site_id):
     """
-    Processes a single PDF document to extract and log structured metadata.
+    Returns the registry address of `site_id`, or None if the site is not in `site_ids.csv`.
+    """
+    try:
+        return get_site_address(csv_path='../data/lookups/site_ids.csv', site_id=int(site_id))
+    except:
+        return None
+
 
-    This function performs the following operations:
-    - Extracts site ID from filename or LLM.
-    - Extracts and cleans text from the first 8 pages of the PDF.
-    - Uses an LLM to extract metadata (title, sender, receiver, address).
-    - Validates and re-prompts metadata fields if necessary.
-    - Attempts to classify the document type using ML or regex.
-    - Checks for duplicates using ROUGE + RapidFuzz.
-    - Generates a new filename and organizes the file.
-    - Logs extracted metadata for auditability.
+def new_document(file_path, flagged_for_review, index=0):
+    """
+    Creates the per-document state dictionary passed between pipeline stages.
 
     Parameters:
     ----------
-    config : module
-        Global configuration module with paths and device settings.
     file_path : pathlib.Path
         Path to the PDF file to be processed.
     flagged_for_review : dict
-        Dictionary storing filenames and fields flagged for manual review.
-    site_id_address_dict : dict
-        Dictionary to store site_id to address mappings for reuse.
-    USE_ML_CLASSIFIER : bool
-        Whether to use ML classifier for document type classification.
-    gold_metadata_path : str
-        Path to gold metadata (optional, not actively used here).
+        Dictionary the stages append review flags to, keyed by filename.
+    index : int, optional
+        Position of the file in the input order (default is 0).
 
     Returns:
     -------
-    None
+    dict
+        Document state; stages fill in the remaining keys as they run. "source" is the file's
+        `DocumentContext`, through which every stage reads the PDF, so it is parsed and cleaned once.
     """
-    try:
-        # Main prompt to extract metadata fields
-        prompt_path = Path("prompts/metadata_prompt.txt")
+    return {
+        "index": index,
+        "file_path": file_path,
+        "filename": file_path.name,
+        "source": DocumentContext(file_path),
+        "flagged_for_review": flagged_for_review,
+    }
+
 
-        # Additional re-prompts for the LLM, only called if the first pass misses an important field
-        # address_reprompt_path = Path("prompts/address_reprompt.txt")
-        site_id_reprompt_path = Path("prompts/site_id_reprompt.txt")
-        title_reprompt_path = Path("prompts/title_reprompt.txt")
-        sender_reprompt_path = Path("prompts/sender_reprompt.txt")
-        receiver_reprompt_path = Path("prompts/receiver_reprompt.txt")
+def extract_stage(document, triage=True):
+    """
+    Pipeline stage 1: resolves the site ID from the filename, extracts OCR-cleaned text
+    from the first 8 pages of the PDF and selects the spans sent to the LLM.
+
+    Parameters:
+    ----------
+    document : dict
+        Document state created by `new_document`.
+    triage : bool
+        Whether to classify the document as text-layer, image-only or garbled (default is True).
 
-        print("\n" + "=" * 100)
-        print(f"[STARTING] Processing file: {file_path.name}")
-        print("=" * 100 + "\n")
+    Returns:
+    -------
+    None
+    """
+    file_path = document["file_path"]
+
+    print("\n" + "=" * 100)
+    print(f"[STARTING] Processing file: {file_path.name}")
+    print("=" * 100 + "\n")
+
+    source = document["source"]
+    site_id = source.site_id_from_filename
+
+    if site_id:
+        print(f"[Extracted from filename] Site ID: {site_id}")
+    else:
+        print("[Fallback to LLM] Site ID not found in filename")
+
+    # Extract the first 8 pages of text, stopping early once the character budget is met
+    # (in the extraction process pool, if started)
+    pages = source.pages(max_pages=8, max_chars=config.EXTRACT_MAX_CHARS)
+    document["site_id"] = site_id
+    document["text"] = join_pages(pages)
+    # Prompts get the most informative spans within the token budget, not just the first pages.
+    document["context"] = build_context(pages, config.LLM_CONTEXT_TOKENS)
+    # Scans without a text layer and garbled OCR go straight to review instead of the LLM.
+    document["triage"] = triage_document(file_path, document["text"], layout=source.layout()) if triage else None
+    if document["triage"] is not None and document["triage"]["class"] != TEXT_LAYER:
+        print(f"[Triage] {document['triage']['class']}: {document['triage']['reason']}")
+
+
+def llm_stage(document, rules=True):
+    """
+    Pipeline stage 2: fills labelled fields with rules, extracts the remaining metadata with the LLM,
+    validates and re-prompts weak fields, recovers a missing site ID and looks up the registry
+    address for the site.
 
-        filename = file_path.name
-        site_id = extract_site_id_from_filename(filename)
+    Parameters:
+    ----------
+    document : dict
+        Document state after `extract_stage`.
+    rules : bool
+        Whether labelled fields are filled by rules before the LLM is asked for the rest (default is True).
 
+    Returns:
+    -------
+    None
+    """
+    filename = document["filename"]
+    flagged_for_review = document["flagged_for_review"]
+    site_id = document["site_id"]
+    text = document["text"]
+    context = document["context"]
+    # Every LLM call below draws from this document's budget (call limits and deadline).
+    budget = document_budget(filename)
+    max_retries = budget.policy.max_retries
+    # Site ID whose registry address is already in the metadata.
+    registry_site_id = None
+
+    triage = document["triage"]
+    # If OCR cleaned text has little to no content, or triage found a scan or garbled text, automatically consider this document unreadable.
+    triaged_unreadable = len(text.split()) < 50 or (triage is not None and triage["class"] != TEXT_LAYER)
+    if triaged_unreadable:
+        metadata_dict = {
+            "site_id": "none",
+            "title": "none",
+            "receiver": "none",
+            "sender": "none",
+            "address": "none",
+            "readable": "no"
+        }
+        reason = 'unreadable' if triage is None else f"unreadable ({triage['class']}: {triage['reason']})"
+        flagged_for_review[filename].append(reason)
+        print(f"{filename} flagged for manual review: {reason.upper()}")
+        # Re-prompting for the site ID would ask the LLM about text it cannot read; a reviewer supplies it instead.
+        if not site_id:
+            flagged_for_review[filename].append('site_id')
+            print(f"{filename} flagged for manual review: SITE_ID")
+
+    # Otherwise, fill what the rules can and prompt the LLM for the rest.
+    else:
+        # Fields found under literal labels ("Site ID:", "Re:", "To:", "From:") are not asked of the LLM.
+        prefilled = rule_prefill(text, config.RULES_MIN_CONFIDENCE) if rules else {}
+        if not site_id and 'site_id' in prefilled:
+            site_id = prefilled['site_id']
+            print(f"[Site ID FROM RULES] {site_id}")
         if site_id:
-            print(f"[Extracted from filename] Site ID: {site_id}")
+            # The registry address replaces the LLM's below, so it need not be asked for either.
+            address = registry_address(site_id)
+            if address is not None:
+                prefilled['address'] = address
+                registry_site_id = site_id
+        needed = fields_to_ask(prefilled, site_id)
+        if rules:
+            record_rule_coverage(prefilled, llm_skipped=not needed,
+                                 site_id_from_rules=not document["site_id"] and 'site_id' in prefilled)
+        if prefilled:
+            print(f"[Rules] Filled {', '.join(prefilled)}; LLM asked for {', '.join(needed) or 'nothing'}")
+
+        # The instructions go in the system message: identical for every document, the server reuses their evaluation.
+        system_prompt, prompt = load_prompt_parts(PROMPT_PATH, context, max_tokens=None)
+        fields = None
+        if prefilled:
+            prompt, fields = restrict_prompt(prompt, needed)
+
+        def ask(model=None, options=None):
+            answer = query_llm(prompt, model=model, system_prompt=system_prompt, options=options,
+                               structured=config.LLM_STRUCTURED_OUTPUT, fields=fields)
+            answer.update(prefilled)
+            return answer
+
+        if not needed:
+            # Every field came from the rules; labelled header fields imply a readable text layer.
+            metadata_dict = repair_metadata(dict(prefilled, readable="yes"))
         else:
-            print("[Fallback to LLM] Site ID not found in filename")
-
-        # Extract only first 8 pages of text
-        text = extract_text_from_pdf(file_path, max_pages=8)
-        text = clean_ocr_text(text)
-
-        # If OCR cleaned text has little to no content, automatically consider this document unreadable.
-        if len(text.split()) < 50:
-            metadata_dict = {
-                "site_id": "none",
-                "title": "none",
-                "receiver": "none",
-                "sender": "none",
-                "address": "none",
-                "readable": "no"
-            }
+            # Querying LLM to extract metadata attributes (schema-constrained JSON, partial answers repaired).
+            # The model cascade tries the cheapest model first and escalates only if the answer fails validation.
+            metadata_dict = cascade_query(
+                lambda model: ask(model=model),
+                accept=lambda answer, final: metadata_is_usable(answer, text, final),
+                budget=budget)
+            if metadata_dict is None:
+                # Run budget already spent: every field stays "none" and the document is flagged below.
+                metadata_dict = repair_metadata(dict(prefilled))
+
+        # Retries of the same prompt each get a new temperature and seed (see RetryPolicy.retry_options).
+        attempt = 0
+
+        # query_llm repairs partial answers into the six keys; this bounded retry is only a safeguard.
+        malformed_retries = 0
+        while not keys_are_well_formed(metadata_dict) and malformed_retries < 2 and budget.acquire():
+            print("Metadata dictionary malformed. Retrying...")
+            attempt += 1
+            metadata_dict = ask(options=budget.retry_options(attempt))
+            malformed_retries += 1
+
+        # If title extraction fails on a readable document, assume metadata extraction has failed entirely. Make up to `max_retries` re-attempts to extract metadata.
+        metadata_retries = 0
+        while keys_are_well_formed(metadata_dict) and metadata_dict['title'].lower() == 'none' and not metadata_dict['readable'].strip().lower() == 'no' and metadata_retries < max_retries and budget.acquire():
+            print(
+                f"Retrying metadata extraction, attempt {metadata_retries + 1}/{max_retries}")
+            attempt += 1
+            metadata_dict = ask(options=budget.retry_options(attempt))
+            metadata_retries += 1
+
+        # Null title, sender, receiver and flag if document is NOT readable.
+        if metadata_dict['readable'].strip().lower() == 'no':
+            metadata_dict['title'] = 'none'
+            metadata_dict['sender'] = 'none'
+            metadata_dict['receiver'] = 'none'
             flagged_for_review[filename].append('unreadable')
             print(f"{filename} flagged for manual review: UNREADABLE")
 
-        # Otherwise, prompt LLM.
+    readable = metadata_dict['readable'].strip().lower() != 'no'
+
+    # Extract site id values only if needed
+    llm_site_id = metadata_dict.get("site_id", "none")
+
+    # Only evaluate LLM site ID if filename did not provide a valid one
+    if not site_id:
+        if not re.fullmatch(r"\d{3,5}", llm_site_id):
+            print(
+                f"[Rejected LLM Site ID] {llm_site_id} — invalid format")
+            llm_site_id = "none"
         else:
-            prompt = load_prompt_template(prompt_path,  text)
-
-            # Querying LLM to extract metadata attributes
-            metadata_dict = query_llm(prompt, model="mistral")
-
-            # Very rare errors occur with metadata_dict extraction; system automatically retries if this occurs.
-            while not keys_are_well_formed(metadata_dict):
-                print("Metadata dictionary malformed. Retrying...")
-                metadata_dict = query_llm(prompt, model="mistral")
-
-            # If title extraction fails on a readable document, assume metadata extraction has failed entirely. Make up to 5 re-attempts to extract metadata.
-            metadata_retries = 0
-            while keys_are_well_formed(metadata_dict) and metadata_dict['title'].lower() == 'none' and not metadata_dict['readable'].strip().lower() == 'no' and metadata_retries < 5:
-                print(
-                    f"Retrying metadata extraction, attempt {metadata_retries + 1}/5")
-                metadata_dict = query_llm(prompt, model="mistral")
-                metadata_retries += 1
-
-            # Null title, sender, receiver and flag if document is NOT readable.
-            if metadata_dict['readable'].strip().lower() == 'no':
-                metadata_dict['title'] = 'none'
-                metadata_dict['sender'] = 'none'
-                metadata_dict['receiver'] = 'none'
-                flagged_for_review[filename].append('unreadable')
-                print(f"{filename} flagged for manual review: UNREADABLE")
+            print(f"[Validated LLM Site ID] {llm_site_id}")
+            site_id = llm_site_id
+            print(f"[Site ID FROM LLM] {site_id}")
 
+    if config.REPROMPT_MODE == "per_field":
         # If document IS readable, verify title, sender, and receiver fields.
-        if metadata_dict['readable'].strip().lower() != 'no':
-            validate_and_reprompt_field('title', 25, title_reprompt_path, metadata_dict, clean_ocr_text(
-                text), filename, flagged_for_review)
-            validate_and_reprompt_field('sender', 17, sender_reprompt_path, metadata_dict, clean_ocr_text(
-                text), filename, flagged_for_review)
-            validate_and_reprompt_field('receiver', 17, receiver_reprompt_path, metadata_dict, clean_ocr_text(
-                text), filename, flagged_for_review)
-
-        # Extract site id values only if needed
-        llm_site_id = metadata_dict.get("site_id", "none")
-
-        # Only evaluate LLM site ID if filename did not provide a valid one
-        if not site_id:
-            if not re.fullmatch(r"\d{3,5}", llm_site_id):
-                print(
-                    f"[Rejected LLM Site ID] {llm_site_id} — invalid format")
-                llm_site_id = "none"
-            else:
-                print(f"[Validated LLM Site ID] {llm_site_id}")
-                site_id = llm_site_id
-                print(f"[Site ID FROM LLM] {site_id}")
-
-        # Make up to 5 re-attempts to extract site_id
+        if readable:
+            validate_and_reprompt_field('title', FIELD_LENGTHS['title'], TITLE_REPROMPT_PATH, metadata_dict, text,
+                                        filename, flagged_for_review, max_retries, budget, context)
+            validate_and_reprompt_field('sender', FIELD_LENGTHS['sender'], SENDER_REPROMPT_PATH, metadata_dict, text,
+                                        filename, flagged_for_review, max_retries, budget, context)
+            validate_and_reprompt_field('receiver', FIELD_LENGTHS['receiver'], RECEIVER_REPROMPT_PATH, metadata_dict,
+                                        text, filename, flagged_for_review, max_retries, budget, context)
+
+        # Make up to `max_retries` re-attempts to extract site_id
         site_id_retries = 0
-        while not site_id and site_id_retries < 5:
+        while not site_id and not triaged_unreadable and site_id_retries < max_retries and budget.acquire():
             print(
-                f"Retrying Site ID extraction, attempt {site_id_retries + 1}/5")
-            site_id_reprompt = load_prompt_template(
-                site_id_reprompt_path, clean_ocr_text(text))
-            proposed_site_id = llm_single_field_query(site_id_reprompt)
+                f"Retrying Site ID extraction, attempt {site_id_retries + 1}/{max_retries}")
+            site_id_system_prompt, site_id_reprompt = load_prompt_parts(SITE_ID_REPROMPT_PATH, context, max_tokens=None)
+            proposed_site_id = llm_single_field_query(site_id_reprompt, system_prompt=site_id_system_prompt,
+                                                      options=budget.retry_options(site_id_retries))
             if re.fullmatch(r"\d{3,5}", proposed_site_id):
                 site_id = proposed_site_id
                 print(f"[Re-prompted Valid Site ID] {site_id}")
@@ -157,158 +300,419 @@ def process_file(config, file_path, flagged_for_review, site_id_address_dict, US
                 print(f"[Re-prompted Invalid Site ID] {proposed_site_id}")
                 site_id_retries += 1
 
-        # Get address from site ID - address CSV, use this preferentially if it exists in the CSV
-        try:
-            metadata_dict['address'] = get_site_address(
-                csv_path='../data/lookups/site_ids.csv', site_id=int(site_id))
-        except:
+    else:
+        # Either one combined re-prompt per attempt for every invalid field, or ("concurrent") each field's
+        # own re-prompt loop, all fields at once. A "none" title, sender or receiver is accepted as-is,
+        # as in the per-field validation.
+        validators = {}
+        if readable:
+            for field, length in FIELD_LENGTHS.items():
+                validators[field] = lambda value, length=length: (
+                    value.strip().lower() == 'none' or field_is_well_formed(value, text, length=length))
+        if not site_id and not triaged_unreadable:
+            validators['site_id'] = lambda value: re.fullmatch(r"\d{3,5}", value.strip()) is not None
+
+        if config.REPROMPT_MODE == "concurrent":
+            still_invalid = reprompt_fields_concurrently(
+                {field: (is_valid, REPROMPT_PATHS[field]) for field, is_valid in validators.items()},
+                metadata_dict, text, max_retries=max_retries, budget=budget, context=context)
+        else:
+            still_invalid = reprompt_invalid_fields(validators, MULTI_FIELD_REPROMPT_PATH, metadata_dict, text,
+                                                    max_retries=max_retries, structured=config.LLM_STRUCTURED_OUTPUT,
+                                                    budget=budget, context=context)
+
+        for field in still_invalid:
+            if field != 'site_id':
+                flagged_for_review[filename].append(field)
+                print(f"{filename} flagged for manual review: {field.upper()}")
+        if not site_id and 'site_id' in validators and 'site_id' not in still_invalid:
+            site_id = metadata_dict['site_id'].strip()
+            print(f"[Re-prompted Valid Site ID] {site_id}")
+
+    # Get address from site ID - address CSV, use this preferentially if it exists in the CSV
+    if site_id != registry_site_id:
+        address = registry_address(site_id)
+        if address is not None:
+            metadata_dict['address'] = address
+        else:
             print(
                 f"Address for site ID {site_id} not found in CSV registry! Defaulting to LLM-extracted address.")
 
-        # If an address is extracted and no address is recorded for this site ID yet, save it in dict.
-        if metadata_dict['address'].lower() != 'none':
-            if site_id_address_dict.get(site_id) is None:
-                site_id_address_dict[site_id] = metadata_dict['address']
+    if budget.exhausted_reason is not None:
+        flagged_for_review[filename].append(f"LLM budget exhausted ({budget.exhausted_reason})")
+        print(f"{filename} flagged for manual review: LLM BUDGET EXHAUSTED")
 
-        # If no address is extracted but we have previously extracted an address, re-use it.
-        elif site_id_address_dict.get(site_id) is not None:
-            print(
-                f"Address not found in document. Re-using previously extracted address from site_id: {site_id}")
-            metadata_dict['address'] = site_id_address_dict[site_id]
+    document["site_id"] = site_id
+    document["metadata"] = metadata_dict
 
-        # Now get document type
 
-        title = metadata_dict.get("title", "").strip()
-        if (not title) or (title == 'none') or (USE_ML_CLASSIFIER == False):
-            print(f"Using regex mode")
-            doc_type = classify_document(file_path, {"site_id": site_id, "title": metadata_dict.get(
-                "title", "")}, mode="regex")
-        else:
-            print(f"Using ml mode for {title}")
-            doc_type = classify_document(file_path, config.device, {"site_id": site_id, "title": metadata_dict.get(
-                "title", "")}, mode="ml")
+def classify_stage(document, config, USE_ML_CLASSIFIER):
+    """
+    Pipeline stage 3: classifies the document type using the ML classifier or regex fallback.
 
-        print(f"document type is {doc_type} for {file_path}")
+    Parameters:
+    ----------
+    document : dict
+        Document state after `llm_stage`.
+    config : module
+        Global configuration module with paths and device settings.
+    USE_ML_CLASSIFIER : bool
+        Whether to use ML classifier for document type classification.
 
-        # Updated Duplicate check – ROUGE + RapidFuzz
-        duplicate_status, matched_path, is_current_file_shorter, similarity_score = check_duplicate_by_rouge(
-            current_file_path=file_path,
-            site_id=site_id,
-            site_id_dir=config.OUTPUT_DIR / site_id
-        )
+    Returns:
+    -------
+    None
+    """
+    file_path = document["file_path"]
+    site_id = document["site_id"]
+    metadata_dict = document["metadata"]
 
-        duplicate_file = ""
+    title = metadata_dict.get("title", "").strip()
+    if (not title) or (title == 'none') or (USE_ML_CLASSIFIER == False):
+        print(f"Using regex mode")
+        doc_type = classify_document(file_path, {"site_id": site_id, "title": metadata_dict.get(
+            "title", "")}, mode="regex")
+    else:
+        print(f"Using ml mode for {title}")
+        doc_type = classify_document(file_path, config.device, {"site_id": site_id, "title": metadata_dict.get(
+            "title", "")}, mode="ml")
 
-        if duplicate_status != "no" and is_current_file_shorter:
-            print(
-                "[DUPLICATE CONFIRMED] Current file is shorter. Will be tagged as -DUP.")
-            duplicate_file = matched_path.name
-            duplicate_status = "yes"
+    print(f"document type is {doc_type} for {file_path}")
+    document["doc_type"] = doc_type
 
-        elif duplicate_status != "no" and not is_current_file_shorter:
-            print(
-                "[REVERSE DUPLICATE] Current file is longer. Updating matched file as duplicate.")
-
-            # Rename matched file to add -DUP
-            matched_output_dir = matched_path.parent
-            matched_new_name, _ = generate_new_filename(
-                matched_path,
-                site_id=site_id,
-                doc_type=doc_type,
-                duplicate=True,
-                output_dir=matched_output_dir
-            )
-            matched_output_path = matched_output_dir / matched_new_name
-            matched_path.rename(matched_output_path)
-
-            # Update matched file's log entry
-            update_log_row(
-                config.LOG_PATH,
-                original_filename=matched_path.name,
-                updated_values={
-                    "Duplicate": "yes",
-                    "Duplicate_File": file_path.name,
-                    "Site_Registry_Releaseable": "No (duplicate)",
-                    "New_Filename": matched_new_name,
-                    "Output_Path": str(matched_output_path)
-                }
-            )
-
-            # Do NOT mark current file as duplicate
-            duplicate_status = "no"
-            duplicate_file = ""
 
-        else:
-            duplicate_status = "no"
-            duplicate_file = ""
+def dedup_stage(document, config, defer_duplicates=False):
+    """
+    Pipeline stage 4: checks the document against already organized files of the same site
+    (ROUGE + RapidFuzz). If the current file is the longer of a duplicate pair, the earlier
+    file is renamed with -DUP and its log row updated instead.
 
-        # Site Registry Releasable Check
-        if duplicate_status != "no":
-            releasable = "No (duplicate)"
-        else:
-            releasable = get_site_registry_releasable(
-                doc_type, config.LOOKUPS_PATH / "site_registry_mapping.xlsx"
-            )
-
-        # Generate filename after duplicate logic
-        # Step 1: Get year (don't pass output_dir yet)
-        temp_filename, year = generate_new_filename(
-            file_path,
+    Must see documents in input order, after every earlier document has been organized.
+
+    Parameters:
+    ----------
+    document : dict
+        Document state after `classify_stage`.
+    config : module
+        Global configuration module with paths and device settings.
+    defer_duplicates : bool
+        If True, skip the check; duplicates are reconciled in one batch after the run.
+
+    Returns:
+    -------
+    None
+    """
+    if defer_duplicates:
+        document["duplicate_status"] = "no"
+        document["duplicate_file"] = ""
+        document["similarity_score"] = 0.0
+        return
+
+    file_path = document["file_path"]
+    site_id = document["site_id"]
+    doc_type = document["doc_type"]
+
+    # Updated Duplicate check – ROUGE + RapidFuzz
+    duplicate_status, matched_path, is_current_file_shorter, similarity_score = check_duplicate_by_rouge(
+        current_file_path=file_path,
+        site_id=site_id,
+        site_id_dir=config.OUTPUT_DIR / site_id,
+        document=document["source"]
+    )
+
+    duplicate_file = ""
+
+    if duplicate_status != "no" and is_current_file_shorter:
+        print(
+            "[DUPLICATE CONFIRMED] Current file is shorter. Will be tagged as -DUP.")
+        duplicate_file = matched_path.name
+        duplicate_status = "yes"
+
+    elif duplicate_status != "no" and not is_current_file_shorter:
+        print(
+            "[REVERSE DUPLICATE] Current file is longer. Updating matched file as duplicate.")
+
+        # Rename matched file to add -DUP
+        matched_output_dir = matched_path.parent
+        matched_new_name, _ = generate_new_filename(
+            matched_path,
             site_id=site_id,
             doc_type=doc_type,
-            duplicate=(duplicate_status != "no"),
-            output_dir=None  # avoid using 'year' before it's defined
+            duplicate=True,
+            output_dir=matched_output_dir
+        )
+        matched_output_path = matched_output_dir / matched_new_name
+        matched_path.rename(matched_output_path)
+        reindex_renamed_file(config.OUTPUT_DIR / site_id, matched_path, matched_output_path)
+
+        # Update matched file's log entry
+        update_log_row(
+            config.LOG_PATH,
+            original_filename=matched_path.name,
+            updated_values={
+                "Duplicate": "yes",
+                "Duplicate_File": file_path.name,
+                "Site_Registry_Releaseable": "No (duplicate)",
+                "New_Filename": matched_new_name,
+                "Output_Path": str(matched_output_path)
+            }
         )
 
-        # Step 2: Now that you have year, build final path and call again
-        final_output_dir = config.OUTPUT_DIR / \
-            site_id / f"{year}-{doc_type.upper()}"
+        # Do NOT mark current file as duplicate
+        duplicate_status = "no"
+        duplicate_file = ""
 
-        new_filename, _ = generate_new_filename(
-            file_path,
-            site_id=site_id,
-            doc_type=doc_type,
-            duplicate=(duplicate_status != "no"),
-            output_dir=final_output_dir
+    else:
+        duplicate_status = "no"
+        duplicate_file = ""
+
+    document["duplicate_status"] = duplicate_status
+    document["duplicate_file"] = duplicate_file
+    document["similarity_score"] = similarity_score
+
+
+def organize_stage(document, config, site_id_address_dict):
+    """
+    Pipeline stage 5: resolves the shared site address, checks releasability, generates the
+    standardized filename, copies the file into the output tree and logs its metadata.
+
+    Must see documents in input order.
+
+    Parameters:
+    ----------
+    document : dict
+        Document state after `dedup_stage`.
+    config : module
+        Global configuration module with paths and device settings.
+    site_id_address_dict : dict
+        Dictionary to store site_id to address mappings for reuse.
+
+    Returns:
+    -------
+    None
+    """
+    file_path = document["file_path"]
+    filename = document["filename"]
+    site_id = document["site_id"]
+    metadata_dict = document["metadata"]
+    doc_type = document["doc_type"]
+    duplicate_status = document["duplicate_status"]
+    duplicate_file = document["duplicate_file"]
+    similarity_score = document["similarity_score"]
+
+    # If an address is extracted and no address is recorded for this site ID yet, save it in dict.
+    if metadata_dict['address'].lower() != 'none':
+        if site_id_address_dict.get(site_id) is None:
+            site_id_address_dict[site_id] = metadata_dict['address']
+
+    # If no address is extracted but we have previously extracted an address, re-use it.
+    elif site_id_address_dict.get(site_id) is not None:
+        print(
+            f"Address not found in document. Re-using previously extracted address from site_id: {site_id}")
+        metadata_dict['address'] = site_id_address_dict[site_id]
+
+    # Site Registry Releasable Check
+    if duplicate_status != "no":
+        releasable = "No (duplicate)"
+    else:
+        releasable = get_site_registry_releasable(
+            doc_type, config.LOOKUPS_PATH / "site_registry_mapping.xlsx"
         )
 
-        output_path = final_output_dir / new_filename
-
-        print("\nmetadata response:\n", metadata_dict)
-        print("final site id: ", site_id)
-
-        print('\n----\n')
-
-        print("final site id:", site_id, filename)
-        print(f"[DUPLICATE STATUS] {duplicate_status}")
-        print(f"[RELEASABLE] {releasable}")
-
-        organize_files(file_path, output_path)
-        log_metadata(config.LOG_PATH, {
-            "Original_Filename": file_path.name,
-            "New_Filename": new_filename,
-            "Site_id": site_id,
-            "Document_Type": doc_type,
-            "Site_Registry_Releaseable": releasable,
-            "Title": metadata_dict.get("title", "none"),
-            "Receiver": metadata_dict.get("receiver", "none"),
-            "Sender": metadata_dict.get("sender", "none"),
-            "Address": metadata_dict.get("address", "none"),
-            "Duplicate": duplicate_status,
-            "Duplicate_File": duplicate_file,
-            "Similarity_Score": similarity_score if similarity_score is not None else "",
-            "Readable": metadata_dict.get("readable", "no"),
-            "Output_Path": str(output_path)
-        })
-
-        print("\n" + "-" * 100)
-        print(f"[COMPLETED] {file_path.name}")
-        print("-" * 100)
+    # Generate filename after duplicate logic; the year folder comes from the date parsed once from the filename
+    date = document["source"].filename_date
+    final_output_dir = config.OUTPUT_DIR / \
+        site_id / f"{date[1]}-{doc_type.upper()}"
+
+    new_filename, _ = generate_new_filename(
+        file_path,
+        site_id=site_id,
+        doc_type=doc_type,
+        duplicate=(duplicate_status != "no"),
+        output_dir=final_output_dir,
+        date=date
+    )
+
+    output_path = final_output_dir / new_filename
+
+    print("\nmetadata response:\n", metadata_dict)
+    print("final site id: ", site_id)
+
+    print('\n----\n')
+
+    print("final site id:", site_id, filename)
+    print(f"[DUPLICATE STATUS] {duplicate_status}")
+    print(f"[RELEASABLE] {releasable}")
+
+    organize_files(file_path, output_path)
+    # The copy has the same bytes and text, so its index entry reuses the input file's context.
+    index_organized_file(site_id, config.OUTPUT_DIR / site_id, output_path, document=document["source"])
+    log_metadata(config.LOG_PATH, {
+        "Original_Filename": file_path.name,
+        "New_Filename": new_filename,
+        "Site_id": site_id,
+        "Document_Type": doc_type,
+        "Site_Registry_Releaseable": releasable,
+        "Title": metadata_dict.get("title", "none"),
+        "Receiver": metadata_dict.get("receiver", "none"),
+        "Sender": metadata_dict.get("sender", "none"),
+        "Address": metadata_dict.get("address", "none"),
+        "Duplicate": duplicate_status,
+        "Duplicate_File": duplicate_file,
+        "Similarity_Score": similarity_score if similarity_score is not None else "",
+        "Readable": metadata_dict.get("readable", "no"),
+        "Output_Path": str(output_path)
+    })
+
+    print("\n" + "-" * 100)
+    print(f"[COMPLETED] {file_path.name}")
+    print("-" * 100)
+
+
+def flag_llm_unavailable(filename, flagged_for_review, error):
+    """
+    Flags a document that could not be sent to the LLM because no Ollama host was available.
+
+    The document is neither logged nor organized, so it is not mistaken for an unreadable one.
+
+    Parameters:
+    ----------
+    filename : str
+        Name of the input PDF.
+    flagged_for_review : dict
+        Dictionary the review flags are appended to, keyed by filename.
+    error : LLMUnavailableError
+        The error raised by the LLM client.
+
+    Returns:
+    -------
+    None
+    """
+    flagged_for_review[filename].append('LLM unavailable')
+    print(f"{filename} flagged for manual review: LLM UNAVAILABLE ({error})")
+
+
+def process_file(config, file_path, flagged_for_review, site_id_address_dict, USE_ML_CLASSIFIER, gold_metadata_path,
+                 defer_duplicates=False, rules=True, triage=True):
+    """
+    Processes a single PDF document to extract and log structured metadata.
+
+    This function runs every pipeline stage in sequence:
+    - `extract_stage`: site ID from filename, cleaned text from the first 8 pages.
+    - `llm_stage`: LLM metadata extraction, field validation and re-prompting, site ID recovery.
+    - `classify_stage`: document type via ML or regex.
+    - `dedup_stage`: duplicate check using ROUGE + RapidFuzz.
+    - `organize_stage`: filename generation, file organization and metadata logging.
+
+    Parameters:
+    ----------
+    config : module
+        Global configuration module with paths and device settings.
+    file_path : pathlib.Path
+        Path to the PDF file to be processed.
+    flagged_for_review : dict
+        Dictionary storing filenames and fields flagged for manual review.
+    site_id_address_dict : dict
+        Dictionary to store site_id to address mappings for reuse.
+    USE_ML_CLASSIFIER : bool
+        Whether to use ML classifier for document type classification.
+    gold_metadata_path : str
+        Path to gold metadata (optional, not actively used here).
+    defer_duplicates : bool
+        If True, skip the online duplicate check (see `dedup_stage`).
+    rules : bool
+        Whether labelled fields are filled by rules before the LLM is asked (see `llm_stage`).
+    triage : bool
+        Whether documents are triaged before the LLM (see `extract_stage`).
+
+    Returns:
+    -------
+    None
+    """
+    try:
+        document = new_document(file_path, flagged_for_review)
+        extract_stage(document, triage)
+        llm_stage(document, rules)
+        classify_stage(document, config, USE_ML_CLASSIFIER)
+        dedup_stage(document, config, defer_duplicates)
+        organize_stage(document, config, site_id_address_dict)
+    except LLMUnavailableError as ex:
+        flag_llm_unavailable(file_path.name, flagged_for_review, ex)
     except Exception as ex:
         print(f'exception {ex} in {file_path}')
 
 
-def main(gold_metadata_path='../data/lookups/clean_metadata.csv'):
+def run_staged_pipeline(config, files, flagged_for_review, site_id_address_dict, USE_ML_CLASSIFIER, stage_workers, queue_size,
+                        defer_duplicates=False, rules=True, triage=True):
+    """
+    Processes documents through the staged streaming pipeline.
+
+    Extraction, LLM calls and classification run concurrently on their own worker pools, so PDF
+    parsing for upcoming documents overlaps with the LLM wait for the current ones. Duplicate
+    checking and organizing run on a single worker each, in input order, and a document is only
+    checked for duplicates once every earlier document has been organized, so the output tree,
+    CSV log and review flags match a serial run.
+
+    Parameters:
+    ----------
+    config : module
+        Global configuration module with paths and device settings.
+    files : list of pathlib.Path
+        PDF files to process, in input order.
+    flagged_for_review : dict
+        Dictionary storing filenames and fields flagged for manual review.
+    site_id_address_dict : dict
+        Dictionary to store site_id to address mappings for reuse.
+    USE_ML_CLASSIFIER : bool
+        Whether to use ML classifier for document type classification.
+    stage_workers : dict
+        Number of workers for the "extract", "llm" and "classify" stages.
+    queue_size : int
+        Capacity of each inter-stage queue.
+    defer_duplicates : bool
+        If True, skip the online duplicate check (see `dedup_stage`).
+    rules : bool
+        Whether labelled fields are filled by rules before the LLM is asked (see `llm_stage`).
+    triage : bool
+        Whether documents are triaged before the LLM (see `extract_stage`).
+
+    Returns:
+    -------
+    None
+    """
+    # A document may only look at the output tree once every earlier document has been organized.
+    organized = OrderedTurnstile()
+
+    def dedup_in_order(document):
+        organized.wait(document["index"])
+        dedup_stage(document, config, defer_duplicates)
+
+    def on_complete(document, error):
+        if isinstance(error, LLMUnavailableError):
+            flag_llm_unavailable(document["filename"], document["flagged_for_review"], error)
+        elif error is not None:
+            print(f'exception {error} in {document["file_path"]}')
+        # Flags are merged here so the review report keeps the serial order.
+        for filename, fields in document["flagged_for_review"].items():
+            flagged_for_review[filename].extend(fields)
+        organized.done(document["index"])
+
+    stages = [
+        Stage("extract", lambda document: extract_stage(document, triage), workers=stage_workers["extract"]),
+        Stage("llm", lambda document: llm_stage(document, rules), workers=stage_workers["llm"]),
+        Stage("classify", lambda document: classify_stage(document, config, USE_ML_CLASSIFIER),
+              workers=stage_workers["classify"]),
+        Stage("dedup", dedup_in_order, ordered=True),
+        Stage("organize", lambda document: organize_stage(document, config, site_id_address_dict),
+              ordered=True),
+    ]
+
+    documents = (new_document(file_path, defaultdict(list), index)
+                 for index, file_path in enumerate(files))
+    run_pipeline(documents, stages, queue_size=queue_size, on_complete=on_complete)
+
+
+def main(gold_metadata_path='../data/lookups/clean_metadata.csv', options=None):
     """
     Main entry point for the document processing pipeline.
 
@@ -316,7 +720,7 @@ def main(gold_metadata_path='../data/lookups/clean_metadata.csv'):
     - Loads the ML model if enabled.
     - Initializes paths, devices, and required file/directory checks.
     - Scans input directory for PDF files.
-    - Processes each file using `process_file`.
+    - Processes each file using `process_file`, or streams files through the staged pipeline.
     - Outputs files into organized folders.
     - Flags low-confidence or failed extractions for human review.
 
@@ -324,6 +728,11 @@ def main(gold_metadata_path='../data/lookups/clean_metadata.csv'):
     ----------
     gold_metadata_path : str, optional
         Path to CSV containing clean gold metadata (default is in lookups dir).
+    options : argparse.Namespace, optional
+        Run options, as parsed by `build_arg_parser()`: worker counts, caches, OCR, duplicate
+        checks, LLM traffic recording and replay, model cascade, Ollama hosts, rules, triage and
+        fuzzy field matching. See `python main.py --help` for each option. Default is
+        `default_options()`, i.e. the settings in `config.py`.
 
     Returns:
     -------
@@ -331,6 +740,8 @@ def main(gold_metadata_path='../data/lookups/clean_metadata.csv'):
     """
 
     print("[Starting Pipeline Initialization]")
+    if options is None:
+        options = default_options()
     USE_ML_CLASSIFIER = True
     device = (
         torch.device("mps") if torch.backends.mps.is_available()
@@ -400,9 +811,90 @@ def main(gold_metadata_path='../data/lookups/clean_metadata.csv'):
         print("No PDF files found.")
         return
 
-    for file_path in files:
-        process_file(config, file_path, flagged_for_review,
-                     site_id_address_dict, USE_ML_CLASSIFIER, gold_metadata_path)
+    stage_workers = {
+        "extract": options.extract_workers,
+        "llm": options.workers,
+        "classify": options.classify_workers,
+    }
+    pipeline = options.pipeline
+    if pipeline is None:
+        pipeline = any(count > 1 for count in stage_workers.values())
+
+    # Opened first: with no healthy Ollama host the run aborts (LLMUnavailableError) before anything else is opened.
+    if not options.llm_replay:
+        try:
+            open_llm_session(
+                options.ollama_hosts,
+                models=options.llm_models,
+                keep_alive=config.LLM_KEEP_ALIVE,
+                timeout=config.LLM_TIMEOUT,
+                failure_threshold=config.LLM_BREAKER_FAILURES,
+                reset_after=config.LLM_BREAKER_RESET,
+                max_concurrency=config.LLM_HOST_MAX_CONCURRENCY,
+                warm_up=options.llm_warm_up)
+        except LLMUnavailableError as e:
+            print(f"\n[ABORTING] {e}. Start Ollama or check --ollama-hosts / config.OLLAMA_HOSTS.\n")
+            sys.exit(1)
+
+    if options.page_cache:
+        open_page_cache(config.PAGE_CACHE_PATH, config.PAGE_CACHE_MAX_BYTES)
+    if options.ocr:
+        open_ocr(config.OCR_LANGUAGE, config.OCR_DPI,
+                 config.OCR_CACHE_PATH if config.OCR_CACHE_ENABLED else None, config.OCR_CACHE_MAX_BYTES)
+    # The exact-hash registry is always on; `--no-dedup-index` only switches off LSH candidate selection.
+    open_dedup_index(config.DEDUP_INDEX_PATH, config.DEDUP_INDEX_MIN_SIMILARITY, config.DEDUP_INDEX_MAX_CANDIDATES,
+                     config.DEDUP_INDEX_FULL_SCAN_BELOW, candidates=options.dedup_index)
+    dedup_batch, rules, triage = options.dedup_batch, options.rules, options.triage
+    if options.fuzzy_fields:
+        enable_fuzzy_matching(config.FIELD_FUZZY_THRESHOLD)
+    llm_cache = options.llm_cache
+    if options.llm_record or options.llm_replay:
+        # Every request must reach the recorder/replayer for the traffic to be reproduced faithfully.
+        llm_cache = False
+        if options.llm_record:
+            open_llm_traffic(options.llm_record, "record")
+        else:
+            open_llm_traffic(options.llm_replay, "replay", latency_scale=options.llm_replay_latency)
+    if llm_cache:
+        open_response_cache(config.LLM_CACHE_PATH, config.LLM_CACHE_MAX_BYTES)
+    open_model_cascade(options.llm_models)
+    if config.LLM_USAGE_LOG_PATH:
+        open_usage_log(config.LLM_USAGE_LOG_PATH)
+    start_retry_policy(
+        max_retries=config.LLM_MAX_RETRIES,
+        max_calls_per_document=config.LLM_MAX_CALLS_PER_DOCUMENT,
+        max_calls_per_run=options.llm_call_budget,
+        document_deadline=config.LLM_DOCUMENT_DEADLINE,
+        retry_temperature=config.LLM_RETRY_TEMPERATURE,
+        temperature_step=config.LLM_RETRY_TEMPERATURE_STEP,
+        seed=config.LLM_RETRY_SEED)
+
+    start_extraction_pool(options.extract_processes)
+    try:
+        if not pipeline:
+            for file_path in files:
+                process_file(config, file_path, flagged_for_review,
+                             site_id_address_dict, USE_ML_CLASSIFIER, gold_metadata_path, dedup_batch, rules, triage)
+        else:
+            print(f"[Pipeline] Stage workers: {stage_workers}, queue size: {options.queue_size}")
+            run_staged_pipeline(config, files, flagged_for_review, site_id_address_dict,
+                                USE_ML_CLASSIFIER, stage_workers, options.queue_size, dedup_batch, rules, triage)
+        if dedup_batch:
+            reconcile_duplicates(config.LOG_PATH, config.OUTPUT_DIR)
+    finally:
+        shutdown_extraction_pool()
+        close_page_cache()
+        close_ocr()
+        close_dedup_index()
+        close_response_cache()
+        close_llm_traffic()
+        close_llm_session()
+        close_usage_log()
+        report_rule_coverage()
+        report_triage()
+        disable_fuzzy_matching()
+        close_retry_policy()
+        close_model_cascade()
 
     print("===============================================================\nThe following documents have been flagged for human review:\n===============================================================\n")
     for key, value_list in flagged_for_review.items():
@@ -415,5 +907,85 @@ def main(gold_metadata_path='../data/lookups/clean_metadata.csv'):
     print("Pipeline complete.")
 
 
+def build_arg_parser():
+    """
+    Builds the command-line parser of the pipeline. Every option defaults to its setting in `config.py`.
+
+    Returns:
+    -------
+    argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(
+        description="Extract, classify, rename and organize site documents.")
+    parser.add_argument('--workers', type=int, default=config.WORKERS,
+                        help="Number of documents awaiting the LLM concurrently (default: %(default)s)")
+    parser.add_argument('--extract-workers', type=int, default=config.EXTRACT_WORKERS,
+                        help="Number of text extraction workers (default: %(default)s)")
+    parser.add_argument('--classify-workers', type=int, default=config.CLASSIFY_WORKERS,
+                        help="Number of classification workers (default: %(default)s)")
+    parser.add_argument('--queue-size', type=int, default=config.PIPELINE_QUEUE_SIZE,
+                        help="Capacity of each queue between pipeline stages (default: %(default)s)")
+    parser.add_argument('--extract-processes', type=int, default=config.EXTRACT_PROCESSES,
+                        help="Number of PDF text extraction processes (default: one per CPU core)")
+    parser.add_argument('--no-page-cache', dest='page_cache', action='store_false', default=config.PAGE_CACHE_ENABLED,
+                        help="Always re-extract PDF text instead of using the persistent page text cache")
+    parser.add_argument('--ocr', action='store_true', default=config.OCR_ENABLED,
+                        help="Recognise scanned pages without a text layer with Tesseract (needs Tesseract installed)")
+    parser.add_argument('--no-dedup-index', dest='dedup_index', action='store_false', default=config.DEDUP_INDEX_ENABLED,
+                        help="Compare each document against every file of its site instead of index candidates")
+    parser.add_argument('--no-llm-cache', dest='llm_cache', action='store_false', default=config.LLM_CACHE_ENABLED,
+                        help="Always query the LLM instead of reusing cached responses")
+    traffic = parser.add_mutually_exclusive_group()
+    traffic.add_argument('--llm-record', metavar='DIR', default=None,
+                         help="Record every LLM request, response and latency to DIR")
+    traffic.add_argument('--llm-replay', metavar='DIR', default=None,
+                         help="Serve LLM responses recorded in DIR instead of querying Ollama")
+    parser.add_argument('--llm-replay-latency', type=float, default=0.0, metavar='SCALE',
+                        help="During replay, sleep for the recorded latency times SCALE (default: %(default)s)")
+    parser.add_argument('--llm-models', type=lambda value: [model.strip() for model in value.split(',') if model.strip()],
+                        default=config.LLM_MODELS, metavar='MODEL[,MODEL...]',
+                        help="Model cascade, cheapest first, e.g. llama3.2:3b,mistral (default: %(default)s)")
+    parser.add_argument('--llm-call-budget', type=int, default=config.LLM_MAX_CALLS_PER_RUN,
+                        help="Maximum number of LLM calls for the whole run (default: no limit)")
+    parser.add_argument('--ollama-hosts', type=lambda value: [host.strip() for host in value.split(',') if host.strip()],
+                        default=config.OLLAMA_HOSTS, metavar='HOST[,HOST...]',
+                        help="Comma-separated Ollama servers to balance requests across "
+                             "(default: config.OLLAMA_HOSTS, else the OLLAMA_HOST environment variable)")
+    parser.add_argument('--no-llm-warm-up', dest='llm_warm_up', action='store_false', default=config.LLM_WARM_UP,
+                        help="Do not load the models into the Ollama server before the first document")
+    parser.add_argument('--no-rules', dest='rules', action='store_false', default=config.RULES_ENABLED,
+                        help="Send every field to the LLM instead of filling labelled fields with rules first")
+    parser.add_argument('--no-triage', dest='triage', action='store_false', default=config.TRIAGE_ENABLED,
+                        help="Send image-only and garbled documents to the LLM instead of straight to review")
+    parser.add_argument('--fuzzy-fields', action='store_true', default=config.FIELD_FUZZY_MATCH,
+                        help="Accept extracted field words that match the document text up to OCR errors (RapidFuzz)")
+    parser.add_argument('--dedup-batch', action='store_true', default=config.DEDUP_BATCH,
+                        help="Reconcile duplicate clusters in one pass after the run instead of per file")
+    parser.add_argument('--pipeline', action='store_true', default=None,
+                        help="Use the staged pipeline even when every stage has a single worker")
+    return parser
+
+
+def default_options(**overrides):
+    """
+    Run options as the command line would give them without arguments, i.e. the `config.py` settings.
+
+    Parameters:
+    ----------
+    **overrides
+        Options to set instead, named as the `build_arg_parser()` destinations (e.g. `workers`, `llm_replay`).
+
+    Returns:
+    -------
+    argparse.Namespace
+    """
+    options = build_arg_parser().parse_args([])
+    for name, value in overrides.items():
+        if not hasattr(options, name):
+            raise TypeError(f"Unknown pipeline option: {name}")
+        setattr(options, name, value)
+    return options
+
+
 if __name__ == "__main__":
-    main()
+    main(options=build_arg_parser().parse_args())
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The tests import the pipeline modules as the scripts do, from the repository root.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,74 @@
+import csv
+
+import fitz
+
+from utils.batch_dedup import _containment_pairs, reconcile_duplicates
+from utils.logger import init_log, log_metadata
+from utils.rouge_engine import rouge1_counts
+
+HEADERS = ["Original_Filename", "New_Filename", "Site_id", "Document_Type", "Site_Registry_Releaseable",
+           "Duplicate", "Duplicate_File", "Similarity_Score", "Output_Path"]
+
+REPORT = ("Stage 1 Preliminary Site Investigation of the property at 212 Avenue, Richmond. Soil samples from "
+          "boreholes BH1 to BH6 exceeded the industrial land use standards for petroleum hydrocarbons, and "
+          "groundwater in monitoring well MW-3 exceeded the aquatic life standards. Further delineation of "
+          "the hydrocarbon impacts is recommended before a remediation plan is prepared for the ministry. ")
+LETTER = ("Dear Sir or Madam, the ministry acknowledges receipt of your application for a certificate of "
+          "compliance and the fee. A contaminated sites officer will be assigned to review the file and will "
+          "contact you if further information is required. Yours truly, Regional Manager. ")
+
+
+def write_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page().insert_textbox(fitz.Rect(40, 40, 560, 800), text, fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def organize(tmp_path, documents):
+    # Lays out an organized output tree and its metadata log, as the pipeline writes them.
+    output_dir, log_path = tmp_path / "output", tmp_path / "log.csv"
+    init_log(log_path, HEADERS)
+    for original, site_id, text in documents:
+        site_dir = output_dir / site_id
+        site_dir.mkdir(parents=True, exist_ok=True)
+        new_name = f"2020-01-01 - {site_id} - REPORT_{original[:-4]}.pdf"
+        write_pdf(site_dir / new_name, text)
+        log_metadata(log_path, {"Original_Filename": original, "New_Filename": new_name, "Site_id": site_id,
+                                "Document_Type": "REPORT", "Site_Registry_Releaseable": "Yes",
+                                "Duplicate": "no", "Output_Path": str(site_dir / new_name)})
+    return output_dir, log_path
+
+
+def test_containment_pairs_finds_only_overlapping_documents():
+    counts = [rouge1_counts(text) for text in (REPORT, REPORT[:200], LETTER, "")]
+    assert _containment_pairs(counts, 0.5) == [(0, 1)]
+
+
+def test_reconcile_keeps_the_longest_document_of_each_cluster(tmp_path):
+    full = REPORT * 2
+    output_dir, log_path = organize(tmp_path, [
+        ("revised.pdf", "1234", full.replace("Further delineation of the hydrocarbon impacts is recommended",
+                                             "Delineation is recommended", 1)),
+        ("full.pdf", "1234", full),
+        ("rescan.pdf", "1234", full.replace("Richmond", "Richmnd")),
+        # An excerpt covers too little of the report to be a duplicate of it.
+        ("excerpt.pdf", "1234", REPORT[:250]),
+        ("letter.pdf", "1234", LETTER),
+        # The same text at another site is not a duplicate.
+        ("other_site.pdf", "5678", full),
+    ])
+
+    assert reconcile_duplicates(log_path, output_dir) == 2
+
+    with open(log_path, newline="", encoding="utf-8") as f:
+        rows = {row["Original_Filename"]: row for row in csv.DictReader(f)}
+    keeper = rows["full.pdf"]["New_Filename"]
+    for name in ("revised.pdf", "rescan.pdf"):
+        row = rows[name]
+        assert row["Duplicate"] == "yes"
+        assert row["Duplicate_File"] == keeper
+        assert "-DUP" in row["New_Filename"]
+        assert (output_dir / "1234" / row["New_Filename"]).is_file()
+    for name in ("full.pdf", "excerpt.pdf", "letter.pdf", "other_site.pdf"):
+        assert rows[name]["Duplicate"] == "no"
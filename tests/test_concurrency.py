@@ -0,0 +1,22 @@
+import threading
+
+from utils.concurrency import OrderedTurnstile
+
+
+def test_turnstile_admits_workers_in_index_order():
+    turnstile = OrderedTurnstile()
+    entered = []
+
+    def worker(index):
+        turnstile.wait(index)
+        entered.append(index)
+        turnstile.done(index)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in reversed(range(1, 12))]
+    for thread in threads:
+        thread.start()
+    # Index 0 failed before reaching the critical section: its done() alone must release the others.
+    turnstile.done(0)
+    for thread in threads:
+        thread.join(timeout=5)
+    assert entered == list(range(1, 12))
@@ -0,0 +1,109 @@
+import asyncio
+from collections import defaultdict
+from pathlib import Path
+
+import pytest
+
+from utils import llm_interface
+from utils.llm_interface import (FIELD_LENGTHS, _reprompt_parts, field_is_well_formed, reprompt_fields_concurrently,
+                                 validate_and_reprompt_field)
+from utils.retry_policy import RetryPolicy
+
+PROMPTS = Path(__file__).resolve().parent.parent / "prompts"
+REPROMPT_PATHS = {field: PROMPTS / f"{field}_reprompt.txt" for field in FIELD_LENGTHS}
+TEXT = ("Stage 1 Preliminary Site Investigation, 212 Avenue, Richmond. Prepared for Ministry of Environment "
+        "by Acme Consulting Ltd. Site 1234.")
+FIRST_PASS = {"site_id": "1234", "title": "Phase II Assessment", "sender": "Unknown Engineering",
+              "receiver": "City Council", "address": "212 Avenue", "readable": "yes"}
+# Successive answers to each field's re-prompt: title is fixed on the first retry, sender on the
+# third, and receiver never.
+ANSWERS = {
+    "title": ["Stage 1 Preliminary Site Investigation"],
+    "sender": ["Acme Engineering", "Consulting Group", "Acme Consulting Ltd"],
+    "receiver": ["City Council"] * 10,
+}
+
+
+class StubLLM:
+    # Answers each field's re-prompt from ANSWERS, recognising the field by its system prompt.
+
+    def __init__(self):
+        self.fields = {_reprompt_parts(path, TEXT, None)[0]: field for field, path in REPROMPT_PATHS.items()}
+        self.calls = defaultdict(int)
+        self.in_flight = 0
+        self.overlap = 0
+
+    def answer(self, messages):
+        field = self.fields[messages[0]["content"]]
+        answers = ANSWERS[field]
+        self.calls[field] += 1
+        return answers[min(self.calls[field], len(answers)) - 1]
+
+    def chat(self, model, messages, options=None, fresh=False, format=None):
+        return self.answer(messages)
+
+    async def achat(self, client, model, messages, options=None, fresh=False, format=None):
+        self.in_flight += 1
+        self.overlap = max(self.overlap, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return self.answer(messages)
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    stub = StubLLM()
+    monkeypatch.setattr(llm_interface, "_chat", stub.chat)
+    monkeypatch.setattr(llm_interface, "_achat", stub.achat)
+    return stub
+
+
+def validators():
+    # As in main.llm_stage: a "none" title, sender or receiver is accepted as-is.
+    return {field: (lambda value, length=length: value.strip().lower() == "none" or
+                    field_is_well_formed(value, TEXT, length=length), REPROMPT_PATHS[field])
+            for field, length in FIELD_LENGTHS.items()}
+
+
+def per_field(budget=None):
+    metadata, flagged = dict(FIRST_PASS), defaultdict(list)
+    for field, length in FIELD_LENGTHS.items():
+        validate_and_reprompt_field(field, length, REPROMPT_PATHS[field], metadata, TEXT, "a.pdf", flagged,
+                                    max_retries=5, budget=budget)
+    return metadata, flagged["a.pdf"]
+
+
+def concurrent(budget=None):
+    metadata = dict(FIRST_PASS)
+    still_invalid = reprompt_fields_concurrently(validators(), metadata, TEXT, max_retries=5, model="mistral",
+                                                 budget=budget)
+    return metadata, still_invalid
+
+
+def test_concurrent_reprompts_give_the_same_fields_as_per_field_mode(llm):
+    expected = per_field()
+    assert expected == (dict(FIRST_PASS, title="Stage 1 Preliminary Site Investigation",
+                             sender="Acme Consulting Ltd"), ["receiver"])
+    sequential_calls = dict(llm.calls)
+    assert sequential_calls == {"title": 1, "sender": 3, "receiver": 5}
+
+    llm.calls.clear()
+    assert concurrent() == expected
+    assert dict(llm.calls) == sequential_calls
+    # The three fields' loops ran at the same time.
+    assert llm.overlap == 3
+
+
+def test_document_budget_caps_calls_across_coroutines(llm):
+    budget = RetryPolicy(max_calls_per_document=4, document_deadline=None).start_document("a.pdf")
+    metadata, still_invalid = concurrent(budget)
+    assert sum(llm.calls.values()) == budget.calls == 4
+    assert "per-document limit of 4" in budget.exhausted_reason
+    assert "receiver" in still_invalid and metadata["title"] == "Stage 1 Preliminary Site Investigation"
+
+    # A run limit shared with another document caps them together.
+    llm.calls.clear()
+    policy = RetryPolicy(max_calls_per_document=None, max_calls_per_run=6, document_deadline=None)
+    concurrent(policy.start_document("a.pdf"))
+    concurrent(policy.start_document("b.pdf"))
+    assert sum(llm.calls.values()) == policy.calls == 6
@@ -0,0 +1,84 @@
+from utils.context_builder import GAP, _score_span, build_context, estimate_tokens
+
+FILLER = "Paragraph {} describes the regional geology, climate and drainage in general terms."
+HEADER = "Acme Consulting Ltd Project 4471 Page"
+CUES = {
+    1: "Re: Stage 1 Preliminary Site Investigation, Site ID 1234.",
+    3: "The property is located at 212 Main Street, Richmond V6X 1A1.",
+    5: "Yours truly, Jane Doe, Acme Consulting Ltd.",
+}
+
+
+def document(pages=6, fillers=12):
+    # Pages of neutral prose under a running header; a few pages also carry a field cue halfway down.
+    text = []
+    for page in range(pages):
+        sentences = [f"{HEADER} {page + 1}."] + [FILLER.format(page * 100 + i) for i in range(fillers)]
+        if page in CUES:
+            sentences.insert(fillers // 2, CUES[page])
+        text.append(" ".join(sentences))
+    return text
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_short_documents_are_kept_whole():
+    pages = [" First page. ", "", "Second page."]
+    assert build_context(pages, 1000) == "First page. Second page."
+    assert build_context("Whole text as one page.", 1000) == "Whole text as one page."
+    assert build_context(document(), None) == " ".join(document())
+
+
+def test_field_cues_outscore_plain_prose():
+    plain = _score_span(FILLER.format(1), 2, 5)
+    for cue in CUES.values():
+        assert _score_span(cue, 2, 5) > plain
+    assert _score_span("Dear Sir or Madam,", 2, 5) > plain
+    assert _score_span("From: Regional Manager", 2, 5) > plain
+    # Subject lines and site IDs weigh more than a document-type word.
+    assert _score_span("Re: Site ID 1234", 2, 5) > _score_span("Certificate", 2, 5)
+
+
+def test_position_bonus_and_table_penalty():
+    span = FILLER.format(1)
+    assert _score_span(span, 0, 0) > _score_span(span, 0, 1) > _score_span(span, 0, 2) > _score_span(span, 3, 2)
+    table = "BH1-1 0.5 2019 250 250 0.005 0.02 0.01 0.05 Site ID"
+    assert _score_span(table, 2, 5) < _score_span("Site ID", 2, 5)
+
+
+def test_budget_keeps_the_cue_spans_in_document_order():
+    pages = document()
+    context = build_context(pages, 120)
+
+    assert estimate_tokens(context) <= 120
+    assert estimate_tokens(" ".join(pages)) > 5 * 120
+    positions = [context.index(cue) for cue in CUES.values()]
+    assert positions == sorted(positions)
+    # The top of the first page is kept; left-out text is marked.
+    assert context.startswith(f"{HEADER} 1.")
+    assert GAP in context
+    # Plain spans of later pages are left out.
+    assert f"{HEADER} 4." not in context
+
+
+def test_repeated_spans_are_kept_once():
+    letter = "Dear Sir or Madam, the ministry acknowledges receipt of your application."
+    fillers = [FILLER.format(i) for i in range(30)]
+    context = build_context(" ".join([letter] + fillers + [letter]), 80)
+    assert context.count(letter) == 1
+
+    # Spans found on several pages are running headers or footers, not worth the budget.
+    pages = [" ".join([letter] + [FILLER.format(page * 100 + i) for i in range(10)]) for page in range(4)]
+    assert letter not in build_context(pages, 80)
+
+
+def test_tighter_budget_keeps_the_strongest_cues():
+    pages = document()
+    context = build_context(pages, 30)
+    assert estimate_tokens(context) <= 30
+    assert CUES[1] in context
+    assert FILLER.format(205) not in context
@@ -0,0 +1,185 @@
+import random
+from pathlib import Path
+
+import fitz
+import numpy as np
+import pytest
+
+from utils import metadata_extractor
+from utils.dedup_index import NearDuplicateIndex
+from utils.metadata_extractor import check_duplicate_by_rouge, close_dedup_index, open_dedup_index
+
+WORDS = ("soil groundwater borehole monitoring well sample hydrocarbon metals arsenic lead zinc copper "
+         "benzene toluene vapour sediment excavation remediation compliance certificate ministry officer "
+         "property parcel lot plan survey historical fuel tank pipeline drum landfill fill material gravel "
+         "clay silt sand bedrock aquifer depth elevation gradient plume delineation standard industrial "
+         "residential commercial park lane avenue street road river creek harbour dock rail yard").split()
+
+
+def document_text(seed, length=220):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) + str(rng.randrange(40)) for _ in range(length))
+
+
+def write_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page().insert_textbox(fitz.Rect(40, 40, 560, 800), text, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "index.sqlite")
+    yield index
+    index.close()
+
+
+def test_signature_estimates_jaccard_similarity(index):
+    text = document_text(1)
+    tokens = text.split()
+    edited = " ".join(tokens[:180] + ["different"] * 40)
+
+    assert index.signature(text).dtype == np.uint32
+    assert len(index.signature(text)) == index.num_perm
+    assert np.array_equal(index.signature(text), index.signature(text.upper()))
+    assert index.signature(" ,. ") is None
+
+    exact = len(set(tokens[:180] + ["different"]) & set(tokens)) / len(set(tokens[:180] + ["different"]) | set(tokens))
+    estimate = float(np.mean(index.signature(text) == index.signature(edited)))
+    assert abs(estimate - exact) < 0.15
+    assert float(np.mean(index.signature(text) == index.signature(document_text(2)))) < 0.2
+
+
+def test_bands_must_divide_permutations(tmp_path):
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(tmp_path / "index.sqlite", num_perm=128, bands=60)
+
+
+def test_candidates_share_a_band_and_are_ranked(index):
+    site = "site"
+    text = document_text(1)
+    revised = text.replace("soil", "fill")
+    for name, body in (("a.pdf", text), ("b.pdf", revised), ("c.pdf", document_text(2))):
+        index.add(site, name, index.signature(body))
+
+    candidates = index.candidates(site, index.signature(text))
+    assert [path.name for path, _ in candidates] == ["a.pdf", "b.pdf"]
+    assert candidates[0][1] == 1.0 > candidates[1][1]
+    assert index.candidates(site, index.signature(text), limit=1) == candidates[:1]
+    assert index.candidates(site, index.signature(text), min_similarity=1.0) == candidates[:1]
+    # Other sites are separate partitions.
+    assert index.candidates("other", index.signature(text)) == []
+
+    # A document sharing no band bucket is never a candidate, whatever its overall similarity.
+    signature = index.signature(text)
+    disjoint = signature.copy()
+    disjoint[::index.rows] += 1
+    assert all(key not in index._buckets[site] for key in index._band_keys(disjoint))
+    assert index.candidates(site, disjoint, min_similarity=0.0) == []
+
+
+def test_index_survives_a_reopen(tmp_path):
+    path = tmp_path / "index.sqlite"
+    index = NearDuplicateIndex(path)
+    signature = index.signature(document_text(1))
+    index.add("site", "a.pdf", signature, file_hash="f" * 64, text_hash="t" * 64, text_length=123)
+    index.add("site", "b.pdf", index.signature(document_text(2)))
+    index.move("site", "b.pdf", "renamed.pdf")
+    index.mark_site_indexed("site")
+    index.close()
+
+    reopened = NearDuplicateIndex(path)
+    try:
+        assert reopened.has_site("site") and not reopened.has_site("other")
+        assert reopened.site_size("site") == 2
+        assert [path.name for path, _ in reopened.candidates("site", signature)] == ["a.pdf"]
+        assert reopened.find_exact("site", file_hash="f" * 64) == (Path("a.pdf"), 123)
+        assert reopened.find_exact("site", text_hash="t" * 64)[0].name == "a.pdf"
+        assert reopened.find_exact("site", file_hash="0" * 64) is None
+        reopened.remove("site", "a.pdf")
+    finally:
+        reopened.close()
+
+    reopened = NearDuplicateIndex(path)
+    try:
+        assert reopened.site_size("site") == 1
+        assert reopened.find_exact("site", file_hash="f" * 64) is None
+        assert reopened.candidates("site", index.signature(document_text(2)))[0][0].name == "renamed.pdf"
+    finally:
+        reopened.close()
+
+
+@pytest.fixture
+def site(tmp_path):
+    # An organized site of unrelated documents, and incoming documents that do or don't duplicate one of them.
+    site_dir = tmp_path / "output" / "1234"
+    site_dir.mkdir(parents=True)
+    for seed in range(8):
+        write_pdf(site_dir / f"2020-01-01 - 1234 - REPORT_{seed}.pdf", document_text(seed))
+    incoming = tmp_path / "input"
+    incoming.mkdir()
+    tokens = document_text(3).split()
+    queries = {
+        "revised": " ".join(tokens[:200] + ["addendum"] * 10),
+        "truncated": " ".join(tokens[:190]),
+        "rescan": document_text(5).replace("soil", "s0il").replace("well", "wel1"),
+        "unrelated": document_text(99),
+    }
+    for name, text in queries.items():
+        write_pdf(incoming / f"1234 {name}.pdf", text)
+    yield site_dir, incoming, queries
+    close_dedup_index()
+
+
+def check_all(site_dir, incoming, queries):
+    results = {}
+    for name in queries:
+        status, match, shorter, score = check_duplicate_by_rouge(incoming / f"1234 {name}.pdf", "1234", site_dir)
+        results[name] = (status, match and match.name, shorter, round(score, 6))
+    return results
+
+
+def test_indexed_and_full_scan_find_the_same_duplicates(tmp_path, site):
+    site_dir, incoming, queries = site
+    full_scan = check_all(site_dir, incoming, queries)
+    assert full_scan["revised"][:2] == ("contained", "2020-01-01 - 1234 - REPORT_3.pdf")
+    assert full_scan["truncated"][:2] == ("contained", "2020-01-01 - 1234 - REPORT_3.pdf")
+    assert full_scan["rescan"][1] == "2020-01-01 - 1234 - REPORT_5.pdf"
+    assert full_scan["unrelated"][0] == "no"
+
+    # full_scan_below=0: candidates always come from the LSH index.
+    open_dedup_index(tmp_path / "index.sqlite", full_scan_below=0)
+    assert check_all(site_dir, incoming, queries) == full_scan
+    assert metadata_extractor._dedup_index.site_size(str(site_dir.resolve())) == 8
+
+
+def test_small_sites_are_scanned_in_full(tmp_path, site, monkeypatch):
+    site_dir, incoming, queries = site
+    open_dedup_index(tmp_path / "index.sqlite", min_similarity=1.0, full_scan_below=20)
+    scanned = []
+    monkeypatch.setattr(metadata_extractor, "_index_candidates", lambda *args: scanned.append(args) or [])
+
+    # The candidate cutoff would drop every near-duplicate, but 8 documents are below full_scan_below.
+    assert check_all(site_dir, incoming, queries)["revised"][0] == "contained"
+    assert scanned == []
+
+    metadata_extractor._dedup_candidates["full_scan_below"] = 8
+    assert check_all(site_dir, incoming, queries)["revised"][0] == "no"
+    assert len(scanned) == len(queries)
+
+
+@pytest.mark.parametrize("candidates", [True, False])
+def test_exact_copies_are_found_by_hash(tmp_path, site, candidates):
+    site_dir, incoming, queries = site
+    original = site_dir / "2020-01-01 - 1234 - REPORT_3.pdf"
+    copy = incoming / "1234 copy.pdf"
+    copy.write_bytes(original.read_bytes())
+    open_dedup_index(tmp_path / "index.sqlite", candidates=candidates)
+
+    assert check_duplicate_by_rouge(copy, "1234", site_dir) == ("exact", original, True, 1.0)
+    # Same text in a different file: found by the normalised-text hash.
+    write_pdf(incoming / "1234 resaved.pdf", document_text(3).upper())
+    assert check_duplicate_by_rouge(incoming / "1234 resaved.pdf", "1234", site_dir)[:2] == ("exact", original)
+    # Near-duplicates still go through the ROUGE comparison.
+    assert check_duplicate_by_rouge(incoming / "1234 revised.pdf", "1234", site_dir)[:2] == ("contained", original)
@@ -0,0 +1,108 @@
+import itertools
+import os
+import types
+import zlib
+
+import fitz
+import pytest
+
+from utils import cache as cache_module
+from utils import loader
+from utils.cache import DiskCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Strictly increasing access times, so LRU order doesn't depend on the clock resolution.
+    ticks = itertools.count(1)
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def test_round_trip_and_reopen(tmp_path, clock):
+    path = tmp_path / "cache.sqlite"
+    cache = DiskCache(path, 10 ** 6)
+    cache.put("bytes", b"\x00\xffraw")
+    cache.put_json("json", {"clean": ["page one", "page two"], "complete": True})
+    cache.put("bytes", b"replaced")
+
+    assert cache.get("bytes") == b"replaced"
+    assert cache.get_json("json") == {"clean": ["page one", "page two"], "complete": True}
+    assert cache.get("missing") is None and cache.get_json("missing") is None
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 2
+    size = cache.stats()["bytes"]
+    cache.close()
+
+    reopened = DiskCache(path, 10 ** 6)
+    try:
+        assert reopened.get("bytes") == b"replaced"
+        assert reopened.stats()["bytes"] == size
+    finally:
+        reopened.close()
+
+
+def test_values_are_stored_compressed(tmp_path):
+    cache = DiskCache(tmp_path / "cache.sqlite", 10 ** 6)
+    value = b"Stage 1 Preliminary Site Investigation. " * 200
+    cache.put("page", value)
+    (blob, size), = cache._conn.execute("SELECT value, size FROM entries").fetchall()
+    cache.close()
+
+    assert size == len(blob) < len(value) / 10
+    assert cache.stats()["bytes"] == size
+    assert zlib.decompress(blob) == value
+
+
+def test_least_recently_used_entries_are_evicted_over_the_cap(tmp_path, clock):
+    # Incompressible values of ~1 kB: the cap holds four of them.
+    values = {key: os.urandom(1000) for key in "abcdef"}
+    cache = DiskCache(tmp_path / "cache.sqlite", 4500)
+    for key in "abcd":
+        cache.put(key, values[key])
+    assert cache.stats()["evictions"] == 0
+    cache.get("a")  # "b" is now the least recently used entry
+
+    cache.put("e", values["e"])
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acde"] == [values[key] for key in "acde"]
+
+    # Reading "acde" above made "a" the least recently used. Evictions go down to 90% of the cap.
+    cache.put("f", values["f"])
+    assert cache.stats()["bytes"] <= 0.9 * 4500
+    assert cache.get("a") is None and cache.get("f") == values["f"]
+    assert cache.stats()["evictions"] == 2
+    cache.close()
+
+
+def write_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(path)
+    doc.close()
+
+
+@pytest.fixture
+def page_cache(tmp_path):
+    loader.open_page_cache(tmp_path / "pages.sqlite", 10 ** 6)
+    yield loader._page_cache
+    loader.close_page_cache()
+
+
+def test_page_cache_is_keyed_by_file_content(tmp_path, page_cache, monkeypatch):
+    pdf = tmp_path / "report.pdf"
+    write_pdf(pdf, ["Stage 1 site investigation", "Borehole logs"])
+    assert loader.extract_clean_pages(pdf) == ["Stage 1 site investigation", "Borehole logs"]
+    assert page_cache.get_json(f"pages:{loader.file_sha256(pdf)}")["clean"] == loader.extract_clean_pages(pdf)
+
+    # A copy under another name is served from the cache without opening the PDF.
+    copy = tmp_path / "copy.pdf"
+    copy.write_bytes(pdf.read_bytes())
+    monkeypatch.setattr(loader, "_extract_pages", lambda *args: pytest.fail("extracted a cached file"))
+    assert loader.extract_clean_pages(copy) == ["Stage 1 site investigation", "Borehole logs"]
+    assert [pages for _, pages, _ in loader.iter_clean_pages_batch([copy])] == [
+        ["Stage 1 site investigation", "Borehole logs"]]
+    monkeypatch.undo()
+
+    # Changed content is a different key.
+    write_pdf(pdf, ["Certificate of compliance"])
+    assert loader.extract_clean_pages(pdf) == ["Certificate of compliance"]
@@ -0,0 +1,35 @@
+import pytest
+
+from utils.field_verifier import disable_fuzzy_matching, enable_fuzzy_matching, field_words_in_text
+
+TEXT = ("Re: Stage 2 Preliminary Site Investigation, 212 Avenue. Prepared for the Ministry of Envlronment "
+        "by GreenTech Environmental Inc.")
+
+
+@pytest.fixture(autouse=True)
+def exact_matching():
+    disable_fuzzy_matching()
+    yield
+    disable_fuzzy_matching()
+
+
+@pytest.mark.parametrize("field, expected", [
+    ("Stage 2 Preliminary Site Investigation", True),
+    # Punctuation and digits are ignored, case does not matter.
+    ("re: stage 3 preliminary site investigation.", True),
+    ("GreenTech Environmental, Inc", True),
+    ("Detailed Site Investigation", False),
+    ("", False),
+    ("2020", False),
+])
+def test_exact_matching(field, expected):
+    assert field_words_in_text(field, TEXT) is expected
+
+
+def test_fuzzy_matching_accepts_ocr_errors_only_when_enabled():
+    assert not field_words_in_text("Ministry of Environment", TEXT)
+    enable_fuzzy_matching(90)
+    assert field_words_in_text("Ministry of Environment", TEXT)
+    # Words missing from the document are still rejected.
+    assert not field_words_in_text("Ministry of Envlronment at", TEXT)
+    assert not field_words_in_text("Ministry of Agriculture", TEXT)
@@ -0,0 +1,39 @@
+import pytest
+
+from utils.llm_interface import METADATA_KEYS, keys_are_well_formed, parse_llm_json, repair_metadata
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('{"title": "Site Report", "site_id": "1234"}', {"title": "Site Report", "site_id": "1234"}),
+    # Prose and code fences around the object.
+    ('Here is the JSON:\n```json\n{"title": "Site Report"}\n```\nLet me know!', {"title": "Site Report"}),
+    # A Python-style dict with single quotes is read as a literal, never evaluated.
+    ("{'title': 'Site Report', 'readable': 'yes'}", {"title": "Site Report", "readable": "yes"}),
+    # A truncated object keeps its complete fields.
+    ('{"title": "Phase II \\"ESA\\"", "sender": "Roger Kim", "receiver": "Geo',
+     {"title": 'Phase II "ESA"', "sender": "Roger Kim"}),
+])
+def test_parse_llm_json_recovers_objects(raw, expected):
+    assert parse_llm_json(raw) == expected
+
+
+@pytest.mark.parametrize("raw", ["", "I could not read this document.", "[1, 2, 3]",
+                                 "__import__('os').system('true')"])
+def test_parse_llm_json_rejects_non_objects(raw):
+    assert parse_llm_json(raw) is None
+
+
+def test_repair_metadata_normalises_a_partial_answer():
+    parsed = {" Title ": "Site Report", "SENDER": None, "receiver": ["Jane Doe", None, "Ministry"],
+              "site_id": 1234, "readable": "", "notes": "dropped"}
+    metadata = repair_metadata(parsed)
+    assert metadata == {"site_id": "1234", "title": "Site Report", "receiver": "Jane Doe, Ministry",
+                        "sender": "none", "address": "none", "readable": "none"}
+    assert list(metadata) == list(METADATA_KEYS)
+    assert keys_are_well_formed(metadata)
+
+
+def test_repair_metadata_of_truncated_output():
+    metadata = repair_metadata(parse_llm_json('{"site_id": "0412", "title": "Re: Phase II'))
+    assert metadata["site_id"] == "0412"
+    assert all(metadata[key] == "none" for key in METADATA_KEYS if key != "site_id")
@@ -0,0 +1,180 @@
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import llm_stand_in
+from utils import llm_interface
+from utils.llm_interface import LLMSession, LLMUnavailableError, _LLMTraffic, _OllamaHost, _response_key
+
+MODEL = "stand-in"
+
+
+def messages(index):
+    return [{"role": "user", "content": f"prompt {index}"}]
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    # Recorded answers for prompts 0..59, each taking `latency` seconds when replayed.
+    def record(latency=0.0):
+        for index in range(60):
+            digest = _response_key(MODEL, messages(index), None, None).split(":", 1)[1]
+            exchange = {"response": {"model": MODEL, "message": {"role": "assistant", "content": f"answer {index}"},
+                                     "done": True}, "latency": latency}
+            (tmp_path / f"{digest}-000.json").write_text(json.dumps(exchange), encoding="utf-8")
+        return tmp_path
+    return record
+
+
+class StandIns:
+    # llm_stand_in servers on free local ports, each replaying the recorded directory on its own.
+
+    def __init__(self, directory, count, parallel=4):
+        self.directory = directory
+        self.parallel = parallel
+        self.servers = [self._serve(0) for _ in range(count)]
+
+    def _serve(self, port):
+        handler = llm_stand_in.make_handler(_LLMTraffic(self.directory, "replay", latency_scale=1.0), self.parallel)
+        server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        return server
+
+    @property
+    def hosts(self):
+        return [f"127.0.0.1:{server.server_address[1]}" for server in self.servers]
+
+    def kill(self, index):
+        self.servers[index].shutdown()
+        self.servers[index].server_close()
+
+    def restart(self, index):
+        self.servers[index] = self._serve(self.servers[index].server_address[1])
+
+    def close(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+
+@pytest.fixture
+def stand_ins(recorded):
+    started = []
+
+    def start(count, latency=0.0, parallel=4):
+        started.append(StandIns(recorded(latency), count, parallel))
+        return started[-1]
+    yield start
+    for group in started:
+        group.close()
+
+
+def answer(session, index):
+    return session.chat(MODEL, messages(index))["message"]["content"]
+
+
+def test_requests_go_to_the_least_loaded_host(stand_ins):
+    servers = stand_ins(3)
+    session = LLMSession(servers.hosts)
+    try:
+        assert [answer(session, index) for index in range(9)] == [f"answer {index}" for index in range(9)]
+        assert [host.calls for host in session.hosts] == [3, 3, 3]
+    finally:
+        session.close()
+
+
+def test_concurrency_cap_per_host(stand_ins, monkeypatch):
+    servers = stand_ins(2, latency=0.05)
+    peaks = {}
+    begin = _OllamaHost.begin
+
+    def recording_begin(host):
+        begin(host)
+        peaks[host.url] = max(peaks.get(host.url, 0), host.outstanding)
+
+    monkeypatch.setattr(_OllamaHost, "begin", recording_begin)
+    session = LLMSession(servers.hosts, max_concurrency=2)
+    try:
+        results = {}
+        threads = [threading.Thread(target=lambda index=index: results.update({index: answer(session, index)}))
+                   for index in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == {index: f"answer {index}" for index in range(12)}
+        assert peaks == {host.url: 2 for host in session.hosts}
+        first, second = (host.calls for host in session.hosts)
+        assert first + second == 12 and abs(first - second) <= 2
+    finally:
+        session.close()
+
+
+def test_host_killed_mid_run_fails_over(stand_ins):
+    servers = stand_ins(3)
+    session = LLMSession(servers.hosts, failure_threshold=1, reset_after=60)
+    try:
+        first = [answer(session, index) for index in range(3)]
+        servers.kill(0)
+        rest = [answer(session, index) for index in range(3, 12)]
+        assert first + rest == [f"answer {index}" for index in range(12)]
+
+        dead, *alive = session.hosts
+        # One request reached the dead host, failed and was answered by another host.
+        assert (dead.calls, dead.failures, dead.trips) == (2, 1, 1)
+        assert sum(host.calls for host in alive) == 11
+        assert all(host.failures == 0 for host in alive)
+    finally:
+        session.close()
+
+
+def test_circuit_breaker_opens_half_opens_and_closes(stand_ins):
+    servers = stand_ins(2)
+    session = LLMSession(servers.hosts, failure_threshold=1, reset_after=0.3)
+    first, second = session.hosts
+    try:
+        servers.kill(0)
+        assert answer(session, 0) == "answer 0"
+        assert first.opened_at is not None
+
+        # Open: every request goes to the other host.
+        assert [answer(session, index) for index in range(1, 4)] == ["answer 1", "answer 2", "answer 3"]
+        assert (first.calls, second.calls) == (1, 4)
+
+        # Half-open after reset_after: one trial request reaches the restarted host and closes the breaker.
+        servers.restart(0)
+        time.sleep(0.35)
+        assert answer(session, 4) == "answer 4"
+        assert first.calls == 2
+        assert first.opened_at is None
+        assert first.trips == 1
+    finally:
+        session.close()
+
+
+def test_all_hosts_down_raises_without_waiting(stand_ins):
+    servers = stand_ins(2)
+    session = LLMSession(servers.hosts, failure_threshold=1, reset_after=60)
+    try:
+        servers.kill(0)
+        servers.kill(1)
+        with pytest.raises(Exception):
+            answer(session, 0)
+        start = time.monotonic()
+        with pytest.raises(LLMUnavailableError):
+            answer(session, 1)
+        assert time.monotonic() - start < 0.5
+        assert session.rejected == 1
+    finally:
+        session.close()
+
+
+def test_open_llm_session_refuses_to_start_without_a_healthy_host(stand_ins):
+    servers = stand_ins(1)
+    servers.kill(0)
+    with pytest.raises(LLMUnavailableError):
+        llm_interface.open_llm_session(servers.hosts, warm_up=False)
+    assert llm_interface._session is None
@@ -0,0 +1,93 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import llm_stand_in
+from utils import llm_interface
+from utils.llm_interface import (_LLMTraffic, _response_key, close_llm_session, close_llm_traffic,
+                                 llm_single_field_query, metadata_schema, open_llm_session, open_llm_traffic,
+                                 query_llm)
+
+MODEL = "stand-in"
+METADATA = {"site_id": "1234", "title": "Stage 1 PSI", "receiver": "none", "sender": "Acme Consulting",
+            "address": "212 Avenue", "readable": "yes"}
+
+
+def write_exchange(directory, messages, content, format=None, occurrence=0):
+    digest = _response_key(MODEL, messages, None, format).split(":", 1)[1]
+    exchange = {"response": {"model": MODEL, "message": {"role": "assistant", "content": content}, "done": True},
+                "latency": 0.0}
+    (directory / f"{digest}-{occurrence:03d}.json").write_text(json.dumps(exchange), encoding="utf-8")
+
+
+@pytest.fixture
+def stand_in(tmp_path):
+    # A stand-in Ollama host answering a metadata query and a single-field query asked twice.
+    served = tmp_path / "served"
+    served.mkdir()
+    write_exchange(served, [{"role": "user", "content": "Extract the metadata"}], json.dumps(METADATA),
+                   format=metadata_schema())
+    write_exchange(served, [{"role": "user", "content": "Site ID?"}], "1234")
+    write_exchange(served, [{"role": "user", "content": "Site ID?"}], "Site 1234", occurrence=1)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), llm_stand_in.make_handler(_LLMTraffic(served, "replay"), 4))
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def run_session():
+    return [query_llm("Extract the metadata", model=MODEL),
+            llm_single_field_query("Site ID?", model=MODEL),
+            llm_single_field_query("Site ID?", model=MODEL, fresh=True)]
+
+
+def test_replay_without_a_server_gives_the_recorded_outputs(tmp_path, stand_in, monkeypatch):
+    recorded = tmp_path / "recorded"
+    open_llm_session([f"127.0.0.1:{stand_in.server_address[1]}"], warm_up=False)
+    open_llm_traffic(recorded, "record")
+    try:
+        outputs = run_session()
+    finally:
+        close_llm_traffic()
+        close_llm_session()
+    assert outputs == [METADATA, "1234", "Site 1234"]
+    assert len(list(recorded.glob("*.json"))) == 3
+
+    stand_in.shutdown()
+    stand_in.server_close()
+    monkeypatch.setattr(llm_interface, "_send_chat", lambda *args: pytest.fail("replay reached the network"))
+    open_llm_traffic(recorded, "replay")
+    try:
+        assert run_session() == outputs
+        assert llm_interface._traffic.exchanges == 3
+    finally:
+        close_llm_traffic()
+
+
+def test_replay_miss_raises_without_a_request(tmp_path, monkeypatch):
+    recorded = tmp_path / "recorded"
+    recorded.mkdir()
+    write_exchange(recorded, [{"role": "user", "content": "Site ID?"}], "1234")
+    monkeypatch.setattr(llm_interface, "_send_chat", lambda *args: pytest.fail("replay reached the network"))
+    open_llm_traffic(recorded, "replay")
+    try:
+        assert llm_single_field_query("Site ID?", model=MODEL) == "1234"
+        # Another prompt, and a repeat beyond the recorded occurrences, were never recorded.
+        with pytest.raises(LookupError):
+            llm_single_field_query("Title?", model=MODEL)
+        with pytest.raises(LookupError):
+            llm_single_field_query("Site ID?", model=MODEL)
+        assert llm_interface._traffic.missing == 2
+    finally:
+        close_llm_traffic()
+
+
+def test_replay_needs_a_recorded_directory(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        open_llm_traffic(tmp_path / "missing", "replay")
+    with pytest.raises(ValueError):
+        open_llm_traffic(tmp_path, "rewind")
@@ -0,0 +1,63 @@
+import fitz
+import pytest
+
+from utils import loader
+from utils.document_context import DocumentContext
+from utils.loader import document_pages, extract_clean_pages
+
+
+def page_text(number):
+    return f"Soil samples from borehole BH{number} exceeded the industrial standards for petroleum hydrocarbons. " * 4
+
+
+@pytest.fixture
+def report(tmp_path):
+    # A ten-page report whose pages each clean to the same number of characters.
+    path = tmp_path / "report.pdf"
+    doc = fitz.open()
+    for number in range(10):
+        doc.new_page().insert_textbox(fitz.Rect(40, 40, 560, 800), page_text(number), fontsize=9)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+@pytest.fixture
+def pages_read(monkeypatch):
+    # Numbers of the pages whose text PyMuPDF was asked for, in order.
+    read = []
+    get_text = fitz.Page.get_text
+
+    def recording_get_text(page, *args, **kwargs):
+        read.append(page.number)
+        return get_text(page, *args, **kwargs)
+
+    monkeypatch.setattr(fitz.Page, "get_text", recording_get_text)
+    return read
+
+
+def test_extraction_stops_at_the_character_budget(report, pages_read):
+    page_chars = len(loader.clean_ocr_text(page_text(0)))
+    pages = extract_clean_pages(report, max_chars=2 * page_chars + 1)
+    # The page that reaches the budget is the last one read.
+    assert len(pages) == 3
+    assert pages_read == [0, 1, 2]
+
+
+def test_extraction_stops_at_the_page_budget(report, pages_read):
+    assert len(extract_clean_pages(report, max_pages=4)) == 4
+    assert pages_read == [0, 1, 2, 3]
+
+
+def test_a_larger_budget_reads_only_the_remaining_pages(report, pages_read):
+    memo = document_pages(report)
+    assert len(extract_clean_pages(report, max_pages=2, pages=memo)) == 2
+    assert len(extract_clean_pages(report, pages=memo)) == 10
+    assert pages_read == list(range(10))
+
+
+def test_document_context_extracts_within_the_budget(report, pages_read):
+    document = DocumentContext(report)
+    page_chars = len(loader.clean_ocr_text(page_text(0)))
+    assert len(document.pages(max_pages=8, max_chars=page_chars)) == 1
+    assert pages_read == [0]
@@ -0,0 +1,82 @@
+import pytest
+
+from utils.metadata_rules import (BOUNDED_CONFIDENCE, CONFLICT_CONFIDENCE, UNBOUNDED_CONFIDENCE, extract_rule_fields,
+                                  fields_to_ask, restrict_prompt, rule_prefill)
+
+MEMO = ("MEMORANDUM To: Ministry of Environment From: Acme Consulting Ltd Date: 2019-03-12 "
+        "Re: Stage 1 Preliminary Site Investigation Site ID: 1234 "
+        "The property located at 212 Main Street, Richmond was investigated in March 2019.")
+
+
+def test_labelled_header_fields():
+    assert extract_rule_fields(MEMO) == {
+        "site_id": ("1234", 0.95),
+        "title": ("Re: Stage 1 Preliminary Site Investigation", BOUNDED_CONFIDENCE),
+        "receiver": ("Ministry of Environment", BOUNDED_CONFIDENCE),
+        "sender": ("Acme Consulting Ltd", BOUNDED_CONFIDENCE),
+        "address": ("212 Main Street, Richmond", 0.85),
+    }
+
+
+@pytest.mark.parametrize("date", ["Date: 2019-03-12", "Date: 12/03/2019", "Date: 12.03.2019", "March 12, 2019",
+                                  "December 3 2019"])
+def test_dates_end_a_labelled_value(date):
+    fields = extract_rule_fields(f"To: Jane Doe, Regional Manager {date} From: John Smith {date} Dear Ms. Doe")
+    assert fields["receiver"] == ("Jane Doe, Regional Manager", BOUNDED_CONFIDENCE)
+    assert fields["sender"] == ("John Smith", BOUNDED_CONFIDENCE)
+
+
+@pytest.mark.parametrize("label, field", [("Attention:", "receiver"), ("Attn:", "receiver"), ("TO:", "receiver"),
+                                          ("FROM:", "sender"), ("Subject:", "title")])
+def test_sender_receiver_and_title_labels(label, field):
+    fields = extract_rule_fields(f"{label} Regional Manager, Victoria Dear Sir")
+    assert fields[field] == ("Regional Manager, Victoria", BOUNDED_CONFIDENCE)
+
+
+def test_title_keeps_its_re_prefix():
+    assert extract_rule_fields("RE: Certificate of Compliance Dear Sir")["title"][0] == "Re: Certificate of Compliance"
+
+
+def test_no_labels_no_fields():
+    assert extract_rule_fields("Soil samples were collected from six boreholes and submitted for analysis.") == {}
+    # A label with nothing after it gives nothing.
+    assert extract_rule_fields("To: From: Re:") == {}
+
+
+def test_cut_and_conflicting_values_get_a_low_confidence():
+    # No label ends the sender within its word limit.
+    sender = extract_rule_fields("From: " + " ".join(["Acme"] * 30))["sender"]
+    assert sender == (" ".join(["Acme"] * 12), UNBOUNDED_CONFIDENCE)
+    # Two different site IDs.
+    assert extract_rule_fields("Site ID: 1234 Site ID: 5678")["site_id"][1] == CONFLICT_CONFIDENCE
+    # A later "To:" that differs from the header's.
+    receiver = extract_rule_fields("To: Jane Doe Re: x To: John Smith Dear Sir")["receiver"]
+    assert receiver == ("Jane Doe", CONFLICT_CONFIDENCE)
+
+
+def test_prefill_keeps_confident_fields_that_validate():
+    assert rule_prefill(MEMO, 0.8) == {"site_id": "1234", "title": "Re: Stage 1 Preliminary Site Investigation",
+                                       "receiver": "Ministry of Environment", "sender": "Acme Consulting Ltd",
+                                       "address": "212 Main Street, Richmond"}
+    assert set(rule_prefill(MEMO, 0.9)) == {"site_id", "title", "receiver", "sender"}
+    # Over the sender word limit: left to the LLM.
+    assert "sender" not in rule_prefill("From: " + " ".join(["Acme"] * 17) + " Dear Sir", 0.8)
+
+
+def test_prefilled_fields_are_not_asked_of_the_llm():
+    prefilled = rule_prefill(MEMO.replace("Re: Stage 1 Preliminary Site Investigation ", ""), 0.8)
+    needed = fields_to_ask(prefilled)
+    assert needed == ["title"]
+
+    prompt, fields = restrict_prompt("Document text", needed)
+    assert fields == ["title", "readable"]
+    assert prompt.startswith("Only extract these attributes: title, readable. The others are already known.")
+    assert prompt.endswith("\n\nDocument text")
+    for field in prefilled:
+        assert field not in prompt.split("\n\n")[0]
+
+
+def test_site_id_is_only_asked_for_when_unknown():
+    assert fields_to_ask({}) == ["title", "receiver", "sender", "address", "site_id"]
+    assert fields_to_ask({}, site_id="1234") == ["title", "receiver", "sender", "address"]
+    assert fields_to_ask({"site_id": "1234", "address": "212 Main Street"}) == ["title", "receiver", "sender"]
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from utils import llm_interface
+from utils.llm_interface import (ModelCascade, cascade_query, close_model_cascade, metadata_is_usable,
+                                 open_model_cascade, query_llm)
+from utils.retry_policy import RetryPolicy
+
+TEXT = ("Stage 1 Preliminary Site Investigation, 212 Avenue, Richmond. Prepared for Ministry of Environment "
+        "by Acme Consulting Ltd. Site 1234.")
+VALID = {"site_id": "1234", "title": "Stage 1 Preliminary Site Investigation", "receiver": "Ministry of Environment",
+         "sender": "Acme Consulting Ltd", "address": "212 Avenue, Richmond", "readable": "yes"}
+
+
+@pytest.fixture
+def models(monkeypatch):
+    # Each model's raw answer, and the models asked, in order.
+    answers, asked = {}, []
+
+    def send_chat(model, messages, options, format):
+        asked.append(model)
+        return {"message": {"content": answers[model]}}
+
+    monkeypatch.setattr(llm_interface, "_send_chat", send_chat)
+    open_model_cascade(["small", "large"])
+    yield answers, asked
+    close_model_cascade()
+
+
+def run(budget=None):
+    return cascade_query(lambda model: query_llm("Extract the metadata", model=model),
+                         accept=lambda answer, final: metadata_is_usable(answer, TEXT, final), budget=budget)
+
+
+def stats():
+    return {model: (tier["calls"], tier["accepted"]) for model, tier in llm_interface._cascade._stats.items()}
+
+
+def test_valid_small_model_answer_is_not_escalated(models):
+    answers, asked = models
+    # "none" sender and receiver are not invalid.
+    answers["small"] = json.dumps(dict(VALID, receiver="none"))
+    assert run() == dict(VALID, receiver="none")
+    assert asked == ["small"]
+    assert stats() == {"small": (1, 1), "large": (0, 0)}
+
+
+@pytest.mark.parametrize("small_answer", [
+    json.dumps(dict(VALID, title="none")),                      # empty title on a readable document
+    json.dumps(dict(VALID, title="Phase II Environmental Site Assessment")),  # words not in the text
+    json.dumps(dict(VALID, sender=" ".join(["Acme"] * 17))),    # over the sender word limit
+    "Sorry, I cannot help with that.",                          # unparseable: all "none", readable "no"
+    json.dumps(dict(VALID, readable="no")),                     # only the last model may declare it unreadable
+])
+def test_invalid_or_empty_fields_are_escalated(models, small_answer):
+    answers, asked = models
+    answers["small"], answers["large"] = small_answer, json.dumps(VALID)
+    result = run()
+    assert asked == ["small", "large"]
+    assert result == VALID
+    assert stats() == {"small": (1, 0), "large": (1, 1)}
+
+
+def test_last_model_answer_is_returned_even_if_rejected(models):
+    answers, asked = models
+    answers["small"] = answers["large"] = json.dumps(dict(VALID, title="none"))
+    assert run()["title"] == "none"
+    assert asked == ["small", "large"]
+    assert stats() == {"small": (1, 0), "large": (1, 0)}
+
+    # The last model may declare a document unreadable.
+    answers["small"] = answers["large"] = json.dumps(dict(VALID, readable="no"))
+    assert run()["readable"] == "no"
+    assert stats()["large"] == (2, 1)
+
+
+def test_budget_stops_escalation(models):
+    answers, asked = models
+    answers["small"], answers["large"] = json.dumps(dict(VALID, title="none")), json.dumps(VALID)
+    budget = RetryPolicy(max_calls_per_document=1, document_deadline=None).start_document("a.pdf")
+    assert run(budget)["title"] == "none"
+    assert asked == ["small"]
+
+    spent = RetryPolicy(max_calls_per_document=0, document_deadline=None).start_document("b.pdf")
+    assert run(spent) is None
+    assert asked == ["small"]
+
+
+def test_cascade_needs_a_model():
+    with pytest.raises(ValueError):
+        ModelCascade([])
+    assert ModelCascade(["small", "large"]).default == "large"
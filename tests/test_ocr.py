@@ -0,0 +1,83 @@
+import hashlib
+
+import fitz
+import pytest
+
+from utils import loader
+from utils.cache import DiskCache
+
+TEXT = "Stage 1 Preliminary Site Investigation"
+LANGUAGE, DPI = "eng", 150
+
+
+def tesseract_missing():
+    try:
+        fitz.get_tessdata()
+    except RuntimeError:
+        return True
+    return False
+
+
+@pytest.fixture
+def scan(tmp_path):
+    # A one-page PDF whose only content is an image of the text, as a scanner would produce.
+    text_doc = fitz.open()
+    text_doc.new_page().insert_text((72, 144), TEXT, fontsize=24)
+    pixmap = text_doc[0].get_pixmap(dpi=200)
+    text_doc.close()
+
+    path = tmp_path / "scan.pdf"
+    doc = fitz.open()
+    doc.new_page().insert_image(fitz.Rect(0, 0, 595, 842), pixmap=pixmap)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+@pytest.fixture
+def pool():
+    loader.start_extraction_pool(2)
+    yield
+    loader.shutdown_extraction_pool()
+
+
+def ocr_key(path):
+    # The OCR cache key `_ocr_page` computes for the first page.
+    doc = fitz.open(path)
+    pixmap = doc[0].get_pixmap(dpi=DPI, colorspace=fitz.csGRAY)
+    doc.close()
+    digest = hashlib.sha256(f"{pixmap.width}x{pixmap.height}:".encode() + pixmap.samples).hexdigest()
+    return f"ocr:{LANGUAGE}:{DPI}:{digest}"
+
+
+def test_scanned_page_has_no_text_layer(scan):
+    pages = loader.extract_clean_pages(scan)
+    assert pages == [""]
+
+
+def test_workers_close_their_ocr_cache_on_exit(scan, tmp_path, pool):
+    cache_path = tmp_path / "ocr.sqlite"
+    cache = DiskCache(cache_path, 1024 ** 2, name="OCR cache")
+    cache.put_json(ocr_key(scan), TEXT)
+    cache.close()
+
+    futures = [loader._extraction_pool.submit(loader._ocr_page, str(scan), 0, LANGUAGE, DPI, str(cache_path),
+                                              1024 ** 2) for _ in range(4)]
+    assert [future.result() for future in futures] == [(TEXT, True)] * 4
+    assert (tmp_path / "ocr.sqlite-wal").exists()
+
+    # SQLite removes the write-ahead log once the last connection to the cache is closed.
+    loader.shutdown_extraction_pool()
+    assert not (tmp_path / "ocr.sqlite-wal").exists()
+
+
+@pytest.mark.skipif(tesseract_missing(), reason="Tesseract is not installed")
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scanned_page_is_recognised(scan, tmp_path, workers):
+    loader.start_extraction_pool(workers)
+    loader.open_ocr(language=LANGUAGE, dpi=DPI, cache_path=tmp_path / "ocr.sqlite")
+    try:
+        assert TEXT.lower() in loader.extract_clean_pages(scan)[0].lower()
+    finally:
+        loader.close_ocr()
+        loader.shutdown_extraction_pool()
@@ -0,0 +1,111 @@
+import csv
+import random
+import threading
+import time
+
+from utils.concurrency import OrderedTurnstile
+from utils.logger import init_log, log_metadata
+from utils.pipeline import Stage, run_pipeline
+
+HEADERS = ["Original_Filename", "Site_id", "Title", "Duplicate", "Duplicate_File"]
+
+
+def jitter(document, scale=0.004):
+    # Unordered stages finish out of order, as PDF parsing and LLM calls do.
+    time.sleep(random.Random(document["index"] * 31 + len(threading.current_thread().name)).random() * scale)
+
+
+def extract(document):
+    jitter(document)
+    document["site_id"] = str(1000 + document["index"] % 3)
+    document["text"] = f"report {document['index'] % 5}"
+
+
+def llm(document):
+    jitter(document)
+    document["title"] = document["text"].title()
+
+
+def dedup(document, organized):
+    # A duplicate of a document already organized for the same site, as the online duplicate check sees it.
+    match = organized.get((document["site_id"], document["text"]))
+    document["duplicate"] = match
+
+
+def organize(document, organized, log_path):
+    organized.setdefault((document["site_id"], document["text"]), document["filename"])
+    log_metadata(log_path, {
+        "Original_Filename": document["filename"],
+        "Site_id": document["site_id"],
+        "Title": document["title"],
+        "Duplicate": "yes" if document["duplicate"] else "no",
+        "Duplicate_File": document["duplicate"] or "",
+    })
+
+
+def documents(count):
+    return [{"index": index, "filename": f"doc{index:03d}.pdf"} for index in range(count)]
+
+
+def run_serial(log_path, count):
+    init_log(log_path, HEADERS)
+    organized = {}
+    for document in documents(count):
+        extract(document)
+        llm(document)
+        dedup(document, organized)
+        organize(document, organized, log_path)
+
+
+def run_staged(log_path, count):
+    # The structure of main.run_staged_pipeline: concurrent extract/LLM, then in-order dedup and organize.
+    init_log(log_path, HEADERS)
+    organized = {}
+    turnstile = OrderedTurnstile()
+
+    def dedup_in_order(document):
+        turnstile.wait(document["index"])
+        dedup(document, organized)
+
+    def on_complete(document, error):
+        assert error is None
+        turnstile.done(document["index"])
+
+    stages = [
+        Stage("extract", extract, workers=3),
+        Stage("llm", llm, workers=4),
+        Stage("dedup", dedup_in_order, ordered=True),
+        Stage("organize", lambda document: organize(document, organized, log_path), ordered=True),
+    ]
+    run_pipeline(documents(count), stages, queue_size=2, on_complete=on_complete)
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_staged_run_writes_the_same_log_as_a_serial_run(tmp_path):
+    run_serial(tmp_path / "serial.csv", 40)
+    run_staged(tmp_path / "staged.csv", 40)
+    serial = read_rows(tmp_path / "serial.csv")
+    assert len(serial) == 41
+    assert any(row[3] == "yes" for row in serial[1:])
+    assert read_rows(tmp_path / "staged.csv") == serial
+
+
+def test_ordered_stage_sees_items_in_input_order_and_errors_still_complete():
+    seen, completed = [], []
+
+    def fail_some(item):
+        jitter(item)
+        if item["index"] % 7 == 3:
+            raise ValueError(item["index"])
+
+    stages = [Stage("work", fail_some, workers=4),
+              Stage("record", lambda item: seen.append(item["index"]), ordered=True)]
+    run_pipeline(({"index": index} for index in range(30)), stages, queue_size=1,
+                 on_complete=lambda item, error: completed.append((item["index"], error is not None)))
+
+    assert seen == [index for index in range(30) if index % 7 != 3]
+    assert completed == [(index, index % 7 == 3) for index in range(30)]
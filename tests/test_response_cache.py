@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from utils import llm_interface
+from utils.llm_interface import (_response_key, close_response_cache, llm_single_field_query, open_response_cache,
+                                 query_llm)
+
+MESSAGES = [{"role": "user", "content": "Site ID of: Site 1234, 212 Avenue"}]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # Stands in for Ollama: answers with a numbered response and counts the requests that reach it.
+    requests = []
+
+    def send_chat(model, messages, options, format):
+        requests.append((model, messages, options, format))
+        return {"message": {"content": f" answer {len(requests)} "}}
+
+    monkeypatch.setattr(llm_interface, "_send_chat", send_chat)
+    return requests
+
+
+@pytest.fixture
+def response_cache(tmp_path):
+    open_response_cache(tmp_path / "responses.sqlite", 10 ** 6)
+    yield llm_interface._response_cache
+    close_response_cache()
+
+
+def test_key_changes_with_model_prompt_options_and_format():
+    key = _response_key("mistral", MESSAGES, {"temperature": 0})
+    assert key.startswith("chat:")
+    assert key == _response_key("mistral", [dict(MESSAGES[0])], {"temperature": 0})
+    assert len({
+        key,
+        _response_key("llama2", MESSAGES, {"temperature": 0}),
+        _response_key("mistral", [{"role": "user", "content": "Site ID of: Site 1235"}], {"temperature": 0}),
+        _response_key("mistral", MESSAGES, {"temperature": 0.7}),
+        _response_key("mistral", MESSAGES, {"temperature": 0, "seed": 1}),
+        _response_key("mistral", MESSAGES, None),
+        _response_key("mistral", MESSAGES, {"temperature": 0}, format="json"),
+    }) == 7
+
+
+def test_repeated_queries_are_served_from_the_cache(server, response_cache):
+    assert llm_interface._chat("mistral", MESSAGES, {"temperature": 0}) == "answer 1"
+    assert llm_interface._chat("mistral", MESSAGES, {"temperature": 0}) == "answer 1"
+    assert len(server) == 1
+
+    assert llm_interface._chat("llama2", MESSAGES, {"temperature": 0}) == "answer 2"
+    assert llm_interface._chat("mistral", MESSAGES, {"temperature": 0.7}) == "answer 3"
+    assert llm_interface._chat("mistral", MESSAGES, {"temperature": 0}, format="json") == "answer 4"
+    assert len(server) == 4
+    assert response_cache.stats()["hits"] == 1
+
+
+def test_fresh_queries_bypass_the_cache(server, response_cache):
+    assert llm_interface._chat("mistral", MESSAGES) == "answer 1"
+    assert llm_interface._chat("mistral", MESSAGES, fresh=True) == "answer 2"
+    # The retry's answer does not replace the cached first answer.
+    assert llm_interface._chat("mistral", MESSAGES) == "answer 1"
+    assert len(server) == 2
+
+
+def test_query_helpers_share_the_cache_across_reopens(server, tmp_path, monkeypatch):
+    path = tmp_path / "responses.sqlite"
+    server_answer = json.dumps({"site_id": "1234", "title": "none", "receiver": "none",
+                                "sender": "none", "address": "212 Avenue", "readable": "yes"})
+    monkeypatch.setattr(llm_interface, "_send_chat",
+                        lambda *args: server.append(args) or {"message": {"content": server_answer}})
+
+    open_response_cache(path, 10 ** 6)
+    first = query_llm("Extract the metadata", model="mistral")
+    assert llm_single_field_query("Site ID?", model="mistral") == server_answer
+    close_response_cache()
+
+    open_response_cache(path, 10 ** 6)
+    try:
+        assert query_llm("Extract the metadata", model="mistral") == first
+        assert llm_single_field_query("Site ID?", model="mistral") == server_answer
+        # The metadata query's schema is part of its key: the same prompt unstructured is another request.
+        query_llm("Extract the metadata", model="mistral", structured=False)
+    finally:
+        close_response_cache()
+    assert first["site_id"] == "1234"
+    assert len(server) == 3
+
+
+def test_nothing_is_cached_when_the_cache_is_closed(server):
+    assert llm_interface._response_cache is None
+    llm_interface._chat("mistral", MESSAGES)
+    llm_interface._chat("mistral", MESSAGES)
+    assert len(server) == 2
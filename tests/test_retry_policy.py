@@ -0,0 +1,36 @@
+from utils.retry_policy import RetryPolicy
+
+
+def test_document_limit_stops_calls_and_records_the_reason():
+    policy = RetryPolicy(max_calls_per_document=3, document_deadline=None)
+    budget = policy.start_document("a.pdf")
+    assert [budget.acquire() for _ in range(5)] == [True, True, True, False, False]
+    assert budget.calls == 3
+    assert "per-document limit of 3" in budget.exhausted_reason
+    assert policy.exhausted == [("a.pdf", budget.exhausted_reason)]
+
+
+def test_run_limit_is_shared_by_every_document():
+    policy = RetryPolicy(max_calls_per_document=None, max_calls_per_run=4, document_deadline=None)
+    first, second = policy.start_document("a.pdf"), policy.start_document("b.pdf")
+    assert [first.acquire() for _ in range(3)] == [True, True, True]
+    assert [second.acquire() for _ in range(2)] == [True, False]
+    assert policy.calls == 4
+    assert "per-run limit of 4" in second.exhausted_reason
+    assert first.exhausted_reason is None
+
+
+def test_deadline_stops_new_calls():
+    policy = RetryPolicy(document_deadline=0)
+    budget = policy.start_document("a.pdf")
+    assert not budget.acquire()
+    assert budget.exhausted_reason.startswith("deadline of 0s")
+    assert policy.calls == 0
+
+
+def test_retries_get_their_own_temperature_and_seed():
+    budget = RetryPolicy(retry_temperature=0.4, temperature_step=0.2, seed=10).start_document("a.pdf")
+    assert budget.retry_options(0) is None
+    assert [budget.retry_options(attempt) for attempt in (1, 2, 3, 5)] == [
+        {"temperature": 0.4, "seed": 11}, {"temperature": 0.6, "seed": 12},
+        {"temperature": 0.8, "seed": 13}, {"temperature": 1.0, "seed": 15}]
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+from rouge_score import rouge_scorer
+
+from utils.rouge_engine import (ROUGE1_TOLERANCE, rouge1_counts, rouge1_recall, rouge1_recall_text,
+                                rouge1_recall_upper_bound)
+
+# Inflected forms, so stemming and case matter; numbers and punctuation exercise the tokenizer.
+VOCABULARY = ("site sites investigation investigations investigated contaminated contamination soil soils "
+              "groundwater sample samples sampling remediation remediated Ministry ministry report reports "
+              "the of and to a in BH1 MW-3 mg/kg 0.05 2019-03-12 Re: Phase II, (final) approved approval").split()
+
+
+def random_text(rng, words):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def random_pairs(count=200, seed=7):
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        target = random_text(rng, rng.randint(0, 120))
+        if rng.random() < 0.5:
+            # A near copy: the target with some words dropped and others added.
+            kept = [word for word in target.split() if rng.random() < 0.8]
+            prediction = " ".join(kept + random_text(rng, rng.randint(0, 20)).split())
+        else:
+            prediction = random_text(rng, rng.randint(0, 120))
+        pairs.append((target, prediction))
+    return pairs
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    return rouge_scorer.RougeScorer(["rouge1"], use_stemmer=True)
+
+
+def test_recall_matches_rouge_score(scorer):
+    for target, prediction in random_pairs():
+        expected = scorer.score(target, prediction)["rouge1"].recall
+        assert abs(rouge1_recall_text(target, prediction) - expected) <= ROUGE1_TOLERANCE
+
+
+def test_upper_bound_never_rejects_a_pair_above_it():
+    for target, prediction in random_pairs(seed=11):
+        target_counts, prediction_counts = rouge1_counts(target), rouge1_counts(prediction)
+        assert rouge1_recall_upper_bound(target_counts, prediction_counts) >= rouge1_recall(target_counts,
+                                                                                          prediction_counts)
+
+
+def test_overlap_is_the_same_whichever_side_is_iterated():
+    # rouge1_recall iterates over the side with fewer distinct tokens.
+    short, long = rouge1_counts("soil sample soil"), rouge1_counts(random_text(random.Random(3), 200))
+    overlap = sum(min(count, long[token]) for token, count in short.items())
+    assert rouge1_recall(short, long) == overlap / short.total()
+    assert rouge1_recall(long, short) == overlap / long.total()
@@ -0,0 +1,91 @@
+import random
+
+import fitz
+import pytest
+
+from utils.loader import clean_ocr_text, extract_clean_pages, join_pages
+from utils.triage import GARBLED, IMAGE_ONLY, MIN_WORD_RATIO, TEXT_LAYER, text_signals, triage_document
+
+# A soil results page of a site investigation report: prose around a lab table.
+PROSE_AND_TABLE = """Table 2: Soil Analytical Results - Petroleum Hydrocarbons
+Samples were collected from boreholes BH1 to BH6 on 12 March 2019 and submitted to ALS Environmental
+for analysis. Concentrations exceeding the CSR Schedule 3.1 standards are shown in bold.
+Sample ID Depth (m bgs) Date LEPH HEPH Benzene Toluene Ethylbenzene Xylenes
+BH1-1 0.5 2019-03-12 <250 <250 <0.005 <0.02 <0.01 <0.05
+BH1-2 1.5 2019-03-12 410 1200 0.012 0.04 <0.01 0.08
+BH2-1 0.75 2019-03-12 <250 <250 <0.005 <0.02 <0.01 <0.05
+BH3-1 0.5 2019-03-12 3,400 8,900 0.21 1.3 0.55 2.4
+MW-3 2.0 2019-03-13 <250 310 <0.005 <0.02 <0.01 <0.05
+Units: mg/kg dry weight. CSR IL standard 1000 2000 0.035 2.5 15 6.5
+The results indicate that petroleum hydrocarbon impacts are limited to the vicinity of BH3."""
+
+# A groundwater results page that is almost all table: well IDs, parameters, units and numbers.
+TABLE_ONLY = """Groundwater Analytical Results (µg/L)
+Well ID MW-1 MW-2 MW-3 MW-4 MW-5 CSR AW
+Date 2019-04-02 2019-04-02 2019-04-02 2019-04-03 2019-04-03
+TPH 120 <100 4,300 <100 210 -
+VPH <100 <100 2,900 <100 <100 1500
+Benzene <0.5 <0.5 38 <0.5 0.7 40
+Toluene <0.5 <0.5 110 <0.5 <0.5 0.5
+Ethylbenzene <0.5 <0.5 95 <0.5 <0.5 2000
+Xylenes <1.0 <1.0 340 <1.0 1.2 300
+Naphthalene <0.05 <0.05 1.9 <0.05 <0.05 10
+pH 7.1 6.9 6.4 7.3 7.0 -
+Conductivity uS/cm 410 520 1,850 380 450 -
+Notes: bold exceeds CSR AW standard. MW = monitoring well."""
+
+
+def garbled_ocr(seed=1, tokens=200):
+    # A poor OCR layer: broken words, digit/letter confusions and stray marks.
+    rng = random.Random(seed)
+    vocabulary = ["tbe", "rn0nit0ring", "Gr0undw@ter", "wc11", "anaIysis", "s0il", "sarnple", "c0ntarninati0n",
+                  "lhe", "0f", "th3", "repOrt", "'.,", "~~", "I1l", "rnwi", "aud"]
+    return " ".join(rng.choice(vocabulary) for _ in range(tokens))
+
+
+def character_noise(seed=1, tokens=200):
+    rng = random.Random(seed)
+    return " ".join("".join(rng.choice("lI1rnmcx0O.,:") for _ in range(rng.randint(2, 8))) for _ in range(tokens))
+
+
+@pytest.mark.parametrize("text", [PROSE_AND_TABLE, TABLE_ONLY])
+def test_lab_data_pages_pass_the_word_ratio(text):
+    signals = text_signals(clean_ocr_text(text))
+    assert signals["word_ratio"] >= 0.9
+    assert signals["word_ratio"] >= MIN_WORD_RATIO + 0.25
+
+
+@pytest.mark.parametrize("text", [garbled_ocr(), character_noise()])
+def test_garbled_text_fails_the_word_ratio(text):
+    assert text_signals(clean_ocr_text(text))["word_ratio"] < MIN_WORD_RATIO - 0.1
+
+
+def _pdf(path, text=None, image=False):
+    doc = fitz.open()
+    page = doc.new_page()
+    if text:
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), text, fontsize=8)
+    if image:
+        pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 50, 50), False)
+        pixmap.clear_with(200)
+        page.insert_image(page.rect, pixmap=pixmap)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def _triage(path):
+    return triage_document(path, join_pages(extract_clean_pages(path)))
+
+
+def test_lab_data_pdf_is_text_layer(tmp_path):
+    path = _pdf(tmp_path / "lab.pdf", TABLE_ONLY)
+    assert _triage(path)["class"] == TEXT_LAYER
+
+
+def test_scan_without_text_is_image_only(tmp_path):
+    assert _triage(_pdf(tmp_path / "scan.pdf", image=True))["class"] == IMAGE_ONLY
+
+
+def test_garbled_text_layer_is_garbled(tmp_path):
+    assert _triage(_pdf(tmp_path / "garbled.pdf", garbled_ocr()))["class"] == GARBLED
@@ -0,0 +1,177 @@
+import csv
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+from rapidfuzz import fuzz
+from scipy import sparse
+
+from .loader import extract_clean_pages
+from .logger import update_log_rows
+from .metadata_extractor import reindex_renamed_file
+from .rename import generate_new_filename
+from .rouge_engine import rouge1_counts, rouge1_recall, rouge1_recall_upper_bound
+
+
+def _containment_pairs(token_counts, min_containment):
+    """
+    Finds document pairs whose distinct-token containment reaches `min_containment`.
+
+    Builds a binary document x vocabulary sparse matrix B; (B @ B.T)[i, j] is the number of
+    distinct tokens shared by documents i and j, so containment is that count divided by the
+    smaller vocabulary. One sparse product scores every pair of the site at once.
+
+    Parameters:
+        token_counts (list[Counter]): Stemmed token counts of each document.
+        min_containment (float): Minimum containment for a pair to be returned.
+
+    Returns:
+        list[tuple[int, int]]: Index pairs (i < j) of candidate duplicates.
+    """
+    vocabulary = {}
+    rows, cols = [], []
+    for row, counts in enumerate(token_counts):
+        for token in counts:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+    if not vocabulary:
+        return []
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+        shape=(len(token_counts), len(vocabulary)))
+    distinct = np.diff(matrix.indptr)
+    shared = sparse.triu(matrix @ matrix.T, k=1).tocoo()
+
+    smaller = np.minimum(distinct[shared.row], distinct[shared.col])
+    containment = shared.data / np.maximum(smaller, 1)
+    keep = containment >= min_containment
+    return list(zip(shared.row[keep].tolist(), shared.col[keep].tolist()))
+
+
+def _confirm_pair(text_a, counts_a, text_b, counts_b, rouge_th, rapid_th):
+    """
+    Applies the online duplicate thresholds to a candidate pair.
+
+    Returns:
+        float or None: Similarity score if the pair is a duplicate, else None.
+    """
+    if len(text_a) <= len(text_b):
+        target_counts, prediction_counts = counts_b, counts_a
+    else:
+        target_counts, prediction_counts = counts_a, counts_b
+    if rouge1_recall_upper_bound(target_counts, prediction_counts) >= rouge_th:
+        recall_score = rouge1_recall(target_counts, prediction_counts)
+        if recall_score >= rouge_th:
+            return recall_score
+    rapid_score = fuzz.token_sort_ratio(text_a, text_b)
+    if rapid_score >= rapid_th:
+        return rapid_score / 100.0
+    return None
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def reconcile_duplicates(log_path: Path, output_dir: Path, rouge_th: float = 0.75, rapid_th: float = 78.0,
+                         min_containment: float = 0.5) -> int:
+    """
+    Batch duplicate reconciliation over every organized document listed in the metadata log.
+
+    Unlike the online check in `check_duplicate_by_rouge`, the result does not depend on the order
+    in which files were processed. For each site:
+    - Candidate pairs come from vectorised sparse containment scores.
+    - Each candidate is confirmed with the same ROUGE-1 / RapidFuzz thresholds as the online check.
+    - Confirmed pairs are grouped into clusters (connected components).
+    - The longest document of each cluster is kept. Every other member is renamed with -DUP
+      and marked as a duplicate of it.
+    All log rows are rewritten in a single pass at the end.
+
+    Parameters:
+        log_path (Path): Path to the metadata log written by the pipeline.
+        output_dir (Path): Root of the organized output tree (one directory per site).
+        rouge_th (float): ROUGE-1 recall threshold (default 0.75).
+        rapid_th (float): RapidFuzz token-sort ratio threshold (default 78.0).
+        min_containment (float): Minimum distinct-token containment for a pair to be scored (default 0.5).
+
+    Returns:
+        int: Number of documents newly marked as duplicates.
+    """
+    with open(log_path, mode='r', newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+
+    sites = defaultdict(list)
+    for row in rows:
+        output_path = Path(row.get("Output_Path") or "")
+        if row.get("Site_id") and output_path.is_file():
+            sites[row["Site_id"]].append(row)
+
+    updates = {}
+    for site_id, site_rows in sites.items():
+        if len(site_rows) < 2:
+            continue
+
+        texts = []
+        for row in site_rows:
+            try:
+                texts.append(" ".join(extract_clean_pages(Path(row["Output_Path"]))))
+            except Exception as e:
+                print(f"[WARN] {row['New_Filename']}: {e}")
+                texts.append("")
+        token_counts = [rouge1_counts(text) for text in texts]
+
+        parent = list(range(len(site_rows)))
+        best_score = {}
+        for i, j in _containment_pairs(token_counts, min_containment):
+            score = _confirm_pair(texts[i], token_counts[i], texts[j], token_counts[j], rouge_th, rapid_th)
+            if score is None:
+                continue
+            parent[_find(parent, i)] = _find(parent, j)
+            for k in (i, j):
+                best_score[k] = max(best_score.get(k, 0.0), score)
+
+        clusters = defaultdict(list)
+        for i in range(len(site_rows)):
+            clusters[_find(parent, i)].append(i)
+
+        for members in clusters.values():
+            if len(members) < 2:
+                continue
+            # Keep the longest document; ties go to the one processed first.
+            keeper = max(members, key=lambda i: (len(texts[i]), -i))
+            keeper_name = site_rows[keeper]["New_Filename"]
+            print(f"[DUPLICATE CLUSTER] site {site_id}: keeping {keeper_name}, "
+                  f"{len(members) - 1} duplicate(s)")
+
+            for i in members:
+                row = site_rows[i]
+                if i == keeper or row.get("Duplicate", "").lower() == "yes":
+                    continue
+                output_path = Path(row["Output_Path"])
+                new_name, _ = generate_new_filename(
+                    output_path,
+                    site_id=site_id,
+                    doc_type=row["Document_Type"],
+                    duplicate=True,
+                    output_dir=output_path.parent
+                )
+                new_path = output_path.parent / new_name
+                output_path.rename(new_path)
+                reindex_renamed_file(output_dir / site_id, output_path, new_path)
+                updates[row["Original_Filename"]] = {
+                    "Duplicate": "yes",
+                    "Duplicate_File": keeper_name,
+                    "Similarity_Score": best_score.get(i, ""),
+                    "Site_Registry_Releaseable": "No (duplicate)",
+                    "New_Filename": new_name,
+                    "Output_Path": str(new_path)
+                }
+
+    if updates:
+        update_log_rows(log_path, updates)
+    print(f"[Batch dedup] {len(updates)} document(s) marked as duplicates")
+    return len(updates)
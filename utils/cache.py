@@ -0,0 +1,164 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+
+class DiskCache:
+    """
+    Persistent key-value cache stored in SQLite, with zlib-compressed values.
+
+    The total compressed size is capped: once `max_bytes` is exceeded, the least recently used
+    entries are evicted. Hits and misses are counted so callers can report the cache hit rate.
+    Safe to share between threads.
+
+    Parameters:
+    ----------
+    path : str or Path
+        Location of the SQLite database file. Parent directories are created if needed.
+    max_bytes : int
+        Maximum total size of the compressed values kept in the cache.
+    name : str
+        Label used when reporting statistics (default is "cache").
+    """
+
+    def __init__(self, path, max_bytes, name="cache"):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key):
+        """
+        Returns the cached value for `key`, or None on a miss.
+
+        Parameters:
+        ----------
+        key : str
+            Cache key.
+
+        Returns:
+        -------
+        bytes or None
+            The decompressed value, or None if the key is not cached.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return zlib.decompress(row[0])
+
+    def put(self, key, value):
+        """
+        Stores `value` under `key`, replacing any previous value, then evicts old entries if over size.
+
+        Parameters:
+        ----------
+        key : str
+            Cache key.
+        value : bytes
+            Value to store.
+
+        Returns:
+        -------
+        None
+        """
+        blob = zlib.compress(value)
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._total_bytes -= row[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time()))
+            self._total_bytes += len(blob)
+            self._evict()
+            self._conn.commit()
+
+    def get_json(self, key):
+        """
+        Returns the cached JSON value for `key` decoded to Python objects, or None on a miss.
+        """
+        value = self.get(key)
+        return None if value is None else json.loads(value)
+
+    def put_json(self, key, value):
+        """
+        Stores a JSON-serializable `value` under `key`.
+        """
+        self.put(key, json.dumps(value).encode("utf-8"))
+
+    def _evict(self):
+        # Evict least recently used entries down to 90% of the cap so every put doesn't trigger a purge.
+        if self._total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._total_bytes -= size
+            self.evictions += 1
+
+    def stats(self):
+        """
+        Returns hit/miss counters and current size of the cache.
+
+        Returns:
+        -------
+        dict
+            Keys: "hits", "misses", "hit_rate", "evictions", "bytes".
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self._total_bytes,
+        }
+
+    def report(self):
+        """
+        Prints the cache hit rate and size.
+
+        Returns:
+        -------
+        None
+        """
+        stats = self.stats()
+        print(f"[{self.name}] {stats['hits']} hits / {stats['hits'] + stats['misses']} lookups "
+              f"(hit rate {stats['hit_rate']:.1%}), {stats['evictions']} evictions, "
+              f"{stats['bytes'] / 1e6:.1f} MB stored")
+
+    def close(self):
+        """
+        Closes the underlying database connection.
+
+        Returns:
+        -------
+        None
+        """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,53 @@
+import threading
+
+
+class OrderedTurnstile:
+    """
+    Lets concurrent workers enter a critical section strictly in input order.
+
+    Worker `i` calls `wait(i)` before touching shared state and `done(i)` once it is
+    finished with it. `wait` is idempotent for the index currently holding the turn,
+    and `done` may be called for an index that never waited (e.g. after an error),
+    so a failed document never blocks the documents queued behind it.
+    """
+
+    def __init__(self):
+        self._next = 0
+        self._finished = set()
+        self._cond = threading.Condition()
+
+    def wait(self, index):
+        """
+        Blocks until every index lower than `index` has called `done`.
+
+        Parameters:
+        ----------
+        index : int
+            Position of the calling worker's document in the input order.
+
+        Returns:
+        -------
+        None
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._next >= index)
+
+    def done(self, index):
+        """
+        Releases the turn held by `index` and wakes the next worker in line.
+
+        Parameters:
+        ----------
+        index : int
+            Position of the finished document in the input order.
+
+        Returns:
+        -------
+        None
+        """
+        with self._cond:
+            self._finished.add(index)
+            while self._next in self._finished:
+                self._finished.discard(self._next)
+                self._next += 1
+            self._cond.notify_all()
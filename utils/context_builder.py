@@ -0,0 +1,139 @@
+import math
+import re
+
+# Cues near the fields the LLM extracts, with their weight. OCR cleaning removes line breaks, so
+# spans are scored on these labels and patterns rather than on line layout.
+CUES = [
+    (re.compile(r"\bsite\s+(?:id|identification)\b|\bsite\s*(?:no|number|#)\b", re.IGNORECASE), 6.0),
+    (re.compile(r"\b(?:re|subject)\s*:", re.IGNORECASE), 5.0),
+    (re.compile(r"\b(?:to|attention|attn)\s*:|\bdear\b", re.IGNORECASE), 4.0),
+    (re.compile(r"\bfrom\s*:|\b(?:yours truly|sincerely|regards|prepared by|submitted (?:to|by)|reviewed by)\b",
+                re.IGNORECASE), 4.0),
+    (re.compile(r"\b(?:located at|site at|situated at|property at|civic address|legal description|"
+                r"impacted)\b", re.IGNORECASE), 4.0),
+    (re.compile(r"\b\d{1,6}\s+(?:[A-Z][a-z]+\s+){1,3}(?:Street|St|Avenue|Ave|Road|Rd|Way|Drive|Dr|Highway|Hwy|"
+                r"Boulevard|Blvd|Crescent|Cres|Place|Pl|Lane|Ln)\b"), 3.0),
+    (re.compile(r"\b[A-Z]\d[A-Z]\s?\d[A-Z]\d\b"), 2.0),
+    (re.compile(r"\b(?:report|investigation|assessment|certificate|plan|letter|memorandum|application|"
+                r"determination|approval|notice)\b", re.IGNORECASE), 1.0),
+]
+
+# Longest span, in words; sentences longer than this are cut into several spans.
+SPAN_WORDS = 40
+
+# Marks text left out between two selected spans.
+GAP = " ... "
+
+
+def estimate_tokens(text):
+    """
+    Estimates the number of LLM tokens in `text` (about four characters per token for English).
+
+    Parameters:
+    ----------
+    text : str
+        Text to measure.
+
+    Returns:
+    -------
+    int
+        Estimated token count.
+    """
+    return math.ceil(len(text) / 4)
+
+
+def _split_spans(page):
+    # Sentences (split after a full stop), cut into chunks of at most SPAN_WORDS words.
+    spans = []
+    for sentence in re.split(r"(?<=\.)\s+", page):
+        words = sentence.split()
+        for start in range(0, len(words), SPAN_WORDS):
+            spans.append(" ".join(words[start:start + SPAN_WORDS]))
+    return spans
+
+
+def _score_span(span, page_index, span_index):
+    score = sum(weight * len(pattern.findall(span)) for pattern, weight in CUES)
+    # Letterhead, date, addressee and title are usually at the top of the first page.
+    if page_index == 0 and span_index < 2:
+        score += 4.0 if span_index == 0 else 2.0
+    score += 2.0 / (1 + page_index)
+    letters = sum(char.isalpha() for char in span)
+    if letters < 0.5 * len(span):
+        # Tables, figures and OCR noise.
+        score *= 0.3
+    return score
+
+
+def build_context(pages, max_tokens):
+    """
+    Selects the most informative spans of a document to fill an LLM prompt's token budget.
+
+    Documents that fit the budget are returned whole. Otherwise each page is split into sentence
+    spans, which are scored by cues near the extracted fields (To:, From:, Re:, Site ID, "located at",
+    street addresses and postal codes, sign-offs) plus a bonus for the top of the first page and for
+    earlier pages. Repeated spans are only kept once, spans found on several pages (running headers
+    and footers) and spans that are mostly digits or symbols score low. The highest scoring spans are taken until the budget is
+    full and are returned in document order, with " ... " where text was left out.
+
+    Parameters:
+    ----------
+    pages : list of str or str
+        Cleaned text of each page, or the whole document text as one page.
+    max_tokens : int or None
+        Token budget for the document text (see `estimate_tokens`); None keeps the whole text.
+
+    Returns:
+    -------
+    str
+        Document text of at most `max_tokens` estimated tokens.
+    """
+    if isinstance(pages, str):
+        pages = [pages]
+    pages = [page.strip() for page in pages if page and page.strip()]
+    whole = " ".join(pages)
+    if max_tokens is None or estimate_tokens(whole) <= max_tokens:
+        return whole
+
+    spans = []
+    for page_index, page in enumerate(pages):
+        for span_index, span in enumerate(_split_spans(page)):
+            spans.append((page_index, span_index, span))
+
+    pages_with = {}
+    for page_index, _, span in spans:
+        pages_with.setdefault(span.lower(), set()).add(page_index)
+
+    scored = []
+    seen = set()
+    for position, (page_index, span_index, span) in enumerate(spans):
+        key = span.lower()
+        if key in seen:
+            # Repeats add nothing for the LLM.
+            continue
+        seen.add(key)
+        score = _score_span(span, page_index, span_index)
+        if len(pages_with[key]) > 1 and len(span.split()) > 2:
+            score *= 0.1
+        scored.append((score, position))
+
+    selected = set()
+    used = 0
+    for score, position in sorted(scored, key=lambda item: (-item[0], item[1])):
+        # Each span costs its own tokens plus a separator.
+        cost = estimate_tokens(spans[position][2]) + estimate_tokens(GAP)
+        if used + cost <= max_tokens:
+            selected.add(position)
+            used += cost
+
+    context = ""
+    previous = None
+    for position in sorted(selected):
+        if previous is not None:
+            contiguous = position == previous + 1 and spans[position][0] == spans[previous][0]
+            context += " " if contiguous else GAP
+        elif position > 0:
+            context += GAP.lstrip()
+        context += spans[position][2]
+        previous = position
+    return context
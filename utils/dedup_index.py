@@ -0,0 +1,310 @@
+import hashlib
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def _shingles(text, shingle_size):
+    """
+    Returns the set of lowercase word shingles (n-grams of `shingle_size` tokens) in `text`.
+    """
+    tokens = _TOKEN.findall(text.lower())
+    if shingle_size == 1:
+        return set(tokens)
+    return {" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash LSH index of organized documents, partitioned by site directory.
+
+    It also keeps a hash registry (SHA-256 of the file bytes and of the normalised text) so exact
+    duplicates are found with a single lookup, before any similarity scoring.
+
+    Each document is reduced to a MinHash signature of its word shingles. Signatures are split
+    into bands; documents sharing any band bucket become candidates, which are then ranked by
+    their estimated Jaccard similarity. Only the short list of candidates needs a full-text
+    comparison, instead of every document of the site.
+
+    The defaults (unigram shingles, 64 bands of 2 rows) favour recall: ROUGE-1 and token-sort
+    ratio both work on unigrams, and a pair with an estimated Jaccard similarity of 0.3 still
+    becomes a candidate with probability above 99%.
+
+    Parameters:
+    ----------
+    path : str or Path
+        Location of the SQLite file holding the index.
+    num_perm : int
+        Number of MinHash permutations per signature (default is 128).
+    bands : int
+        Number of LSH bands; must divide `num_perm` (default is 64).
+    shingle_size : int
+        Number of words per shingle (default is 1).
+    seed : int
+        Seed for the MinHash permutations. Changing it invalidates stored signatures.
+    """
+
+    def __init__(self, path, num_perm=128, bands=64, shingle_size=1, seed=1):
+        if num_perm % bands:
+            raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm})")
+        self.path = Path(path)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+        self._lock = threading.Lock()
+        # site -> {path: signature}, site -> {(band, bucket): set(paths)}; loaded lazily per site.
+        self._signatures = {}
+        self._buckets = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "site TEXT NOT NULL, path TEXT NOT NULL, signature BLOB NOT NULL, PRIMARY KEY (site, path))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sites (site TEXT PRIMARY KEY)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "site TEXT NOT NULL, path TEXT NOT NULL, file_sha256 TEXT NOT NULL, text_sha256 TEXT, "
+            "text_length INTEGER NOT NULL, PRIMARY KEY (site, path))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS hashes_file ON hashes (site, file_sha256)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS hashes_text ON hashes (site, text_sha256)")
+        self._conn.commit()
+
+    def signature(self, text):
+        """
+        Computes the MinHash signature of a document's text.
+
+        Parameters:
+        ----------
+        text : str
+            Cleaned document text.
+
+        Returns:
+        -------
+        numpy.ndarray or None
+            Array of `num_perm` uint32 values, or None if the text has no tokens.
+        """
+        shingles = _shingles(text, self.shingle_size)
+        if not shingles:
+            return None
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+             for s in shingles),
+            dtype=np.uint64, count=len(shingles))
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        # Chunked so very long documents don't materialise a huge (shingles x permutations) matrix.
+        for start in range(0, len(hashes), 4096):
+            chunk = hashes[start:start + 4096]
+            permuted = ((np.outer(chunk, self._a) + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+            np.minimum(signature, permuted.min(axis=0), out=signature)
+        return signature.astype(np.uint32)
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    def _load_site(self, site):
+        if site in self._signatures:
+            return
+        signatures = {}
+        buckets = defaultdict(set)
+        for path, blob in self._conn.execute("SELECT path, signature FROM documents WHERE site = ?", (site,)):
+            signature = np.frombuffer(blob, dtype=np.uint32)
+            signatures[path] = signature
+            for key in self._band_keys(signature):
+                buckets[key].add(path)
+        self._signatures[site] = signatures
+        self._buckets[site] = buckets
+
+    def has_site(self, site):
+        """
+        Returns True if `site` has been indexed (even if it currently holds no documents).
+        """
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM sites WHERE site = ?", (site,)).fetchone() is not None
+
+    def site_size(self, site):
+        """
+        Returns the number of documents indexed for `site`.
+        """
+        with self._lock:
+            self._load_site(site)
+            return len(self._signatures[site])
+
+    def mark_site_indexed(self, site):
+        """
+        Records that every document of `site` has been added, so it is not rebuilt from disk again.
+        """
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO sites (site) VALUES (?)", (site,))
+            self._conn.commit()
+
+    def add(self, site, path, signature, file_hash=None, text_hash=None, text_length=0):
+        """
+        Adds (or replaces) a document in the index of `site`.
+
+        Parameters:
+        ----------
+        site : str
+            Site partition key.
+        path : str or Path
+            Location of the organized document.
+        signature : numpy.ndarray or None
+            Signature from `signature()`. Documents without tokens (None) are not added to the LSH index.
+        file_hash : str, optional
+            SHA-256 of the file bytes, registered for exact-duplicate lookups.
+        text_hash : str, optional
+            Hash of the normalised document text; None for documents without text.
+        text_length : int
+            Length of the cleaned document text (default is 0).
+
+        Returns:
+        -------
+        None
+        """
+        path = str(path)
+        with self._lock:
+            self._load_site(site)
+            self._remove_locked(site, path)
+            if signature is not None:
+                self._signatures[site][path] = signature
+                for key in self._band_keys(signature):
+                    self._buckets[site][key].add(path)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO documents (site, path, signature) VALUES (?, ?, ?)",
+                    (site, path, signature.tobytes()))
+            if file_hash is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO hashes (site, path, file_sha256, text_sha256, text_length) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (site, path, file_hash, text_hash, text_length))
+            self._conn.commit()
+
+    def remove(self, site, path):
+        """
+        Removes a document from the index of `site`, if present.
+        """
+        with self._lock:
+            self._load_site(site)
+            self._remove_locked(site, str(path))
+            self._conn.commit()
+
+    def _remove_locked(self, site, path):
+        self._conn.execute("DELETE FROM hashes WHERE site = ? AND path = ?", (site, path))
+        signature = self._signatures[site].pop(path, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            self._buckets[site][key].discard(path)
+        self._conn.execute("DELETE FROM documents WHERE site = ? AND path = ?", (site, path))
+
+    def move(self, site, old_path, new_path):
+        """
+        Updates the index after an indexed document has been renamed.
+        """
+        old_path, new_path = str(old_path), str(new_path)
+        with self._lock:
+            self._load_site(site)
+            signature = self._signatures[site].get(old_path)
+            if signature is not None:
+                self._buckets_move(site, signature, old_path, new_path)
+                self._signatures[site][new_path] = self._signatures[site].pop(old_path)
+            self._conn.execute("UPDATE documents SET path = ? WHERE site = ? AND path = ?", (new_path, site, old_path))
+            self._conn.execute("UPDATE hashes SET path = ? WHERE site = ? AND path = ?", (new_path, site, old_path))
+            self._conn.commit()
+
+    def _buckets_move(self, site, signature, old_path, new_path):
+        for key in self._band_keys(signature):
+            paths = self._buckets[site][key]
+            paths.discard(old_path)
+            paths.add(new_path)
+
+    def find_exact(self, site, file_hash=None, text_hash=None):
+        """
+        Looks up a document of `site` with identical file bytes or identical normalised text.
+
+        Parameters:
+        ----------
+        site : str
+            Site partition key.
+        file_hash : str, optional
+            SHA-256 of the file bytes to match.
+        text_hash : str, optional
+            Hash of the normalised text to match.
+
+        Returns:
+        -------
+        tuple[Path, int] or None
+            (path, cleaned text length) of the first match, or None.
+        """
+        with self._lock:
+            for column, value in (("file_sha256", file_hash), ("text_sha256", text_hash)):
+                if value is None:
+                    continue
+                row = self._conn.execute(
+                    f"SELECT path, text_length FROM hashes WHERE site = ? AND {column} = ? ORDER BY path LIMIT 1",
+                    (site, value)).fetchone()
+                if row is not None:
+                    return Path(row[0]), row[1]
+        return None
+
+    def candidates(self, site, signature, min_similarity=0.3, limit=10):
+        """
+        Returns the documents of `site` most likely to be near-duplicates of `signature`.
+
+        The cutoffs trade recall for speed: a true duplicate whose estimated unigram Jaccard falls
+        below `min_similarity` (e.g. a heavily OCR-damaged variant that the RapidFuzz fallback would
+        still confirm), or that ranks below the first `limit`, is never compared. Callers pass
+        `config.DEDUP_INDEX_MIN_SIMILARITY` / `config.DEDUP_INDEX_MAX_CANDIDATES` and scan small sites in full.
+
+        Parameters:
+        ----------
+        site : str
+            Site partition key.
+        signature : numpy.ndarray or None
+            Signature of the document being checked.
+        min_similarity : float
+            Minimum estimated Jaccard similarity for a candidate (default is 0.3).
+        limit : int
+            Maximum number of candidates returned (default is 10).
+
+        Returns:
+        -------
+        list[tuple[Path, float]]
+            (path, estimated similarity) pairs, most similar first.
+        """
+        if signature is None:
+            return []
+        with self._lock:
+            self._load_site(site)
+            buckets = self._buckets[site]
+            paths = set()
+            for key in self._band_keys(signature):
+                paths |= buckets.get(key, set())
+            scored = [(path, float(np.mean(self._signatures[site][path] == signature))) for path in paths]
+        scored = [(Path(path), score) for path, score in scored if score >= min_similarity]
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored[:limit]
+
+    def close(self):
+        """
+        Closes the underlying database connection.
+        """
+        with self._lock:
+            self._conn.close()
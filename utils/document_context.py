@@ -0,0 +1,110 @@
+from functools import cached_property
+from pathlib import Path
+from .loader import document_pages, extract_clean_pages, file_sha256
+from .metadata_extractor import extract_site_id_from_filename, text_sha256
+from .rename import parse_filename_date
+
+
+class DocumentContext:
+    """
+    Everything derived from one input PDF, computed at most once and shared by every pipeline stage.
+
+    Page texts come from the loader's per-document memo, so the PDF is parsed and cleaned once
+    however many stages read it: the extraction stage reads the first pages within its budget and
+    the duplicate check extends them to the whole document. The page layout used by triage is
+    recorded during the same pass. The full text, its normalised hash,
+    the file hash and the filename-derived fields are computed on first use and kept.
+    """
+
+    def __init__(self, file_path):
+        """
+        Parameters:
+            file_path (Path): Path to the input PDF.
+        """
+        self.file_path = Path(file_path)
+        self.filename = self.file_path.name
+        # The loader's memoised pages of this file, held so they outlive the memo while the document is processed.
+        self._pages = None
+        self._derived = {}
+
+    @cached_property
+    def site_id_from_filename(self):
+        """
+        str or None: Site ID at the start of the filename (see `extract_site_id_from_filename`).
+        """
+        return extract_site_id_from_filename(self.filename)
+
+    @cached_property
+    def filename_date(self):
+        """
+        tuple[str, str]: (date string "YYYY-MM-DD", year) from the filename (see `parse_filename_date`).
+        """
+        return parse_filename_date(self.filename)
+
+    def pages(self, max_pages=None, max_chars=None):
+        """
+        Returns the cleaned page texts of the document within a page and character budget.
+
+        Parameters:
+            max_pages (int, optional): Maximum number of pages; None for every page.
+            max_chars (int, optional): Stop after the page that reaches this many characters; None for no limit.
+
+        Returns:
+            list[str]: Cleaned text of each page, in page order.
+        """
+        if self._pages is None:
+            self._pages = document_pages(self.file_path)
+        return extract_clean_pages(self.file_path, max_pages, max_chars, self._pages)
+
+    def layout(self):
+        """
+        Returns the layout of the pages extracted so far among the first LAYOUT_PAGES, recorded
+        while their text was extracted, so triage need not open the PDF again.
+
+        Returns:
+            list[list] or None: [uses fonts, share of the page area covered by images] per page, in
+                page order; None if the pages came from a cache entry written without layout.
+        """
+        if self._pages is None:
+            self._pages = document_pages(self.file_path)
+        with self._pages.lock:
+            return None if self._pages.layout is None else list(self._pages.layout)
+
+    @cached_property
+    def full_text(self):
+        """
+        str: Cleaned text of every page, joined with single spaces (as compared by the duplicate check).
+        """
+        return " ".join(self.pages())
+
+    @cached_property
+    def file_hash(self):
+        """
+        str: SHA-256 of the file bytes; organized copies have the same hash.
+        """
+        return file_sha256(self.file_path)
+
+    @cached_property
+    def text_hash(self):
+        """
+        str or None: SHA-256 of the normalised full text (see `text_sha256`); None without text.
+        """
+        return text_sha256(self.full_text)
+
+    def derived(self, key, compute):
+        """
+        Returns a value derived from the document, computing it on first use.
+
+        Lets other modules keep per-document results (e.g. the MinHash signature) without this
+        class knowing about them.
+
+        Parameters:
+            key (str): Name of the value.
+            compute (callable): Called with no arguments to compute the value on first use.
+
+        Returns:
+            object: The value.
+        """
+        if key not in self._derived:
+            self._derived[key] = compute()
+        return self._derived[key]
@@ -0,0 +1,169 @@
+import re
+import threading
+from collections import OrderedDict, defaultdict
+
+from rapidfuzz import fuzz, process
+
+_NON_WORD = re.compile(r'[^\w\s]')
+_DIGITS = re.compile(r'\d+')
+
+# Words shorter than this must match exactly even with fuzzy matching: one OCR error in a short
+# word is as likely to make a different word.
+FUZZY_MIN_LENGTH = 4
+
+# RapidFuzz ratio (0-100) a field word must reach against a document word to count as present
+# despite OCR errors; None means exact matching only (see enable_fuzzy_matching).
+_fuzzy_threshold = None
+
+# Recently validated documents' vocabularies, keyed by the identity of their text.
+_vocabularies = OrderedDict()
+_vocabularies_size = 64
+_vocabularies_lock = threading.Lock()
+
+
+def normalised_words(text):
+    """
+    Splits text into the lowercase words compared by field validation.
+
+    Punctuation becomes a separator and digits are dropped, because the LLM occasionally adds
+    harmless punctuation and numbers are checked elsewhere.
+
+    Parameters:
+        text (str): Field value or document text.
+
+    Returns:
+        list[str]: Normalised words, in order.
+    """
+    return _DIGITS.sub(' ', _NON_WORD.sub(' ', text)).lower().split()
+
+
+class DocumentVocabulary:
+    """
+    The distinct normalised words of a document, built once and queried per field word.
+
+    Exact lookups are set lookups; fuzzy lookups only compare against document words of
+    similar length.
+    """
+
+    def __init__(self, text):
+        """
+        Parameters:
+            text (str): OCR-cleaned document text.
+        """
+        self.words = set(normalised_words(text))
+        self._by_length = None
+
+    def _candidates(self, word, threshold):
+        # Document words whose length alone does not rule out reaching the ratio threshold.
+        if self._by_length is None:
+            self._by_length = defaultdict(list)
+            for known in self.words:
+                self._by_length[len(known)].append(known)
+        return [known for length, words in self._by_length.items()
+                if 200 * min(length, len(word)) / (length + len(word)) >= threshold for known in words]
+
+    def contains(self, word, fuzzy_threshold=None):
+        """
+        Checks whether a normalised word occurs in the document.
+
+        Parameters:
+            word (str): Normalised word (see `normalised_words`).
+            fuzzy_threshold (float, optional): RapidFuzz ratio accepted for words of at least
+                FUZZY_MIN_LENGTH characters that do not occur exactly; None for exact matching.
+
+        Returns:
+            bool: True if the word, or a close enough OCR variant, is in the document.
+        """
+        if word in self.words:
+            return True
+        if fuzzy_threshold is None or len(word) < FUZZY_MIN_LENGTH:
+            return False
+        return process.extractOne(word, self._candidates(word, fuzzy_threshold), scorer=fuzz.ratio,
+                                  score_cutoff=fuzzy_threshold) is not None
+
+    def contains_all(self, field, fuzzy_threshold=None):
+        """
+        Checks whether every word of a field value occurs in the document.
+
+        Parameters:
+            field (str): Extracted field value.
+            fuzzy_threshold (float, optional): See `contains`.
+
+        Returns:
+            bool: False if the field has no words once normalised, or any word is missing.
+        """
+        words = normalised_words(field)
+        return bool(words) and all(self.contains(word, fuzzy_threshold) for word in words)
+
+
+def document_vocabulary(text):
+    """
+    Returns the vocabulary of a document's text, building it on the first call for that text.
+
+    The same text object is validated many times (every field, every retry), so vocabularies are
+    memoised by object identity: a hit costs no pass over the text at all.
+
+    Parameters:
+        text (str): OCR-cleaned document text.
+
+    Returns:
+        DocumentVocabulary: Vocabulary of the text.
+    """
+    key = id(text)
+    with _vocabularies_lock:
+        entry = _vocabularies.get(key)
+        # The entry keeps its text alive, so a matching identity means the same text.
+        if entry is not None and entry[0] is text:
+            _vocabularies.move_to_end(key)
+            return entry[1]
+
+    vocabulary = DocumentVocabulary(text)
+
+    with _vocabularies_lock:
+        _vocabularies[key] = (text, vocabulary)
+        _vocabularies.move_to_end(key)
+        if len(_vocabularies) > _vocabularies_size:
+            _vocabularies.popitem(last=False)
+    return vocabulary
+
+
+def field_words_in_text(field, text):
+    """
+    Checks whether every word of a field value occurs in the document text.
+
+    Uses the memoised vocabulary of `text`, so the check costs one lookup per field word. With
+    fuzzy matching enabled (`enable_fuzzy_matching`), words with OCR errors on either side still match.
+
+    Parameters:
+        field (str): Extracted field value.
+        text (str): OCR-cleaned document text.
+
+    Returns:
+        bool: True if all field words are found, else False.
+    """
+    return document_vocabulary(text).contains_all(field, _fuzzy_threshold)
+
+
+def enable_fuzzy_matching(threshold=90):
+    """
+    Lets field words match document words with OCR errors, for the rest of the run.
+
+    Parameters:
+        threshold (float): Minimum RapidFuzz ratio (0-100) between the two words (default: 90).
+
+    Returns:
+        None
+    """
+    global _fuzzy_threshold
+    _fuzzy_threshold = threshold
+
+
+def disable_fuzzy_matching():
+    """
+    Restores exact word matching for field validation.
+
+    Returns:
+        None
+    """
+    global _fuzzy_threshold
+    _fuzzy_threshold = None
@@ -1,30 +1,1067 @@
 import ollama
+import httpx
+import ast
+import asyncio
+import csv
+import hashlib
+import json
+import os
 import re
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
 from difflib import SequenceMatcher
+from pathlib import Path
 
+from .cache import DiskCache
+from .context_builder import build_context
+from .field_verifier import field_words_in_text
 
-def load_prompt_template(path, doc_text: str) -> str:
+# Persistent cache of LLM responses; None when disabled (see open_response_cache).
+_response_cache = None
+
+METADATA_KEYS = ("title", "receiver", "sender", "address", "readable", "site_id")
+
+# JSON schema passed as Ollama's `format`: decoding is constrained to exactly the six string fields.
+METADATA_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "receiver": {"type": "string"},
+        "sender": {"type": "string"},
+        "address": {"type": "string"},
+        "readable": {"type": "string", "enum": ["yes", "no"]},
+        "site_id": {"type": "string"},
+    },
+    "required": list(METADATA_KEYS),
+    "additionalProperties": False,
+}
+
+
+def metadata_schema(fields=None):
+    """
+    Returns `METADATA_SCHEMA` restricted to `fields` (default is all six keys).
+    """
+    if fields is None:
+        return METADATA_SCHEMA
+    return {
+        "type": "object",
+        "properties": {field: METADATA_SCHEMA["properties"][field] for field in fields},
+        "required": list(fields),
+        "additionalProperties": False,
+    }
+
+
+# Records or replays Ollama traffic; None when talking to the server normally (see open_llm_traffic).
+_traffic = None
+
+
+class _LLMTraffic:
+    """
+    Records every Ollama chat request and response to a directory, or serves them back from it.
+
+    Each exchange is one JSON file named after the request hash and its occurrence number, so a
+    prompt sent several times (e.g. retries) replays its responses in the order they were recorded.
+
+    Parameters:
+    ----------
+    directory : str or Path
+        Directory holding the recorded exchanges.
+    mode : str
+        "record" or "replay".
+    latency_scale : float
+        Replay only: sleep for the recorded latency multiplied by this factor (default is 0, no delay).
+    """
+
+    def __init__(self, directory, mode, latency_scale=0.0):
+        self.directory = Path(directory)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.exchanges = 0
+        self.missing = 0
+        self.seconds = 0.0
+        self._occurrences = defaultdict(int)
+        self._lock = threading.Lock()
+        if mode == "record":
+            self.directory.mkdir(parents=True, exist_ok=True)
+        elif not self.directory.is_dir():
+            raise FileNotFoundError(f"LLM replay directory not found: {self.directory}")
+
+    def _next_path(self, model, messages, options, format):
+        digest = _response_key(model, messages, options, format).split(":", 1)[1]
+        with self._lock:
+            occurrence = self._occurrences[digest]
+            self._occurrences[digest] += 1
+        return self.directory / f"{digest}-{occurrence:03d}.json"
+
+    def chat(self, model, messages, options=None, format=None):
+        path = self._next_path(model, messages, options, format)
+        if self.mode == "replay":
+            if not path.exists():
+                with self._lock:
+                    self.missing += 1
+                raise LookupError(f"No recorded LLM response for this request ({path.name})")
+            with open(path, "r", encoding="utf-8") as f:
+                exchange = json.load(f)
+            if self.latency_scale > 0:
+                time.sleep(exchange["latency"] * self.latency_scale)
+        else:
+            start = time.perf_counter()
+            response = _send_chat(model, messages, options, format)
+            latency = time.perf_counter() - start
+            response = response.model_dump() if hasattr(response, "model_dump") else dict(response)
+            exchange = {"model": model, "messages": messages, "options": options,
+                        "response": response, "latency": latency}
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(exchange, f, default=str)
+        with self._lock:
+            self.exchanges += 1
+            self.seconds += exchange["latency"]
+        return exchange["response"]
+
+    def report(self):
+        if self.mode == "record":
+            print(f"[LLM record] {self.exchanges} exchanges recorded to {self.directory} "
+                  f"({self.seconds:.1f}s of LLM latency)")
+        else:
+            print(f"[LLM replay] {self.exchanges} exchanges replayed from {self.directory} "
+                  f"({self.seconds:.1f}s of recorded latency, scale {self.latency_scale}), "
+                  f"{self.missing} missing")
+
+
+def open_llm_traffic(directory, mode, latency_scale=0.0):
     """
-    Loads a prompt template from file and injects the document text into the {{DOCUMENT_TEXT}} placeholder.
+    Switches the Ollama client to record or replay mode.
+
+    In "record" mode every chat request is still sent to Ollama, and the request, response and
+    measured latency are saved to `directory`. In "replay" mode no server is needed: responses are
+    served from a recorded directory, in recorded order for repeated prompts, optionally delayed to
+    simulate the recorded latency. Requests that were never recorded raise LookupError.
+
+    Parameters:
+    ----------
+    directory : str or Path
+        Directory to record to or replay from.
+    mode : str
+        "record" or "replay".
+    latency_scale : float, optional
+        Replay only: multiplier applied to the recorded latencies (default is 0, no delay).
+
+    Returns:
+    -------
+    None
+    """
+    global _traffic
+    if mode not in ("record", "replay"):
+        raise ValueError(f"Unknown LLM traffic mode: {mode}")
+    close_llm_traffic()
+    _traffic = _LLMTraffic(directory, mode, latency_scale)
+
+
+def close_llm_traffic():
+    """
+    Prints a summary of recorded or replayed exchanges and returns the client to normal mode.
+
+    Returns:
+    -------
+    None
+    """
+    global _traffic
+    if _traffic is not None:
+        _traffic.report()
+        _traffic = None
+
+
+class LLMUnavailableError(RuntimeError):
+    """
+    Raised instead of contacting Ollama while the circuit breaker of every host is open, and at
+    session start when no host answers. Query helpers let it through rather than returning "none".
+    """
+
+
+def _host_url(host=None):
+    # Base URL of an Ollama server given as "host", "host:port" or a URL; default OLLAMA_HOST, else localhost.
+    host = host or os.environ.get("OLLAMA_HOST") or "127.0.0.1"
+    scheme, separator, rest = host.partition("://")
+    if not separator:
+        scheme, rest = "http", host
+    split = urllib.parse.urlsplit(f"{scheme}://{rest}")
+    port = split.port or (11434 if not separator else 443 if scheme == "https" else 80)
+    hostname = split.hostname or "127.0.0.1"
+    if ":" in hostname:
+        hostname = f"[{hostname}]"  # IPv6 address
+    path = split.path.strip("/")
+    return f"{scheme}://{hostname}:{port}" + (f"/{path}" if path else "")
+
+
+def _ollama_request(**fields):
+    # JSON body of an Ollama API request: one non-streamed response, unset fields left out.
+    return dict({key: value for key, value in fields.items() if value is not None}, stream=False)
+
+
+def _ollama_response(response):
+    # Decodes an Ollama API response, raising ollama.ResponseError on an error status like the ollama client does.
+    if response.is_error:
+        try:
+            error = response.json()["error"]
+        except (ValueError, KeyError, TypeError):
+            error = response.text
+        raise ollama.ResponseError(error, response.status_code)
+    return response.json()
+
+
+class _OllamaHost:
+    """
+    One Ollama server of a session: its pooled HTTP client, outstanding requests and circuit breaker.
+
+    The state is only read and changed under the owning session's lock.
+    """
+
+    def __init__(self, host, timeout):
+        self.url = _host_url(host)
+        self.client = httpx.Client(base_url=self.url, timeout=timeout)
+        self.outstanding = 0
+        self.calls = 0
+        self.failures = 0
+        self.trips = 0
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def available(self, reset_after):
+        # Closed breaker, or open for longer than reset_after with no trial call in flight (half-open).
+        if self.opened_at is None:
+            return True
+        return not self.trial and time.monotonic() - self.opened_at >= reset_after
+
+    def begin(self):
+        if self.opened_at is not None:
+            self.trial = True
+        self.outstanding += 1
+        self.calls += 1
+
+    def end(self, error, failure_threshold, reset_after):
+        self.outstanding -= 1
+        trial, self.trial = self.trial, False
+        if error is None or not _is_server_failure(error):
+            self.consecutive_failures = 0
+            if self.opened_at is not None:
+                print(f"[LLM session] {self.url} is back, circuit breaker closed")
+            self.opened_at = None
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        if trial or (self.opened_at is None and self.consecutive_failures >= failure_threshold):
+            if self.opened_at is None:
+                print(f"[LLM session] {self.consecutive_failures} consecutive failures from {self.url} "
+                      f"({error}), circuit breaker open for {reset_after}s")
+            self.trip()
+
+    def trip(self):
+        if self.opened_at is None:
+            self.trips += 1
+        self.opened_at = time.monotonic()
+
+
+class LLMSession:
+    """
+    Persistent connections to one or more Ollama servers, shared by every LLM call of a run.
+
+    Each host gets a single pooled HTTP client instead of the module-level default one, and every
+    request asks the server to keep the model loaded for `keep_alive` so it is not evicted between
+    slow documents. A request goes to the available host with the fewest requests in flight, and
+    waits while every host is at `max_concurrency`. If a host fails (connection error, timeout or
+    5xx response) the request fails over to the next least loaded host it has not tried yet.
+
+    Every host has its own circuit breaker: after `failure_threshold` consecutive failures it opens
+    and the host gets no requests for `reset_after` seconds; then one trial request is let through,
+    which closes the breaker if it succeeds. While every breaker is open, calls raise
+    `LLMUnavailableError` immediately instead of waiting on timeouts.
+
+    Parameters:
+    ----------
+    hosts : list of str, optional
+        Ollama server addresses (default is one server: the OLLAMA_HOST environment variable, else localhost).
+    keep_alive : str or float, optional
+        How long the servers keep a model loaded after a request, e.g. "30m" (default is "30m").
+    timeout : float, optional
+        Seconds before a request is abandoned (default is None, no timeout).
+    failure_threshold : int
+        Consecutive failures that open a host's breaker (default is 3).
+    reset_after : float
+        Seconds a breaker stays open before a trial request (default is 30).
+    max_concurrency : int or None
+        Maximum requests in flight per host (default is None, no limit). Requests beyond it queue on
+        the client instead of on the server; match it to the servers' OLLAMA_NUM_PARALLEL.
+    """
+
+    def __init__(self, hosts=None, keep_alive="30m", timeout=None, failure_threshold=3, reset_after=30.0,
+                 max_concurrency=None):
+        self.hosts = [_OllamaHost(host, timeout) for host in (hosts or [None])]
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.max_concurrency = max_concurrency
+        self.rejected = 0
+        self._available = threading.Condition()
+        # Event loop (in its own thread) and async client for coroutines, both kept for the session's lifetime.
+        self._loop = None
+        self._loop_thread = None
+        self._async_client = None
+        self._loop_lock = threading.Lock()
+
+    def _acquire_host(self, tried=()):
+        # Blocks until a host that is not in `tried` has a free slot; raises if none is available at all.
+        with self._available:
+            while True:
+                candidates = [host for host in self.hosts
+                              if host not in tried and host.available(self.reset_after)]
+                if not candidates:
+                    if not tried:
+                        self.rejected += 1
+                    raise LLMUnavailableError(
+                        "No Ollama host is available (" + ", ".join(
+                            f"{host.url}: {'failed' if host in tried else 'circuit breaker open'}"
+                            for host in self.hosts) + ")")
+                free = [host for host in candidates
+                        if self.max_concurrency is None or host.outstanding < self.max_concurrency]
+                if free:
+                    host = min(free, key=lambda h: (h.outstanding, h.calls))
+                    host.begin()
+                    return host
+                # Re-checked at least every second, so a host whose breaker resets is noticed.
+                self._available.wait(timeout=1.0)
+
+    def _release_host(self, host, error=None):
+        with self._available:
+            host.end(error, self.failure_threshold, self.reset_after)
+            self._available.notify_all()
+
+    def _failover(self, host, error, tried):
+        # Returns True if the request should be sent to another host after `error` from `host`.
+        if not _is_server_failure(error):
+            return False
+        tried.append(host)
+        if len(tried) == len(self.hosts):
+            return False
+        print(f"[LLM session] Request to {host.url} failed ({error}), failing over")
+        return True
+
+    def chat(self, model, messages, options=None, format=None):
+        """
+        Sends one chat request to the least loaded available host, failing over to the others.
+        """
+        tried = []
+        while True:
+            host = self._acquire_host(tried)
+            try:
+                response = _ollama_response(host.client.post("/api/chat", json=_ollama_request(
+                    model=model, messages=messages, options=options, format=format, keep_alive=self.keep_alive)))
+            except Exception as e:
+                self._release_host(host, e)
+                if self._failover(host, e, tried):
+                    continue
+                raise
+            self._release_host(host)
+            return response
+
+    def run_async(self, coroutine):
+        """
+        Runs a coroutine on the session's event loop and waits for its result.
+
+        Async clients are bound to the event loop they are used on. The session keeps one loop
+        running in a background thread, so the per-host async clients of `async_client` (and their
+        pooled connections) serve every document instead of being rebuilt for each `asyncio.run`.
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever, name="llm-session-loop",
+                                                     daemon=True)
+                self._loop_thread.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def async_client(self):
+        """
+        Returns the session's client whose `chat` coroutine routes like `chat`, over one
+        `httpx.AsyncClient` per host. Only use it in coroutines run with `run_async`.
+        """
+        with self._loop_lock:
+            if self._async_client is None:
+                self._async_client = _AsyncSessionClient(self)
+            return self._async_client
+
+    def health_check(self):
+        """
+        Asks every host for its loaded models; a host that does not answer has its breaker opened.
+
+        Returns:
+        -------
+        list of _OllamaHost
+            The hosts that answered.
+        """
+        healthy = []
+        for host in self.hosts:
+            try:
+                loaded = _ollama_response(host.client.get("/api/ps"))
+            except Exception as e:
+                with self._available:
+                    host.trip()
+                print(f"[LLM session] Health check of {host.url} failed ({e}); it gets no requests "
+                      f"for {self.reset_after}s")
+                continue
+            names = [model.get("model") or model.get("name", "") for model in loaded.get("models", [])]
+            print(f"[LLM session] {host.url} is up, loaded models: {', '.join(names) or 'none'}")
+            healthy.append(host)
+        return healthy
+
+    def warm_up(self, models, hosts=None):
+        """
+        Loads `models` into each host's memory with an empty generate request each, so the first
+        documents do not pay the model load time. Hosts are warmed up in parallel, and models stay
+        loaded for `keep_alive`.
+
+        Parameters:
+        ----------
+        models : list of str
+            Model names to load.
+        hosts : list of _OllamaHost, optional
+            Hosts to warm up (default is all of them).
+
+        Returns:
+        -------
+        None
+        """
+        def load(host):
+            for model in models:
+                start = time.perf_counter()
+                try:
+                    _ollama_response(host.client.post("/api/generate", json=_ollama_request(
+                        model=model, prompt="", keep_alive=self.keep_alive)))
+                except Exception as e:
+                    print(f"[LLM session] Could not load {model} on {host.url}: {e}")
+                    if _is_server_failure(e):
+                        with self._available:
+                            host.trip()
+                        return
+                    continue
+                print(f"[LLM session] {model} loaded on {host.url} in {time.perf_counter() - start:.1f}s "
+                      f"(keep-alive {self.keep_alive})")
+
+        threads = [threading.Thread(target=load, args=(host,)) for host in (self.hosts if hosts is None else hosts)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def report(self):
+        for host in self.hosts:
+            print(f"[LLM session] {host.calls} requests to {host.url}, {host.failures} server failures "
+                  f"({host.trips} circuit breaker trips)")
+        if self.rejected:
+            print(f"[LLM session] {self.rejected} requests rejected while no host was available")
+
+    def close(self):
+        if self._loop is not None:
+            if self._async_client is not None:
+                asyncio.run_coroutine_threadsafe(self._async_client.aclose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join()
+            self._loop.close()
+            self._loop = None
+        for host in self.hosts:
+            host.client.close()
+
+
+class _AsyncSessionClient:
+    # AsyncClient stand-in for coroutines: routes, caps and fails over through the session's host state.
+
+    def __init__(self, session):
+        self.session = session
+        self._clients = {}
+
+    async def chat(self, model, messages, options=None, format=None):
+        session = self.session
+        tried = []
+        while True:
+            # Waiting for a free host slot blocks, so it happens off the event loop.
+            host = await asyncio.to_thread(session._acquire_host, tried)
+            client = self._clients.get(host.url)
+            if client is None:
+                client = self._clients[host.url] = httpx.AsyncClient(base_url=host.url, timeout=session.timeout)
+            try:
+                response = _ollama_response(await client.post("/api/chat", json=_ollama_request(
+                    model=model, messages=messages, options=options, format=format, keep_alive=session.keep_alive)))
+            except Exception as e:
+                session._release_host(host, e)
+                if session._failover(host, e, tried):
+                    continue
+                raise
+            session._release_host(host)
+            return response
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients = {}
+
+
+def _is_server_failure(error):
+    # Failures that say the server is down or overloaded; a bad request (e.g. unknown model) is not one.
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code >= 500
+    return isinstance(error, (ConnectionError, httpx.TransportError))
+
+
+# Ollama session of the current run; None until open_llm_session is called (requests then use ollama.chat).
+_session = None
+
+
+def open_llm_session(hosts=None, models=(), keep_alive="30m", timeout=None, failure_threshold=3, reset_after=30.0,
+                     max_concurrency=None, warm_up=True):
+    """
+    Opens a persistent session to one or more Ollama servers, checks them and pre-loads `models`.
+
+    Parameters:
+    ----------
+    hosts : list of str, optional
+        Ollama server addresses (default is the OLLAMA_HOST environment variable, else localhost).
+    models : list of str
+        Models to load at startup on every host, e.g. the model cascade.
+    keep_alive : str or float, optional
+        How long the servers keep a model loaded after a request (default is "30m").
+    timeout : float, optional
+        Seconds before a request is abandoned (default is None, no timeout).
+    failure_threshold : int
+        Consecutive server failures that open a host's circuit breaker (default is 3).
+    reset_after : float
+        Seconds a breaker stays open before a trial request (default is 30).
+    max_concurrency : int or None
+        Maximum requests in flight per host (default is None, no limit).
+    warm_up : bool
+        Whether to load `models` now (default is True).
+
+    Returns:
+    -------
+    LLMSession
+        The new session.
+
+    Raises:
+    ------
+    LLMUnavailableError
+        If no host answers the health check; the run cannot extract anything.
+    """
+    global _session
+    close_llm_session()
+    _session = LLMSession(hosts, keep_alive=keep_alive, timeout=timeout, failure_threshold=failure_threshold,
+                          reset_after=reset_after, max_concurrency=max_concurrency)
+    healthy = _session.health_check()
+    if not healthy:
+        hosts = ", ".join(host.url for host in _session.hosts)
+        close_llm_session()
+        raise LLMUnavailableError(f"No Ollama host answered the health check ({hosts})")
+    if warm_up:
+        _session.warm_up(models, healthy)
+    return _session
+
+
+def close_llm_session():
+    """
+    Prints the per-host request and failure counts and closes the HTTP clients, if a session is open.
+
+    Returns:
+    -------
+    None
+    """
+    global _session
+    if _session is not None:
+        _session.report()
+        _session.close()
+        _session = None
+
+
+def _send_chat(model, messages, options, format):
+    # Sends a chat request to the server, through the session when one is open.
+    if _session is not None:
+        return _session.chat(model, messages, options=options, format=format)
+    return ollama.chat(model=model, messages=messages, options=options, format=format)
+
+
+class ModelCascade:
+    """
+    Ordered list of models to try, cheapest first, with per-tier statistics.
+
+    A request goes to the first model; only if the caller's validation rejects the answer is it
+    escalated to the next one. The last model is also the default for every query that does not
+    name one. Calls, accepted answers and time spent of first-pass metadata queries (`run`) are
+    counted per model so the share of documents served by the cheap tiers, and the latency saved,
+    can be reported; re-prompts are not counted, so they do not skew the hit rates.
+
+    Parameters:
+    ----------
+    models : list of str
+        Model names, from the cheapest to the most capable.
+    """
+
+    def __init__(self, models):
+        if not models:
+            raise ValueError("The model cascade needs at least one model")
+        self.models = list(models)
+        self.default = self.models[-1]
+        self._stats = {model: {"calls": 0, "accepted": 0, "seconds": 0.0} for model in self.models}
+        self._lock = threading.Lock()
+
+    def record(self, model, accepted, seconds):
+        """
+        Counts one call to `model`, whether its answer was accepted, and how long it took.
+        """
+        with self._lock:
+            stats = self._stats.setdefault(model, {"calls": 0, "accepted": 0, "seconds": 0.0})
+            stats["calls"] += 1
+            stats["accepted"] += int(accepted)
+            stats["seconds"] += seconds
+
+    def run(self, request, accept, budget=None):
+        """
+        Sends `request` to each model in turn until `accept` approves the answer.
+
+        Parameters:
+        ----------
+        request : callable
+            Called with a model name; returns that model's answer.
+        accept : callable
+            Called with an answer and whether it comes from the last model; returns True if it
+            passes validation.
+        budget : DocumentBudget, optional
+            Each tier's call needs a call from this budget.
+
+        Returns:
+        -------
+        object or None
+            The first accepted answer, else the last model's answer; None if no call was allowed.
+        """
+        answer = None
+        for model in self.models:
+            if budget is not None and not budget.acquire():
+                break
+            start = time.perf_counter()
+            answer = request(model)
+            accepted = accept(answer, model == self.default)
+            self.record(model, accepted, time.perf_counter() - start)
+            if accepted:
+                break
+            if model != self.default:
+                print(f"[Model cascade] {model} answer rejected, escalating")
+        return answer
+
+    def report(self):
+        """
+        Prints the hit rate (share of accepted answers) and average latency of each tier.
+        """
+        if len(self.models) == 1 and not self._stats[self.default]["calls"]:
+            return
+        with self._lock:
+            for tier, model in enumerate(self.models, start=1):
+                stats = self._stats[model]
+                calls = stats["calls"]
+                hit_rate = stats["accepted"] / calls if calls else 0.0
+                average = stats["seconds"] / calls if calls else 0.0
+                print(f"[Model cascade] tier {tier} {model}: {stats['accepted']} / {calls} answers accepted "
+                      f"(hit rate {hit_rate:.1%}), {average:.2f}s per call, {stats['seconds']:.1f}s total")
+
+
+# Models tried for each request, cheapest first; the last one is the default model (see open_model_cascade).
+_cascade = ModelCascade(["mistral"])
+
+
+def open_model_cascade(models):
+    """
+    Sets the models tried for each request, cheapest first, e.g. ["llama3.2:3b", "mistral"].
+
+    Parameters:
+    ----------
+    models : list of str
+        Model names; the last one is also used for retries and for queries that name no model.
+
+    Returns:
+    -------
+    None
+    """
+    global _cascade
+    _cascade = ModelCascade(models)
+
+
+def close_model_cascade():
+    """
+    Prints the per-tier hit rates and restores the single-model default ("mistral").
+
+    Returns:
+    -------
+    None
+    """
+    global _cascade
+    _cascade.report()
+    _cascade = ModelCascade(["mistral"])
+
+
+def cascade_query(request, accept, budget=None):
+    """
+    Runs `request` through the current model cascade; see `ModelCascade.run`.
+    """
+    return _cascade.run(request, accept, budget)
+
+
+def open_response_cache(path, max_bytes):
+    """
+    Enables the persistent LLM response cache used by `query_llm` and `llm_single_field_query`.
+
+    Responses are keyed by model, messages and generation options, so re-running the pipeline on
+    the same corpus (e.g. during evaluation) replays the first answer to every prompt instead of
+    querying Ollama again. The cache does not notice a model being re-pulled under the same tag;
+    delete the cache file or run with `--no-llm-cache` in that case.
 
     Parameters:
     ----------
     path : str or Path
-        File path to the prompt template.
-    doc_text : str
-        The document text to inject into the template (truncated to 3000 characters).
+        Location of the SQLite cache file.
+    max_bytes : int
+        Maximum compressed size of the cache before least recently used responses are evicted.
+
+    Returns:
+    -------
+    None
+    """
+    global _response_cache
+    close_response_cache()
+    _response_cache = DiskCache(path, max_bytes, name="LLM response cache")
+
+
+def close_response_cache():
+    """
+    Prints the LLM response cache hit rate and closes the cache, if one is open.
+
+    Returns:
+    -------
+    None
+    """
+    global _response_cache
+    if _response_cache is not None:
+        _response_cache.report()
+        _response_cache.close()
+        _response_cache = None
+
+
+class _LLMUsage:
+    """
+    Appends the token counts and durations Ollama reports for each call to a CSV file, and totals them per model.
+
+    `prompt_eval_count` only counts the prompt tokens the server actually evaluated, so it drops
+    when the server reuses a cached prompt prefix; the `prefix` column (a hash of the system
+    prompt) groups calls that share one.
+
+    Parameters:
+    ----------
+    path : str or Path
+        CSV file to append to; created with a header row if it does not exist.
+    """
+
+    COLUMNS = ["Time", "Model", "Prefix", "Source", "Prompt_Eval_Count", "Prompt_Eval_Seconds",
+               "Eval_Count", "Eval_Seconds", "Load_Seconds", "Total_Seconds"]
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        new_file = not self.path.exists() or self.path.stat().st_size == 0
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        if new_file:
+            self._writer.writerow(self.COLUMNS)
+        self._totals = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+
+    def record(self, model, messages, response):
+        if response.get("prompt_eval_count") is None and response.get("eval_count") is None:
+            return
+        source = "replay" if _traffic is not None and _traffic.mode == "replay" else "server"
+        system = next((message["content"] for message in messages if message["role"] == "system"), "")
+        prefix = hashlib.sha256(system.encode("utf-8")).hexdigest()[:12] if system else ""
+        prompt_tokens = response.get("prompt_eval_count") or 0
+        eval_tokens = response.get("eval_count") or 0
+        # Durations are reported in nanoseconds.
+        seconds = {key: (response.get(key) or 0) / 1e9
+                   for key in ("prompt_eval_duration", "eval_duration", "load_duration", "total_duration")}
+        with self._lock:
+            self._writer.writerow([time.strftime("%Y-%m-%d %H:%M:%S"), model, prefix, source, prompt_tokens,
+                                   f"{seconds['prompt_eval_duration']:.3f}", eval_tokens,
+                                   f"{seconds['eval_duration']:.3f}", f"{seconds['load_duration']:.3f}",
+                                   f"{seconds['total_duration']:.3f}"])
+            totals = self._totals[model]
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["eval_tokens"] += eval_tokens
+            for key, value in seconds.items():
+                totals[key] += value
+
+    def report(self):
+        with self._lock:
+            for model, totals in self._totals.items():
+                calls = int(totals["calls"])
+                print(f"[LLM usage] {model}: {calls} calls, {int(totals['prompt_tokens'])} prompt tokens evaluated "
+                      f"({totals['prompt_tokens'] / calls:.0f} per call, {totals['prompt_eval_duration']:.1f}s), "
+                      f"{int(totals['eval_tokens'])} tokens generated ({totals['eval_duration']:.1f}s), "
+                      f"{totals['load_duration']:.1f}s loading, {totals['total_duration']:.1f}s total")
+        print(f"[LLM usage] Per-call counts written to {self.path}")
+
+    def close(self):
+        self._file.close()
+
+
+# Per-call token accounting; None when disabled (see open_usage_log).
+_usage = None
+
+
+def open_usage_log(path):
+    """
+    Starts logging the prompt and generated token counts and durations of every LLM call to a CSV file.
+
+    Calls answered from the response cache have no counts and are not logged; replayed calls log
+    the recorded counts.
+
+    Parameters:
+    ----------
+    path : str or Path
+        CSV file to append to.
+
+    Returns:
+    -------
+    None
+    """
+    global _usage
+    close_usage_log()
+    _usage = _LLMUsage(path)
+
+
+def close_usage_log():
+    """
+    Prints the token and time totals per model and closes the usage log, if one is open.
+
+    Returns:
+    -------
+    None
+    """
+    global _usage
+    if _usage is not None:
+        _usage.report()
+        _usage.close()
+        _usage = None
+
+
+def _response_key(model, messages, options, format=None):
+    request = {"model": model, "messages": messages, "options": options}
+    if format is not None:
+        request["format"] = format
+    payload = json.dumps(request, sort_keys=True)
+    return "chat:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _chat(model, messages, options=None, fresh=False, format=None):
+    """
+    Sends a chat request to Ollama and returns the stripped response text, going through the
+    response cache when it is open.
+
+    Parameters:
+    ----------
+    model : str
+        The LLM model name to query.
+    messages : list of dict
+        Chat messages.
+    options : dict, optional
+        Ollama generation options (temperature, seed, ...); part of the cache key.
+    fresh : bool
+        If True, always query the model and leave the cache untouched. Retries of a prompt whose
+        first answer was rejected need a new sample, not the cached one.
+    format : str or dict, optional
+        Ollama output format: "json" or a JSON schema constraining the response; part of the cache key.
 
     Returns:
     -------
     str
-        Prompt string with the document text inserted.
+        The response content.
+    """
+    key, cached = _cache_lookup(model, messages, options, format, fresh)
+    if cached is not None:
+        return cached
+
+    if _traffic is not None:
+        response = _traffic.chat(model, messages, options=options, format=format)
+    else:
+        response = _send_chat(model, messages, options, format)
+    if _usage is not None:
+        _usage.record(model, messages, response)
+    raw = response['message']['content'].strip()
+
+    if key is not None:
+        _response_cache.put_json(key, raw)
+    return raw
+
+
+async def _achat(client, model, messages, options=None, fresh=False, format=None):
     """
-    with open(path, "r") as file:
-        template = file.read()
-    return template.replace("{{DOCUMENT_TEXT}}", doc_text.strip()[:3000])
+    Asynchronous `_chat` through a session's `async_client()`, with the same response cache and record/replay handling.
+    """
+    key, cached = _cache_lookup(model, messages, options, format, fresh)
+    if cached is not None:
+        return cached
+
+    if _traffic is not None:
+        response = await asyncio.to_thread(_traffic.chat, model, messages, options, format)
+    else:
+        response = await client.chat(model=model, messages=messages, options=options, format=format)
+    if _usage is not None:
+        _usage.record(model, messages, response)
+    raw = response['message']['content'].strip()
+
+    if key is not None:
+        _response_cache.put_json(key, raw)
+    return raw
+
+
+def _cache_lookup(model, messages, options, format, fresh):
+    # Returns (key to store the response under or None, cached response or None).
+    if _response_cache is None or fresh:
+        return None, None
+    key = _response_key(model, messages, options, format)
+    return key, _response_cache.get_json(key)
+
+
+# Prompt templates read so far, by path: (static instructions, text after the document placeholder).
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def _read_template(path):
+    path = str(path)
+    with _templates_lock:
+        parts = _templates.get(path)
+        if parts is None:
+            with open(path, "r") as file:
+                template = file.read()
+            head, _, tail = template.partition("{{DOCUMENT_TEXT}}")
+            parts = _templates[path] = (head, tail)
+    return parts
 
 
-def query_llm(prompt, model="llama2", system_prompt=None):
+def load_prompt_parts(path, doc_text, max_tokens=1000):
+    """
+    Splits a prompt template around the {{DOCUMENT_TEXT}} placeholder into a system prompt and a user prompt.
+
+    Everything before the placeholder (instructions and few-shot examples) becomes the system prompt,
+    which is identical for every document, so the Ollama server can reuse its evaluated prefix instead
+    of re-reading the instructions each time. The user prompt is the document text followed by the rest
+    of the template. Each template file is read once per run.
+
+    Parameters:
+    ----------
+    path : str or Path
+        File path to the prompt template.
+    doc_text : str or list of str
+        The document text, or its cleaned pages, to inject.
+    max_tokens : int or None, optional
+        Token budget for the document text. Longer documents are cut down to their most informative
+        spans (see `context_builder.build_context`) (default is 1000; None inserts the text whole).
+
+    Returns:
+    -------
+    tuple of str
+        (system_prompt, prompt).
+    """
+    head, tail = _read_template(path)
+    return head.rstrip(), build_context(doc_text, max_tokens) + tail
+
+
+def _reprompt_parts(reprompt_path, text, context):
+    # A context prepared by the caller is used as is; otherwise the document text is cut to the default budget.
+    if context is None:
+        return load_prompt_parts(reprompt_path, text)
+    return load_prompt_parts(reprompt_path, context, max_tokens=None)
+
+
+def parse_llm_json(raw):
+    """
+    Safely parses a JSON object out of raw LLM output, without evaluating it.
+
+    Tries, in order: the whole output as JSON; the outermost {...} block as JSON, then as a Python
+    literal (single-quoted dicts); and finally "key": "value" pairs recovered one by one, which
+    salvages the complete fields of a truncated or otherwise broken object.
+
+    Parameters:
+    ----------
+    raw : str
+        Raw response text from the LLM.
+
+    Returns:
+    -------
+    dict or None
+        The parsed object, or None if nothing could be recovered.
+    """
+    candidates = [raw]
+    block = re.search(r"\{.*\}", raw, re.DOTALL)
+    if block:
+        candidates.append(block.group(0))
+    for candidate in candidates:
+        for loads in (json.loads, ast.literal_eval):
+            try:
+                parsed = loads(candidate)
+            except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+                continue
+            if isinstance(parsed, dict):
+                return parsed
+
+    pairs = re.findall(r"""["']?(\w+)["']?\s*:\s*(?:"((?:[^"\\]|\\.)*)"|'([^']*)')""", raw)
+    if pairs:
+        return {key: _unescape(double) if double else single for key, double, single in pairs}
+    return None
+
+
+def _unescape(value):
+    try:
+        return json.loads(f'"{value}"')
+    except ValueError:
+        return value
+
+
+def repair_metadata(parsed):
+    """
+    Normalises a parsed LLM object into a metadata dictionary with exactly the expected keys.
+
+    Key names are matched case-insensitively, unexpected keys are dropped, values are coerced to
+    strings (null and empty values become "none") and missing keys are filled with "none", so a
+    partial answer keeps the fields it did extract.
+
+    Parameters:
+    ----------
+    parsed : dict
+        Object returned by `parse_llm_json`.
+
+    Returns:
+    -------
+    dict
+        Metadata dictionary that passes `keys_are_well_formed`.
+    """
+    normalised = {str(key).strip().lower(): value for key, value in parsed.items()}
+    metadata_dict = {}
+    for key in METADATA_KEYS:
+        value = normalised.get(key)
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(str(item) for item in value if item is not None)
+        value = "" if value is None else str(value).strip()
+        metadata_dict[key] = value or "none"
+    return metadata_dict
+
+
+def query_llm(prompt, model=None, system_prompt=None, options=None, fresh=False, structured=True, fields=None):
     """
     Queries an LLM via the Ollama API to extract a metadata dictionary.
 
@@ -32,25 +1069,47 @@ def query_llm(prompt, model="llama2", system_prompt=None):
     ----------
     prompt : str
         The prompt to send to the LLM.
-    model : str
-        The LLM model name to query (default is "llama2").
+    model : str, optional
+        The LLM model name to query (default is the last model of the cascade, "mistral" unless configured).
     system_prompt : str, optional
         An optional system-level prompt to prepend to the conversation.
+    options : dict, optional
+        Ollama generation options.
+    fresh : bool
+        Bypass the response cache, e.g. when retrying after a rejected answer (default is False).
+    structured : bool
+        Constrain the output to `METADATA_SCHEMA` (default is True). Needs Ollama 0.5 or later.
+    fields : list of str, optional
+        Only these metadata keys are asked for: the schema is restricted to them and the other keys
+        come back "none" (default is all six).
 
     Returns:
     -------
     dict
-        Metadata dictionary with keys like 'site_id', 'title', etc. Defaults to 'none' values on failure.
+        Metadata dictionary with keys like 'site_id', 'title', etc. Fields missing from a partial
+        answer are "none"; all values are 'none' (and readable 'no') if nothing could be parsed.
+
+    Raises:
+    ------
+    LLMUnavailableError
+        If no Ollama host is available; the document was not read at all.
     """
+    model = model or _cascade.default
     messages = [{"role": "user", "content": prompt}]
     if system_prompt:
         messages.insert(0, {"role": "system", "content": system_prompt})
 
     try:
-        response = ollama.chat(model=model, messages=messages)
-        raw = response['message']['content'].strip()
-        metadata_dict = eval(raw)
+        raw = _chat(model, messages, options=options, fresh=fresh,
+                    format=metadata_schema(fields) if structured else None)
+        parsed = parse_llm_json(raw)
+        if parsed is None:
+            raise ValueError(f"Unparseable LLM output: {raw[:200]!r}")
+        metadata_dict = repair_metadata(parsed)
 
+    except LLMUnavailableError:
+        # Not an unreadable document: the caller decides what happens to documents while no host is up.
+        raise
     except Exception as e:
         print(e)
         metadata_dict = {
@@ -65,7 +1124,7 @@ def query_llm(prompt, model="llama2", system_prompt=None):
     return metadata_dict
 
 
-def llm_single_field_query(prompt, model="llama2", system_prompt=None) -> str:
+def llm_single_field_query(prompt, model=None, system_prompt=None, options=None, fresh=False) -> str:
     """
     Queries the LLM for a single metadata field (e.g., title or site_id).
 
@@ -73,30 +1132,39 @@ def llm_single_field_query(prompt, model="llama2", system_prompt=None) -> str:
     ----------
     prompt : str
         Prompt specific to the single field being extracted.
-    model : str
-        The LLM model name to query.
+    model : str, optional
+        The LLM model name to query (default is the last model of the cascade, "mistral" unless configured).
     system_prompt : str, optional
         Optional system prompt.
+    options : dict, optional
+        Ollama generation options.
+    fresh : bool
+        Bypass the response cache, e.g. when retrying after a rejected answer (default is False).
 
     Returns:
     -------
     str
         The extracted value as a string.
     """
+    model = model or _cascade.default
     messages = [{"role": "user", "content": prompt}]
     if system_prompt:
         messages.insert(0, {"role": "system", "content": system_prompt})
-    response = ollama.chat(model=model, messages=messages)
-    raw = response['message']['content'].strip()
+    return _chat(model, messages, options=options, fresh=fresh)
 
-    return raw
+
+# Validated text fields and the word count each must stay under
+FIELD_LENGTHS = {'title': 25, 'sender': 17, 'receiver': 17}
 
 
 def all_words_in_text(field, text):
     """
     Checks whether all words in the field are present in the source document text.
 
-    Useful for verifying if the LLM-generated field is hallucinated or not.
+    Useful for verifying if the LLM-generated field is hallucinated or not. Punctuation and digits
+    are ignored (the LLM occasionally adds harmless punctuation). The document's vocabulary is built
+    once per text and reused by every later check (see `utils.field_verifier`), and OCR-tolerant
+    fuzzy word matching applies when enabled.
 
     Parameters:
     ----------
@@ -110,23 +1178,7 @@ def all_words_in_text(field, text):
     bool
         True if all words in the field exist in the document text, else False.
     """
-
-    # Remove all punctuation and digits before checking (LLM occasionally adds harmless punctuation)
-    field = re.sub(r'[^\w\s]', ' ', field)
-    field = re.sub(r'\d+', ' ', field)
-
-    text = re.sub(r'[^\w\s]', ' ', text)
-    text = re.sub(r'\d+', ' ', text)
-
-    # If field is nothing but whitespace, punctuation, or digits, reject it
-    if not field.strip():
-        return False
-
-    # If any word in field does not occur in actual text, reject it
-    for word in field.lower().split():
-        if word not in text.lower().split():
-            return False
-    return True
+    return field_words_in_text(field, text)
 
 
 def field_is_well_formed(field, text, length):
@@ -153,7 +1205,8 @@ def field_is_well_formed(field, text, length):
     return False
 
 
-def validate_and_reprompt_field(field_name, length, reprompt_path, metadata_dict, text, filename, flagged_for_review, max_retries=5):
+def validate_and_reprompt_field(field_name, length, reprompt_path, metadata_dict, text, filename, flagged_for_review, max_retries=5,
+                                budget=None, context=None):
     """
     Validates a specific field in the metadata dictionary. If invalid, re-prompts LLM up to `max_retries` times.
 
@@ -177,6 +1230,12 @@ def validate_and_reprompt_field(field_name, length, reprompt_path, metadata_dict
         Dictionary to collect fields needing manual verification.
     max_retries : int, optional
         Maximum number of re-prompting attempts before giving up (default is 5).
+    budget : DocumentBudget, optional
+        The document's LLM call budget. Each re-prompt needs a call from it, and retries vary
+        temperature and seed instead of bypassing the response cache.
+    context : str, optional
+        Document text for the prompt as built by `build_context`, used as is (default is `text` cut
+        to the default token budget).
 
     Returns:
     -------
@@ -190,11 +1249,15 @@ def validate_and_reprompt_field(field_name, length, reprompt_path, metadata_dict
             not field_is_well_formed(metadata_dict[field_name], text, length=length) and
             retries < max_retries
         ):
+            if budget is not None and not budget.acquire():
+                break
             print(
                 f"Retrying {field_name} extraction, attempt {retries + 1}/{max_retries}")
-            reprompt = load_prompt_template(reprompt_path, text)
+            system_prompt, reprompt = _reprompt_parts(reprompt_path, text, context)
+            # The first re-prompt may come from the cache; repeats of the same prompt need a new sample.
             metadata_dict[field_name] = llm_single_field_query(
-                reprompt, model="mistral")
+                reprompt, system_prompt=system_prompt, options=budget.retry_options(retries) if budget is not None else None,
+                fresh=budget is None and retries > 0)
             retries += 1
 
         if metadata_dict[field_name].strip().lower() != 'none' and not field_is_well_formed(metadata_dict[field_name], text, length=length):
@@ -202,6 +1265,162 @@ def validate_and_reprompt_field(field_name, length, reprompt_path, metadata_dict
             print(f"{filename} flagged for manual review: {field_name.upper()}")
 
 
+def reprompt_invalid_fields(validators, reprompt_path, metadata_dict, text, max_retries=5, model=None,
+                            structured=True, budget=None, context=None):
+    """
+    Re-prompts the LLM once for all currently invalid fields together, instead of one retry loop per field.
+
+    Each attempt sends a single request built from the combined template (the invalid field names
+    replace {{FIELDS}}, after the document) and asks for a JSON object holding just those fields. Every returned value is
+    written back and re-checked with its validator; fields that are still invalid go into the next
+    attempt, so a bad document costs at most `max_retries` LLM calls in total.
+
+    Parameters:
+    ----------
+    validators : dict
+        Maps each field name to a function returning True if a value for that field is acceptable.
+    reprompt_path : Path
+        Path to the combined re-prompt template.
+    metadata_dict : dict
+        Metadata dictionary to validate and update in place.
+    text : str
+        OCR-cleaned document text injected into the prompt.
+    max_retries : int, optional
+        Maximum number of combined re-prompts (default is 5).
+    model : str, optional
+        The LLM model name to query. By default the first attempt goes through the model cascade
+        (cheapest model first, escalating while fields are still invalid) and retries use the largest model.
+    structured : bool, optional
+        Constrain the output to a JSON schema of the requested fields (default is True).
+    budget : DocumentBudget, optional
+        The document's LLM call budget. Each attempt needs a call from it, and retries vary
+        temperature and seed instead of bypassing the response cache.
+    context : str, optional
+        Document text for the prompt (default is `text` cut to the default token budget).
+
+    Returns:
+    -------
+    list of str
+        Fields that are still invalid after the last attempt.
+    """
+    invalid = [field for field, is_valid in validators.items() if not is_valid(metadata_dict.get(field, "none"))]
+    retries = 0
+    while invalid and retries < max_retries:
+        if model is not None:
+            models = [model]
+        else:
+            models = _cascade.models if retries == 0 else [_cascade.default]
+        for tier_model in models:
+            if not invalid:
+                break
+            if budget is not None and not budget.acquire():
+                return invalid
+            print(f"Retrying {', '.join(invalid)} extraction with {tier_model}, attempt {retries + 1}/{max_retries}")
+            system_prompt, prompt = _reprompt_parts(reprompt_path, text, context)
+            # The field list goes in the user message, so the system prompt stays identical across calls.
+            prompt = prompt.replace("{{FIELDS}}", "\n".join(f'- "{field}"' for field in invalid))
+            schema = {
+                "type": "object",
+                "properties": {field: {"type": "string"} for field in invalid},
+                "required": invalid,
+                "additionalProperties": False,
+            }
+            try:
+                raw = _chat(tier_model, [{"role": "system", "content": system_prompt},
+                                         {"role": "user", "content": prompt}],
+                            options=budget.retry_options(retries) if budget is not None else None,
+                            fresh=budget is None and retries > 0, format=schema if structured else None)
+                parsed = parse_llm_json(raw) or {}
+            except LLMUnavailableError:
+                raise
+            except Exception as e:
+                print(e)
+                parsed = {}
+
+            # Omitted fields keep their invalid value (rather than becoming "none") and are asked for again.
+            answers = {str(key).strip().lower(): value for key, value in parsed.items()}
+            for field in invalid:
+                value = answers.get(field)
+                if value is not None and not isinstance(value, (dict, list)):
+                    metadata_dict[field] = str(value).strip() or "none"
+            invalid = [field for field in invalid if not validators[field](metadata_dict.get(field, "none"))]
+        retries += 1
+    return invalid
+
+
+async def _reprompt_field_async(client, field, is_valid, reprompt_path, metadata_dict, text, context, max_retries,
+                                model, budget):
+    retries = 0
+    while not is_valid(metadata_dict.get(field, "none")) and retries < max_retries:
+        if budget is not None and not budget.acquire():
+            break
+        print(f"Retrying {field} extraction, attempt {retries + 1}/{max_retries}")
+        system_prompt, reprompt = _reprompt_parts(reprompt_path, text, context)
+        try:
+            metadata_dict[field] = await _achat(
+                client, model, [{"role": "system", "content": system_prompt}, {"role": "user", "content": reprompt}],
+                options=budget.retry_options(retries) if budget is not None else None,
+                fresh=budget is None and retries > 0)
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            print(e)
+        retries += 1
+    return is_valid(metadata_dict.get(field, "none"))
+
+
+def reprompt_fields_concurrently(reprompts, metadata_dict, text, max_retries=5, model=None, budget=None, context=None):
+    """
+    Re-prompts every invalid field with its own single-field template, all fields at once.
+
+    Each field runs its own retry loop as a coroutine on the session's async client, so the slow
+    re-prompts of a messy document overlap instead of running one after another. All loops share
+    the document text and write their answers into `metadata_dict`.
+
+    Parameters:
+    ----------
+    reprompts : dict
+        Maps each field name to a (validator, reprompt_path) pair; the validator returns True if a
+        value for the field is acceptable.
+    metadata_dict : dict
+        Metadata dictionary to validate and update in place.
+    text : str
+        OCR-cleaned document text injected into the prompts.
+    max_retries : int, optional
+        Maximum number of re-prompts per field (default is 5).
+    model : str, optional
+        The LLM model name to query (default is the last model of the cascade).
+    budget : DocumentBudget, optional
+        The document's LLM call budget, shared by all fields.
+    context : str, optional
+        Document text for the prompts (default is `text` cut to the default token budget).
+
+    Returns:
+    -------
+    list of str
+        Fields that are still invalid after their last attempt.
+    """
+    model = model or _cascade.default
+
+    async def run(client):
+        valid = await asyncio.gather(*(
+            _reprompt_field_async(client, field, is_valid, reprompt_path, metadata_dict, text, context,
+                                  max_retries, model, budget)
+            for field, (is_valid, reprompt_path) in reprompts.items()))
+        return [field for field, ok in zip(reprompts, valid) if not ok]
+
+    if _session is not None:
+        # The session's loop and per-host async clients are reused by every document.
+        return _session.run_async(run(_session.async_client()))
+
+    # Without a session, a temporary one to the default host serves this call only.
+    session = LLMSession()
+    try:
+        return session.run_async(run(session.async_client()))
+    finally:
+        session.close()
+
+
 def keys_are_well_formed(metadata_dict):
     """
     Validates that `metadata_dict` contains exactly the expected keys.
@@ -234,3 +1453,36 @@ def keys_are_well_formed(metadata_dict):
     }:
         return True
     return False
+
+
+def metadata_is_usable(metadata_dict, text, final=True):
+    """
+    Checks an LLM metadata answer the way the pipeline's LLM stage does: all six keys present, a
+    title on readable documents, and title, sender and receiver well formed unless "none".
+    Used as the model cascade's acceptance check.
+
+    Parameters:
+    ----------
+    metadata_dict : dict
+        Metadata dictionary returned by `query_llm`.
+    text : str
+        OCR-cleaned document text the fields must come from.
+    final : bool, optional
+        Whether the answer comes from the last model of the cascade (default is True). Only the last
+        model may declare a document unreadable: a cheap model's readable="no", or the all-"none"
+        answer `query_llm` returns when the call fails (e.g. the model is not pulled), is escalated.
+
+    Returns:
+    -------
+    bool
+        True if no retry or re-prompt would be triggered by the answer.
+    """
+    if not keys_are_well_formed(metadata_dict):
+        return False
+    if metadata_dict['readable'].strip().lower() == 'no':
+        return final
+    if metadata_dict['title'].strip().lower() == 'none':
+        return False
+    return all(metadata_dict[field].strip().lower() == 'none' or
+               field_is_well_formed(metadata_dict[field], text, length=length)
+               for field, length in FIELD_LENGTHS.items())
@@ -1,7 +1,35 @@
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import multiprocessing.util
 import os
 import fitz  # PyMuPDF
+import hashlib
 import re
+import threading
+from collections import OrderedDict
+from .cache import DiskCache
+
+# Process pool shared by all text extraction calls; None means extract in the calling process.
+_extraction_pool = None
+_extraction_workers = 1
+
+# Persistent page text cache keyed by file content hash; None means always extract.
+_page_cache = None
+
+# Pages extracted so far from recently used documents, keyed by path, size and modification time.
+_page_memo = OrderedDict()
+_page_memo_size = 64
+_page_memo_lock = threading.Lock()
+
+# Pages from the start of a document whose layout (fonts, image coverage) is recorded during extraction, for triage.
+LAYOUT_PAGES = 8
+
+# OCR fallback settings for pages without a text layer; None means such pages stay empty (see open_ocr).
+_ocr = None
+
+# OCR result cache of the current process, opened on first use inside each pool worker.
+_worker_ocr_cache = None
 
 def load_pdfs(pdf_dir: Path):
     """
@@ -16,36 +44,574 @@ def load_pdfs(pdf_dir: Path):
     return sorted([file for file in pdf_dir.glob("*.pdf") if file.is_file()])
 
 
-def extract_text_from_pdf(pdf_path, max_pages=5):
+def clean_ocr_text(text):
+    """
+    Cleans up raw OCR-extracted text by removing unwanted characters and excess whitespace.
+
+    Parameters:
+        text (str): Raw text extracted from a PDF document.
+
+    Returns:
+        str: Cleaned and normalized text suitable for LLM prompting.
+    """
+    text = text.replace("\n", " ")
+    text = re.sub(r'[^a-zA-Z0-9\s:,\-./]', '', text)  
+    text = re.sub(r'\s{2,}', ' ', text)
+    return text.strip()
+
+
+
+def start_extraction_pool(workers=None):
+    """
+    Starts the process pool used by `extract_clean_pages` and `iter_clean_pages_batch`.
+
+    PyMuPDF parsing and OCR cleanup are CPU-bound and hold the GIL, so running them in separate
+    processes lets extraction scale across all cores.
+
+    Parameters:
+        workers (int, optional): Number of extraction processes. None uses one per CPU core;
+            1 or less keeps extraction in the calling process.
+
+    Returns:
+        None
+    """
+    global _extraction_pool, _extraction_workers
+    shutdown_extraction_pool()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    _extraction_workers = max(workers, 1)
+    if workers > 1:
+        # Spawn rather than fork: the parent already runs torch and pipeline threads.
+        _extraction_pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker)
+        print(f"[Extraction] Started pool with {workers} processes")
+
+
+def _init_worker():
+    # Each worker opens its own OCR cache connection on first use; close it when the worker exits.
+    multiprocessing.util.Finalize(None, _close_worker_ocr_cache, exitpriority=10)
+
+
+def shutdown_extraction_pool():
+    """
+    Shuts down the extraction process pool, if one is running.
+
+    Returns:
+        None
+    """
+    global _extraction_pool, _extraction_workers
+    if _extraction_pool is not None:
+        _extraction_pool.shutdown(cancel_futures=True)
+        _extraction_pool = None
+    _extraction_workers = 1
+
+
+def open_page_cache(path, max_bytes):
+    """
+    Enables the persistent page text cache used by `extract_clean_pages` and `iter_clean_pages_batch`.
+
+    Entries are keyed by the SHA-256 of the PDF bytes, so renamed or copied files (e.g. the copies
+    organized under OUTPUT_DIR) hit the same entry, and a modified file never returns stale text.
+
+    Parameters:
+        path (Path): Location of the SQLite cache file.
+        max_bytes (int): Maximum compressed size of the cache before old entries are evicted.
+
+    Returns:
+        None
+    """
+    global _page_cache
+    close_page_cache()
+    _page_cache = DiskCache(path, max_bytes, name="Page text cache")
+
+
+def close_page_cache():
+    """
+    Prints the page text cache hit rate and closes the cache, if one is open.
+
+    Returns:
+        None
+    """
+    global _page_cache
+    if _page_cache is not None:
+        _page_cache.report()
+        _page_cache.close()
+        _page_cache = None
+
+
+def open_ocr(language="eng", dpi=300, cache_path=None, cache_max_bytes=1024 ** 3):
+    """
+    Enables the OCR fallback for pages without a text layer (scans), using Tesseract through PyMuPDF.
+
+    Pages that have images but no extractable text are rendered and recognised one page per task
+    in the extraction pool. Results are cached under the SHA-256 of the rendered page image, so a
+    page is never recognised twice, even when the same scan appears in another file. Tesseract is
+    optional: if PyMuPDF cannot find it, OCR stays disabled and scanned pages stay empty.
+
+    Parameters:
+        language (str): Tesseract language code(s), e.g. "eng" or "eng+fra" (default: "eng").
+        dpi (int): Resolution the pages are rendered at for recognition (default: 300).
+        cache_path (Path, optional): Location of the SQLite OCR result cache; None disables caching.
+        cache_max_bytes (int): Maximum compressed size of the OCR cache (default: 1 GiB).
+
+    Returns:
+        None
+    """
+    global _ocr
+    close_ocr()
+    try:
+        fitz.get_tessdata()
+    except RuntimeError as e:
+        print(f"[OCR] Tesseract not available ({e}); scanned pages will not be recognised")
+        return
+    _ocr = {"language": language, "dpi": dpi, "cache_path": None if cache_path is None else str(cache_path),
+            "cache_max_bytes": cache_max_bytes, "pages": 0, "hits": 0, "lock": threading.Lock()}
+    print(f"[OCR] Enabled for scanned pages (language {language}, {dpi} dpi)")
+
+
+def close_ocr():
+    """
+    Prints the number of pages recognised and disables the OCR fallback, if enabled.
+
+    Returns:
+        None
+    """
+    global _ocr
+    if _ocr is not None:
+        if _ocr["pages"]:
+            print(f"[OCR] {_ocr['pages']} scanned pages: {_ocr['hits']} from the OCR cache, "
+                  f"{_ocr['pages'] - _ocr['hits']} recognised")
+        _ocr = None
+    _close_worker_ocr_cache()
+
+
+def file_sha256(path):
+    """
+    Computes the SHA-256 hex digest of a file's bytes.
+
+    Parameters:
+        path (Path): Path to the file.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def page_layout(page, images=None):
+    """
+    Reads a page's layout from PyMuPDF page metadata, without extracting or rendering anything.
+
+    Parameters:
+        page (fitz.Page): Page of an open PDF.
+        images (list, optional): The page's `get_image_info()`, if already read.
+
+    Returns:
+        list: [uses fonts, share of the page area covered by images], as read by triage.
+    """
+    if images is None:
+        images = page.get_image_info()
+    area = abs(page.rect)
+    covered = sum(abs(fitz.Rect(image["bbox"]) & page.rect) for image in images)
+    return [bool(page.get_fonts()), covered / area if area else 0.0]
+
+
+def _iter_pages(doc, start=0, max_pages=None, max_chars=None):
+    """
+    Yields (raw, cleaned, scanned, layout) for the pages of an open PDF from page `start`, one page
+    at a time; `scanned` is True for pages with images but no text layer (candidates for OCR), and
+    `layout` is the page's [uses fonts, image coverage] for the first LAYOUT_PAGES pages, else None.
+
+    Stops after `max_pages` pages, or after the page that brings the cleaned text to `max_chars`
+    characters, so the pages beyond the budget are never parsed or cleaned.
+    """
+    chars = 0
+    stop = doc.page_count if max_pages is None else min(doc.page_count, start + max_pages)
+    for number in range(start, stop):
+        page = doc[number]
+        raw = page.get_text()
+        clean = clean_ocr_text(raw)
+        layout = None
+        if number < LAYOUT_PAGES:
+            images = page.get_image_info()
+            layout = page_layout(page, images)
+            scanned = not clean and bool(images)
+        else:
+            scanned = not clean and bool(page.get_image_info())
+        yield raw, clean, scanned, layout
+        chars += len(clean)
+        if max_chars is not None and chars >= max_chars:
+            return
+
+
+def _extract_pages(pdf_path, max_pages=None, max_chars=None, start=0):
     """
-    Extracts text from the first few pages of a PDF file using PyMuPDF.
+    Extracts the raw and OCR-cleaned text of the pages of a PDF, within a budget. Runs inside pool workers.
 
     Parameters:
         pdf_path (Path): Path to the PDF file.
-        max_pages (int): Maximum number of pages to extract text from (default: 5).
+        max_pages (int, optional): Maximum number of pages to extract; None extracts every page.
+        max_chars (int, optional): Stop once the cleaned pages hold this many characters; None for no limit.
+        start (int): Index of the first page to extract (default: 0).
 
     Returns:
-        str: Concatenated text from the specified number of pages.
+        dict: {"raw": list[str], "clean": list[str], "complete": bool, "scanned": list[int],
+            "layout": list[list]}, one entry per extracted page in page order; "complete" is True if
+            the last page of the document was reached, "scanned" lists the page numbers that still
+            need OCR and "layout" holds the layout of the extracted pages among the first LAYOUT_PAGES.
     """
     doc = fitz.open(pdf_path)
-    text = ""
-    for page in doc[:max_pages]:
-        text += page.get_text()
-    doc.close()
-    return text
+    try:
+        pages = list(_iter_pages(doc, start, max_pages, max_chars))
+        complete = start + len(pages) >= doc.page_count
+    finally:
+        doc.close()
+    return {"raw": [raw for raw, _, _, _ in pages], "clean": [clean for _, clean, _, _ in pages],
+            "complete": complete,
+            "scanned": [start + index for index, (_, _, scanned, _) in enumerate(pages) if scanned],
+            "layout": [layout for _, _, _, layout in pages if layout is not None]}
 
 
-def clean_ocr_text(text):
+def _open_worker_ocr_cache(cache_path, cache_max_bytes):
+    # The OCR cache connection of the current process, opened on first use.
+    global _worker_ocr_cache
+    if _worker_ocr_cache is None:
+        _worker_ocr_cache = DiskCache(cache_path, cache_max_bytes, name="OCR cache")
+    return _worker_ocr_cache
+
+
+def _close_worker_ocr_cache():
+    global _worker_ocr_cache
+    if _worker_ocr_cache is not None:
+        _worker_ocr_cache.close()
+        _worker_ocr_cache = None
+
+
+def _ocr_page(pdf_path, number, language, dpi, cache_path, cache_max_bytes):
     """
-    Cleans up raw OCR-extracted text by removing unwanted characters and excess whitespace.
+    Renders one page and recognises its text with Tesseract. Runs inside pool workers.
+
+    Returns:
+        tuple[str, bool]: Raw recognised text, and whether it came from the OCR cache.
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        pixmap = doc[number].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    finally:
+        doc.close()
+    digest = hashlib.sha256(f"{pixmap.width}x{pixmap.height}:".encode() + pixmap.samples).hexdigest()
+    key = f"ocr:{language}:{dpi}:{digest}"
+    if cache_path is not None:
+        text = _open_worker_ocr_cache(cache_path, cache_max_bytes).get_json(key)
+        if text is not None:
+            return text, True
+    recognised = fitz.open("pdf", pixmap.pdfocr_tobytes(language=language))
+    try:
+        text = recognised[0].get_text()
+    finally:
+        recognised.close()
+    if cache_path is not None:
+        _worker_ocr_cache.put_json(key, text)
+    return text, False
+
+
+def _scanned_in_budget(entry, start, max_chars):
+    # Scanned page numbers up to the page whose cleaned text reaches `max_chars`.
+    if max_chars is None:
+        return entry["scanned"]
+    chars = 0
+    last = len(entry["clean"]) - 1
+    for index, clean in enumerate(entry["clean"]):
+        chars += len(clean)
+        if chars >= max_chars:
+            last = index
+            break
+    return [number for number in entry["scanned"] if number - start <= last]
+
+
+def _recognise_scanned(pdf_path, entry, start=0, max_chars=None):
+    """
+    Fills the scanned pages of an extraction result with OCR text, in place, if OCR is enabled.
+
+    Pages are recognised in page order, as many at a time as there are extraction processes, and
+    only up to the page where the cleaned text reaches `max_chars`; later scanned pages stay in
+    "scanned" until a larger budget needs them.
+
+    Returns:
+        bool: Whether any page was recognised.
+    """
+    if _ocr is None or not entry.get("scanned"):
+        return False
+    settings = (_ocr["language"], _ocr["dpi"], _ocr["cache_path"], _ocr["cache_max_bytes"])
+    recognised = False
+    while True:
+        wave = _scanned_in_budget(entry, start, max_chars)[:_extraction_workers]
+        if not wave:
+            return recognised
+        if _extraction_pool is not None:
+            futures = [_extraction_pool.submit(_ocr_page, pdf_path, number, *settings) for number in wave]
+            results = [future.result() for future in futures]
+        else:
+            results = [_ocr_page(pdf_path, number, *settings) for number in wave]
+        for number, (text, _) in zip(wave, results):
+            entry["raw"][number - start] = text
+            entry["clean"][number - start] = clean_ocr_text(text)
+        entry["scanned"] = [number for number in entry["scanned"] if number not in wave]
+        with _ocr["lock"]:
+            _ocr["pages"] += len(results)
+            _ocr["hits"] += sum(hit for _, hit in results)
+        recognised = True
+
+
+class _PendingExtraction:
+    """
+    Extraction of one PDF, either running in the pool or deferred until its result is needed.
+    """
+
+    def __init__(self, pdf_path, max_pages):
+        self.pdf_path = pdf_path
+        self.max_pages = max_pages
+        self.future = None
+        if _extraction_pool is not None:
+            self.future = _extraction_pool.submit(_extract_pages, pdf_path, max_pages)
+
+    def result(self):
+        if self.future is None:
+            return _extract_pages(self.pdf_path, self.max_pages)
+        return self.future.result()
+
+    def cancel(self):
+        if self.future is not None:
+            self.future.cancel()
+
+
+def _lookup_pages(pdf_path, max_pages):
+    """
+    Returns (cache key, cached entry or pending extraction) for a PDF.
+
+    With the cache enabled, misses extract every page so the entry can serve any later `max_pages`.
+    """
+    if _page_cache is None:
+        return None, _PendingExtraction(pdf_path, max_pages)
+    key = f"pages:{file_sha256(pdf_path)}"
+    entry = _page_cache.get_json(key)
+    # Entries written by a budgeted extraction only hold the first pages of the document.
+    if entry is not None and (entry.get("complete", True) or
+                              (max_pages is not None and len(entry["clean"]) >= max_pages)):
+        return key, entry
+    return key, _PendingExtraction(pdf_path, None)
+
+
+def _resolve_pages(pdf_path, key, job, max_pages):
+    """
+    Waits for a pending extraction, recognises its scanned pages if OCR is enabled (storing the
+    result in the cache) and returns the cleaned pages.
+    """
+    if isinstance(job, _PendingExtraction):
+        job = job.result()
+        _recognise_scanned(pdf_path, job)
+        if key is not None:
+            _page_cache.put_json(key, job)
+    elif _recognise_scanned(pdf_path, job) and key is not None:
+        _page_cache.put_json(key, job)
+    return job["clean"][:max_pages]
+
+
+class _DocumentPages:
+    """
+    Cleaned pages extracted so far from one PDF, extended on demand.
+    """
+
+    def __init__(self, pdf_path):
+        self.pdf_path = pdf_path
+        self.key = None
+        self.raw = []
+        self.clean = []
+        self.complete = False
+        # Page numbers without a text layer that have not been recognised yet.
+        self.scanned = []
+        # Layout of the extracted pages among the first LAYOUT_PAGES; None for cache entries written without it.
+        self.layout = []
+        self.lock = threading.Lock()
+        if _page_cache is not None:
+            self.key = f"pages:{file_sha256(pdf_path)}"
+            entry = _page_cache.get_json(self.key)
+            if entry is not None:
+                self.raw, self.clean = entry["raw"], entry["clean"]
+                self.complete = entry.get("complete", True)
+                self.scanned = entry.get("scanned", [])
+                self.layout = entry.get("layout")
+
+    def _store(self):
+        if self.key is not None:
+            _page_cache.put_json(self.key, {"raw": self.raw, "clean": self.clean, "complete": self.complete,
+                                            "scanned": self.scanned, "layout": self.layout})
+
+    def recognise(self, max_chars):
+        # Recognises the scanned pages held so far that are within the budget.
+        entry = {"raw": self.raw, "clean": self.clean, "complete": self.complete, "scanned": self.scanned}
+        if _recognise_scanned(self.pdf_path, entry, 0, max_chars):
+            self.scanned = entry["scanned"]
+            self._store()
+
+    def extend(self, max_pages, max_chars):
+        # Extracts the next pages (in the pool, if started) within the remaining budget; returns False at the end.
+        if self.complete:
+            return False
+        start = len(self.clean)
+        if _extraction_pool is not None:
+            entry = _extraction_pool.submit(_extract_pages, self.pdf_path, max_pages, max_chars, start).result()
+        else:
+            entry = _extract_pages(self.pdf_path, max_pages, max_chars, start)
+        _recognise_scanned(self.pdf_path, entry, start, max_chars)
+        self.raw += entry["raw"]
+        self.clean += entry["clean"]
+        self.complete = entry["complete"]
+        self.scanned += entry["scanned"]
+        if self.layout is not None:
+            self.layout += entry["layout"]
+        self._store()
+        return bool(entry["clean"])
+
+
+def document_pages(pdf_path):
+    """
+    Returns the memoised pages of a PDF, shared by every reader of the file while it stays in the memo.
+
+    Holding the returned object (e.g. in a `DocumentContext`) keeps the pages extracted so far
+    even after the memo evicts them; pass it to `iter_clean_pages` / `extract_clean_pages`.
 
     Parameters:
-        text (str): Raw text extracted from a PDF document.
+        pdf_path (Path): Path to the PDF file.
 
     Returns:
-        str: Cleaned and normalized text suitable for LLM prompting.
+        _DocumentPages: Pages extracted so far, extended on demand.
     """
-    text = text.replace("\n", " ")
-    text = re.sub(r'[^a-zA-Z0-9\s:,\-./]', '', text)  
-    text = re.sub(r'\s{2,}', ' ', text)
-    return text.strip()
+    stat = os.stat(pdf_path)
+    key = (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime_ns)
+    with _page_memo_lock:
+        pages = _page_memo.get(key)
+        if pages is not None:
+            _page_memo.move_to_end(key)
+            return pages
+    pages = _DocumentPages(pdf_path)
+    with _page_memo_lock:
+        pages = _page_memo.setdefault(key, pages)
+        if len(_page_memo) > _page_memo_size:
+            _page_memo.popitem(last=False)
+    return pages
+
+
+def iter_clean_pages(pdf_path, max_pages=None, max_chars=None, pages=None):
+    """
+    Yields the cleaned text of a PDF page by page, until a page or character budget is met.
+
+    Pages are extracted only as far as the budget needs (in the extraction pool, if started) and
+    memoised per document: a later call for the same file, e.g. the duplicate check after the
+    prompt text was extracted, reuses the pages already cleaned and extracts only the rest. With
+    the page text cache enabled, the pages extracted so far are also stored there. With OCR
+    enabled (see `open_ocr`), scanned pages within the budget are recognised before they are yielded.
+
+    Parameters:
+        pdf_path (Path): Path to the PDF file.
+        max_pages (int, optional): Maximum number of pages to yield; None for no limit.
+        max_chars (int, optional): Stop after the page that brings the yielded text to this many
+            characters; None for no limit.
+        pages (_DocumentPages, optional): Pages of the file from `document_pages`; looked up in the
+            memo if omitted.
+
+    Yields:
+        str: Cleaned text of each page, in page order.
+    """
+    document = pages if pages is not None else document_pages(pdf_path)
+    index = 0
+    chars = 0
+    while max_pages is None or index < max_pages:
+        with document.lock:
+            if index >= len(document.clean):
+                remaining_pages = None if max_pages is None else max_pages - index
+                remaining_chars = None if max_chars is None else max_chars - chars
+                if not document.extend(remaining_pages, remaining_chars):
+                    return
+            if _ocr is not None and index in document.scanned:
+                # Extracted before OCR was enabled, or beyond the budget of an earlier read.
+                document.recognise(max_chars)
+            page = document.clean[index]
+        yield page
+        index += 1
+        chars += len(page)
+        if max_chars is not None and chars >= max_chars:
+            return
+
+
+def extract_clean_pages(pdf_path, max_pages=None, max_chars=None, pages=None):
+    """
+    Extracts the cleaned per-page text of a single PDF, within an optional page and character budget.
+
+    See `iter_clean_pages`; served from the per-document memo and the page text cache when possible.
+
+    Parameters:
+        pdf_path (Path): Path to the PDF file.
+        max_pages (int, optional): Maximum number of pages to return; None returns every page.
+        max_chars (int, optional): Stop after the page that reaches this many characters; None for no limit.
+        pages (_DocumentPages, optional): Pages of the file from `document_pages`.
+
+    Returns:
+        list[str]: Cleaned text of each page, in page order.
+    """
+    return list(iter_clean_pages(pdf_path, max_pages, max_chars, pages))
+
+
+def iter_clean_pages_batch(pdf_paths, max_pages=None):
+    """
+    Extracts the cleaned per-page text of a batch of PDFs, in parallel if the extraction pool is started.
+
+    Cached files cost a lookup; the rest are submitted up front and results are yielded in input
+    order. Closing the generator early (e.g. after a match is found) cancels the extractions not
+    yet started.
+
+    Parameters:
+        pdf_paths (list[Path]): Paths to the PDF files.
+        max_pages (int, optional): Maximum number of pages to return per file; None returns every page.
+
+    Yields:
+        tuple[Path, list[str] | None, Exception | None]: The path, its cleaned page texts (None on
+            failure) and the exception raised while extracting it (None on success).
+    """
+    jobs = []
+    for pdf_path in pdf_paths:
+        try:
+            jobs.append((pdf_path, *_lookup_pages(pdf_path, max_pages), None))
+        except Exception as e:
+            jobs.append((pdf_path, None, None, e))
+
+    try:
+        for pdf_path, key, job, error in jobs:
+            if error is not None:
+                yield pdf_path, None, error
+                continue
+            try:
+                yield pdf_path, _resolve_pages(pdf_path, key, job, max_pages), None
+            except Exception as e:
+                yield pdf_path, None, e
+    finally:
+        for _, _, job, _ in jobs:
+            if isinstance(job, _PendingExtraction):
+                job.cancel()
+
+
+def join_pages(pages):
+    """
+    Joins cleaned page texts into a single document string, skipping empty pages.
+
+    Parameters:
+        pages (list[str]): Cleaned text of each page.
+
+    Returns:
+        str: Space-separated document text.
+    """
+    return " ".join(page for page in pages if page)
@@ -1,8 +1,12 @@
 import csv
+import threading
 from pathlib import Path
 
 _log_headers = []
 
+# Serialises writers so concurrent workers never interleave or clobber log rows.
+_log_lock = threading.Lock()
+
 
 def init_log(filepath: Path, headers: list):
     """
@@ -23,7 +27,7 @@ def init_log(filepath: Path, headers: list):
     global _log_headers
     _log_headers = headers
     filepath.parent.mkdir(parents=True, exist_ok=True)
-    with open(filepath, mode='a', newline='', encoding='utf-8') as f:
+    with _log_lock, open(filepath, mode='a', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         writer.writerow(headers)
 
@@ -44,7 +48,7 @@ def log_metadata(filepath: Path, row: dict):
     -------
     None
     """
-    with open(filepath, mode='a', newline='', encoding='utf-8') as f:
+    with _log_lock, open(filepath, mode='a', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         writer.writerow([row.get(col, "") for col in _log_headers])
 
@@ -67,19 +71,43 @@ def update_log_row(log_path: Path, original_filename: str, updated_values: dict)
     -------
     None
     """
+    update_log_rows(log_path, {original_filename: updated_values})
+
+
+def update_log_rows(log_path: Path, updates: dict):
+    """
+    Applies updates to several rows of the CSV log, rewriting the file once.
+
+    Parameters:
+    ----------
+    log_path : pathlib.Path
+        Path to the existing CSV log file.
+    updates : dict
+        Maps each 'Original_Filename' to the dictionary of column values to update in its row.
+
+    Returns:
+    -------
+    None
+    """
+    with _log_lock:
+        _rewrite_log_rows(log_path, updates)
+
+
+def _rewrite_log_rows(log_path: Path, updates: dict):
     temp_rows = []
-    found = False
+    found = set()
 
     with open(log_path, mode='r', newline='', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         fieldnames = reader.fieldnames
         for row in reader:
-            if row["Original_Filename"] == original_filename:
+            updated_values = updates.get(row["Original_Filename"])
+            if updated_values is not None:
                 row.update(updated_values)
-                found = True
+                found.add(row["Original_Filename"])
             temp_rows.append(row)
 
-    if not found:
+    for original_filename in updates.keys() - found:
         print(
             f"[WARNING] Could not find {original_filename} in metadata log to update.")
 
@@ -1,8 +1,11 @@
 import re
 import os
 import string
+import hashlib
 from pathlib import Path
-from .loader import extract_text_from_pdf, clean_ocr_text
+from .loader import extract_clean_pages, iter_clean_pages_batch, file_sha256
+from .dedup_index import NearDuplicateIndex
+from .rouge_engine import rouge1_counts, rouge1_recall, rouge1_recall_upper_bound
 from rouge_score import rouge_scorer
 import pandas as pd
 import sys
@@ -61,55 +64,303 @@ def _clean(txt: str) -> str:
 #         best = max(best, worst)
 #     return best
 
+_dedup_index = None  # NearDuplicateIndex when open; None falls back to scanning the site directory
+_dedup_candidates = {"enabled": True, "min_similarity": 0.3, "limit": 10, "full_scan_below": 20}  # see open_dedup_index
+
+
+def open_dedup_index(path, min_similarity=0.3, max_candidates=10, full_scan_below=20, candidates=True):
+    """
+    Opens the persistent near-duplicate index: the exact-hash registry and the MinHash LSH index
+    used by `check_duplicate_by_rouge`.
+
+    The candidate cutoffs can miss true near-duplicates whose estimated Jaccard similarity is low
+    (e.g. OCR-noisy variants the RapidFuzz fallback would confirm), so sites with few documents,
+    where a full comparison is cheap, are still compared against every file. With `candidates`
+    off, every file of the site is compared, but exact duplicates are still resolved by hash and
+    the index is kept up to date.
+
+    Parameters:
+        path (Path): Location of the SQLite index file.
+        min_similarity (float): Minimum estimated Jaccard similarity of a candidate (default: 0.3).
+        max_candidates (int): Maximum number of candidates compared in full (default: 10).
+        full_scan_below (int): Sites with fewer indexed documents than this are scanned in full (default: 20).
+        candidates (bool): Whether near-duplicate candidates come from the LSH index (default: True).
+
+    Returns:
+        None
+    """
+    global _dedup_index, _dedup_candidates
+    close_dedup_index()
+    _dedup_index = NearDuplicateIndex(path)
+    _dedup_candidates = {"enabled": candidates, "min_similarity": min_similarity, "limit": max_candidates,
+                         "full_scan_below": full_scan_below}
+
+
+def close_dedup_index():
+    """
+    Closes the near-duplicate index, if one is open.
+
+    Returns:
+        None
+    """
+    global _dedup_index
+    if _dedup_index is not None:
+        _dedup_index.close()
+        _dedup_index = None
+
+
+def _site_key(site_id_dir):
+    # Partition by output directory, not site ID, so evaluation and production outputs stay separate.
+    return str(Path(site_id_dir).resolve())
+
+
+def _walk_site_pdfs(site_id, site_id_dir, exclude_path=None):
+    """
+    Lists the organized PDFs of a site, skipping files that don't carry the site ID and `exclude_path`.
+    """
+    paths = []
+    for root, _, files in os.walk(site_id_dir):
+        for file in files:
+            if not file.lower().endswith(".pdf"):
+                continue
+            if site_id and str(site_id) not in file:
+                continue
+
+            cand_path = Path(root) / file
+            if exclude_path is not None and cand_path.resolve() == exclude_path.resolve():
+                continue
+            paths.append(cand_path)
+    return paths
+
+
+def text_sha256(text):
+    """
+    Hashes the normalised document text (lowercase, no punctuation, single spaces).
+
+    Parameters:
+        text (str): Cleaned document text.
+
+    Returns:
+        str or None: Hex digest, or None for documents without text, which must never match each other.
+    """
+    normalised = _clean(text)
+    if not normalised:
+        return None
+    return hashlib.sha256(normalised.encode("utf-8")).hexdigest()
+
+
+def _signature(text, document=None):
+    # MinHash signature of the text, kept on the document's context when there is one.
+    if document is None:
+        return _dedup_index.signature(text)
+    return document.derived("minhash", lambda: _dedup_index.signature(text))
+
+
+def _add_to_index(site, file_path, text, document=None):
+    """
+    Registers an organized document's MinHash signature and exact hashes in the index.
+    With the document's context, its hashes and signature are reused instead of recomputed.
+    """
+    _dedup_index.add(
+        site, file_path, _signature(text, document),
+        file_hash=file_sha256(file_path) if document is None else document.file_hash,
+        text_hash=text_sha256(text) if document is None else document.text_hash,
+        text_length=len(text))
+
+
+def _index_site(site_id, site_id_dir):
+    """
+    Builds the near-duplicate index of a site from the files already in its output directory.
+    Only needed once per site, e.g. for output organized before the index existed.
+    """
+    site = _site_key(site_id_dir)
+    for path, pages, error in iter_clean_pages_batch(_walk_site_pdfs(site_id, site_id_dir)):
+        if error is not None:
+            print(f"[WARN] {path.name}: {error}")
+            continue
+        _add_to_index(site, path, " ".join(pages))
+    _dedup_index.mark_site_indexed(site)
+
+
+def _ensure_site_indexed(site_id, site_id_dir):
+    if not _dedup_index.has_site(_site_key(site_id_dir)):
+        _index_site(site_id, site_id_dir)
+
+
+def index_organized_file(site_id, site_id_dir, file_path, document=None):
+    """
+    Adds a newly organized file to its site's near-duplicate index and hash registry.
+    No-op if the index is disabled.
+
+    Parameters:
+        site_id (str): Site ID of the document.
+        site_id_dir (Path): Output directory of the site.
+        file_path (Path): Location of the organized file.
+        document (DocumentContext, optional): Context of the input file it was copied from; its
+            text, hashes and signature are reused instead of extracting the copy again.
+
+    Returns:
+        None
+    """
+    if _dedup_index is None:
+        return
+    site = _site_key(site_id_dir)
+    if not _dedup_index.has_site(site):
+        # The walk picks up the new file along with anything organized before the index existed.
+        _index_site(site_id, site_id_dir)
+        return
+    if document is None:
+        _add_to_index(site, file_path, " ".join(extract_clean_pages(file_path)))
+    else:
+        _add_to_index(site, file_path, document.full_text, document)
+
+
+def reindex_renamed_file(site_id_dir, old_path, new_path):
+    """
+    Points the near-duplicate index at an organized file's new name. No-op if the index is disabled.
+
+    Parameters:
+        site_id_dir (Path): Output directory of the site.
+        old_path (Path): Previous location of the file.
+        new_path (Path): New location of the file.
+
+    Returns:
+        None
+    """
+    if _dedup_index is not None:
+        _dedup_index.move(_site_key(site_id_dir), old_path, new_path)
+
+
+def _exact_match(site_id, site_id_dir, current_file_path, file_hash=None, text_hash=None):
+    """
+    Returns (path, cleaned text length) of an organized file of the site with the same bytes or
+    the same normalised text as the current document, or None.
+    """
+    match = _dedup_index.find_exact(_site_key(site_id_dir), file_hash=file_hash, text_hash=text_hash)
+    if match is None:
+        return None
+    cand_path = match[0]
+    if not cand_path.exists():
+        _dedup_index.remove(_site_key(site_id_dir), cand_path)
+        return _exact_match(site_id, site_id_dir, current_file_path, file_hash, text_hash)
+    if cand_path.resolve() == current_file_path.resolve():
+        return None
+    if site_id and str(site_id) not in cand_path.name:
+        return None
+    return match
+
+
+def _index_candidates(site_id, site_id_dir, cur_text, current_file_path, document=None):
+    """
+    Returns the short list of likely near-duplicates of the current document from the site's index.
+    """
+    site = _site_key(site_id_dir)
+    candidate_paths = []
+    for cand_path, estimate in _dedup_index.candidates(site, _signature(cur_text, document),
+                                                       min_similarity=_dedup_candidates["min_similarity"],
+                                                       limit=_dedup_candidates["limit"]):
+        if not cand_path.exists():
+            # Removed or renamed outside the pipeline.
+            _dedup_index.remove(site, cand_path)
+            continue
+        if site_id and str(site_id) not in cand_path.name:
+            continue
+        if cand_path.resolve() == current_file_path.resolve():
+            continue
+        candidate_paths.append(cand_path)
+    print(f"[Dedup index] {len(candidate_paths)} candidate(s) for full comparison")
+    return candidate_paths
+
+
 def check_duplicate_by_rouge(
     current_file_path: Path,
     site_id: str,
     site_id_dir: Path,
     rouge_th: float = 0.75,
     rapid_th: float = 78.0,
-    rouge_metric: str = "rouge1"
+    rouge_metric: str = "rouge1",
+    document=None
 ) -> tuple[str, Path | None, bool, float]:
     """
     Two-step duplicate detector comparing full document text using ROUGE and RapidFuzz.
 
+    If the near-duplicate index is open (`open_dedup_index`), byte-identical files and files with
+    identical normalised text are resolved first with a hash lookup ("exact", score 1.0). Then,
+    unless its candidate selection is off, only the candidates the index returns are compared,
+    most similar first. Otherwise every PDF in the site directory is compared.
+
+    ROUGE-1 is computed by `utils.rouge_engine` from cached stemmed token counts, and pairs whose
+    token totals make `rouge_th` unreachable skip scoring. Other metrics use rouge_score directly.
+
+    With the document's `DocumentContext` (`document`), its text, hashes and MinHash signature are
+    reused, and kept for indexing the organized copy later.
+
     Returns:
         (duplicate_status, matched_file_path, is_current_file_shorter, similarity_score)
     """
-    scorer = rouge_scorer.RougeScorer([rouge_metric], use_stemmer=True)
-
-    try:
-        cur_doc = fitz.open(current_file_path)
-        cur_text = " ".join([clean_ocr_text(page.get_text()) for page in cur_doc])
-        cur_doc.close()
-    except Exception:
-        return "no", None, False, 0.0
+    fast_rouge1 = rouge_metric == "rouge1"
+    if not fast_rouge1:
+        scorer = rouge_scorer.RougeScorer([rouge_metric], use_stemmer=True)
 
     if not site_id_dir.exists():
         return "no", None, False, 0.0
 
-    for root, _, files in os.walk(site_id_dir):
-        for file in files:
-            if not file.lower().endswith(".pdf"):
-                continue
-            if site_id and str(site_id) not in file:
-                continue
+    if _dedup_index is not None:
+        _ensure_site_indexed(site_id, site_id_dir)
+        # Byte-identical rescans and re-uploads: no text extraction needed.
+        try:
+            file_hash = file_sha256(current_file_path) if document is None else document.file_hash
+            exact = _exact_match(site_id, site_id_dir, current_file_path, file_hash=file_hash)
+        except OSError:
+            exact = None
+        if exact is not None:
+            print(f"[EXACT DUPLICATE] {exact[0].name}")
+            return "exact", exact[0], True, 1.0
 
-            cand_path = Path(root) / file
-            if cand_path.resolve() == current_file_path.resolve():
-                continue
+    try:
+        cur_text = " ".join(extract_clean_pages(current_file_path)) if document is None else document.full_text
+    except Exception:
+        return "no", None, False, 0.0
 
-            try:
-                cand_doc = fitz.open(cand_path)
-                cand_text = " ".join([clean_ocr_text(p.get_text()) for p in cand_doc])
-                cand_doc.close()
-            except Exception as e:
-                print(f"[WARN] {cand_path.name}: {e}")
+    if _dedup_index is None:
+        candidate_paths = _walk_site_pdfs(site_id, site_id_dir, current_file_path)
+    else:
+        text_hash = text_sha256(cur_text) if document is None else document.text_hash
+        exact = _exact_match(site_id, site_id_dir, current_file_path, text_hash=text_hash)
+        if exact is not None:
+            print(f"[EXACT DUPLICATE (text)] {exact[0].name}")
+            return "exact", exact[0], len(cur_text) <= exact[1], 1.0
+        if (not _dedup_candidates["enabled"]
+                or _dedup_index.site_size(_site_key(site_id_dir)) < _dedup_candidates["full_scan_below"]):
+            # Few documents: comparing all of them costs little and keeps full recall.
+            candidate_paths = _walk_site_pdfs(site_id, site_id_dir, current_file_path)
+        else:
+            candidate_paths = _index_candidates(site_id, site_id_dir, cur_text, current_file_path, document)
+
+    # Candidates are extracted in parallel (extraction pool) but compared in order.
+    candidates = iter_clean_pages_batch(candidate_paths)
+    try:
+        for cand_path, cand_pages, error in candidates:
+            file = cand_path.name
+            if error is not None:
+                print(f"[WARN] {file}: {error}")
                 continue
+            cand_text = " ".join(cand_pages)
 
             is_current_file_shorter = len(cur_text) <= len(cand_text)
 
             # ROUGE Recall
-            if is_current_file_shorter:
+            if fast_rouge1:
+                cur_counts, cand_counts = rouge1_counts(cur_text), rouge1_counts(cand_text)
+                if is_current_file_shorter:
+                    target_counts, prediction_counts = cand_counts, cur_counts
+                else:
+                    target_counts, prediction_counts = cur_counts, cand_counts
+                if rouge1_recall_upper_bound(target_counts, prediction_counts) < rouge_th:
+                    recall_score = 0.0
+                else:
+                    recall_score = rouge1_recall(target_counts, prediction_counts)
+            elif is_current_file_shorter:
                 recall_score = scorer.score(cand_text, cur_text)[rouge_metric].recall
             else:
                 recall_score = scorer.score(cur_text, cand_text)[rouge_metric].recall
@@ -123,6 +374,8 @@ def check_duplicate_by_rouge(
             if rapid_score >= rapid_th:
                 print(f"[LIKELY DUPLICATE (OCR)] {file}")
                 return "likely_duplicate_ocr", cand_path, is_current_file_shorter, rapid_score / 100.0
+    finally:
+        candidates.close()
 
     return "no", None, False, 0.0
 
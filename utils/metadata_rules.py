@@ -0,0 +1,224 @@
+import re
+import threading
+from collections import Counter
+from .llm_interface import FIELD_LENGTHS, field_is_well_formed
+
+# Labels that start another header field; a labelled value runs until the next one of these.
+_BOUNDARY = re.compile(
+    r"\b(?:to|from|re|subject|date|cc|attention|attn|file|our file|your file|reference|ref|site id|"
+    r"site identification(?: number)?|tel|phone|fax|email)\s*:|\bdear\b|\bsite\s+id\b|\bplease\b|"
+    r"\b(?:january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2}\b",
+    re.IGNORECASE)
+
+_SITE_ID = [
+    (re.compile(r"\bsite\s+(?:id|identification)(?:\s+(?:no|number))?\s*[:.]?\s*(\d{3,5})\b", re.IGNORECASE), 0.95),
+    (re.compile(r"\bsite\s+(?:no|number)\s*[:.]?\s*(\d{3,5})\b", re.IGNORECASE), 0.85),
+]
+
+_LABELLED = {
+    "title": [(re.compile(r"\b(?:re|subject)\s*:\s*", re.IGNORECASE), 15)],
+    "receiver": [(re.compile(r"\b(?:to|attention|attn)\s*:\s*", re.IGNORECASE), 12)],
+    "sender": [(re.compile(r"\bfrom\s*:\s*", re.IGNORECASE), 12)],
+}
+
+_ADDRESS = re.compile(
+    r"\b(?:located at|site at|situated at|property at|civic address\s*:?)\s+"
+    r"(\d{1,6}\s+(?:[A-Za-z0-9.]+\s+){0,4}?(?:Street|St|Avenue|Ave|Road|Rd|Way|Drive|Dr|Highway|Hwy|Boulevard|"
+    r"Blvd|Crescent|Cres|Place|Pl|Lane|Ln)\b\.?(?:,?\s+[A-Z][a-z]+){0,2}(?:,?\s+BC)?)")
+
+# Confidence of a labelled value that ends at the next label, or is cut at its word limit.
+BOUNDED_CONFIDENCE = 0.9
+UNBOUNDED_CONFIDENCE = 0.5
+# Confidence when the same label gives different values (e.g. two "Site ID:" lines).
+CONFLICT_CONFIDENCE = 0.4
+
+
+def _labelled_value(text, label, max_words):
+    # Value after `label` up to the next boundary label, and whether a boundary ended it in time.
+    rest = text[label.end():]
+    boundary = _BOUNDARY.search(rest)
+    value = rest[:boundary.start()] if boundary else rest
+    words = value.split()
+    bounded = boundary is not None and 0 < len(words) <= max_words
+    return " ".join(words[:max_words]).strip(" ,.-:"), bounded
+
+
+def _best(candidates):
+    # Most frequent value; conflicting values lower the confidence.
+    if not candidates:
+        return None
+    values = Counter(value for value, _ in candidates)
+    value = values.most_common(1)[0][0]
+    confidence = max(confidence for candidate, confidence in candidates if candidate == value)
+    if len(values) > 1:
+        confidence = min(confidence, CONFLICT_CONFIDENCE)
+    return value, confidence
+
+
+def extract_rule_fields(text):
+    """
+    Extracts metadata fields from literal labels in the document text, without an LLM.
+
+    Looks for "Site ID: 1234"-style labels, "Re:"/"Subject:" (title), "To:"/"Attention:"
+    (receiver), "From:" (sender) and "located at <street address>" (address). A labelled value
+    runs until the next label; it gets a high confidence if another label ends it within the
+    field's word limit, and a low one if it had to be cut. Labels that give different values
+    (e.g. two different site IDs) get a low confidence.
+
+    Parameters:
+        text (str): OCR-cleaned document text.
+
+    Returns:
+        dict: Field name -> (value, confidence between 0 and 1), for the fields found.
+    """
+    fields = {}
+
+    site_ids = [(match.group(1), confidence) for pattern, confidence in _SITE_ID for match in pattern.finditer(text)]
+    best = _best(site_ids)
+    if best:
+        fields["site_id"] = best
+
+    for field, labels in _LABELLED.items():
+        candidates = []
+        for pattern, max_words in labels:
+            for label in pattern.finditer(text):
+                value, bounded = _labelled_value(text, label, max_words)
+                if value and field == "title" and label.group(0).lower().startswith("re"):
+                    # Titles keep their "Re: " (see prompts/metadata_prompt.txt).
+                    value = "Re: " + value
+                if value:
+                    candidates.append((value, BOUNDED_CONFIDENCE if bounded else UNBOUNDED_CONFIDENCE))
+        # The first occurrence is the document's own header; differing later ones make it less certain.
+        if candidates:
+            value, confidence = candidates[0]
+            if any(other != value for other, _ in candidates[1:]):
+                confidence = min(confidence, CONFLICT_CONFIDENCE)
+            fields[field] = (value, confidence)
+
+    addresses = [(match.group(1).strip(" ,."), 0.85) for match in _ADDRESS.finditer(text)]
+    best = _best(addresses)
+    if best:
+        fields["address"] = best
+
+    return fields
+
+
+def rule_prefill(text, min_confidence):
+    """
+    Returns the fields the rule-based extractor fills with enough confidence to skip the LLM for them.
+
+    A field is kept if its confidence reaches `min_confidence` and it passes the same checks as an
+    LLM answer (word limit and words present in the text, or a 3- to 5-digit site ID).
+
+    Parameters:
+        text (str): OCR-cleaned document text.
+        min_confidence (float): Lowest confidence kept, e.g. `config.RULES_MIN_CONFIDENCE`.
+
+    Returns:
+        dict: Field name -> value.
+    """
+    prefilled = {}
+    for field, (value, confidence) in extract_rule_fields(text).items():
+        if confidence < min_confidence:
+            continue
+        if field in FIELD_LENGTHS and not field_is_well_formed(value, text, length=FIELD_LENGTHS[field]):
+            continue
+        if field == "site_id" and not re.fullmatch(r"\d{3,5}", value):
+            continue
+        prefilled[field] = value
+    return prefilled
+
+
+def fields_to_ask(prefilled, site_id=None):
+    """
+    Returns the metadata fields the LLM still has to extract after the rules.
+
+    Parameters:
+        prefilled (dict): Fields already filled (see `rule_prefill`), including a registry address.
+        site_id (str, optional): Site ID already known, e.g. from the filename.
+
+    Returns:
+        list[str]: Fields not filled, in prompt order; "site_id" only if no site ID is known.
+    """
+    return [field for field in ("title", "receiver", "sender", "address", "site_id")
+            if field not in prefilled and not (field == "site_id" and site_id)]
+
+
+def restrict_prompt(prompt, needed):
+    """
+    Prefixes the metadata prompt with the attributes left to extract when the rules filled the others.
+
+    Parameters:
+        prompt (str): Metadata user prompt.
+        needed (list[str]): Fields from `fields_to_ask`.
+
+    Returns:
+        tuple: (prompt, fields), where `fields` is `needed` plus "readable", the keys the LLM is asked for.
+    """
+    fields = needed + ["readable"]
+    instruction = f"Only extract these attributes: {', '.join(fields)}. The others are already known."
+    return f"{instruction}\n\n{prompt}", fields
+
+
+class RuleCoverage:
+    """
+    Counts, per field, how many documents the rule-based extractor filled, and the LLM work it saved.
+    """
+
+    def __init__(self):
+        self.documents = 0
+        self.filled = Counter()
+        self.llm_skipped = 0
+        self.site_id_reprompts_avoided = 0
+        self._lock = threading.Lock()
+
+    def record(self, filled, llm_skipped, site_id_from_rules):
+        """
+        Counts one document.
+
+        Parameters:
+            filled (iterable of str): Fields taken from the rules.
+            llm_skipped (bool): Whether the first LLM query was skipped because every field was filled.
+            site_id_from_rules (bool): Whether the rules supplied a site ID the filename did not have.
+        """
+        with self._lock:
+            self.documents += 1
+            self.filled.update(set(filled))
+            self.llm_skipped += int(llm_skipped)
+            self.site_id_reprompts_avoided += int(site_id_from_rules)
+
+    def report(self):
+        """
+        Prints per-field coverage and the number of LLM queries saved.
+        """
+        if not self.documents:
+            return
+        with self._lock:
+            for field in ("site_id", "title", "receiver", "sender", "address"):
+                count = self.filled[field]
+                print(f"[Rules] {field}: filled for {count} / {self.documents} documents ({count / self.documents:.1%})")
+            print(f"[Rules] {self.llm_skipped} metadata LLM queries skipped (every field filled by rules); "
+                  f"site ID from rules for {self.site_id_reprompts_avoided} documents without one in the filename")
+
+
+# Coverage of the current run (see report_rule_coverage).
+_coverage = RuleCoverage()
+
+
+def record_rule_coverage(filled, llm_skipped, site_id_from_rules):
+    """
+    Counts one document in the run's rule coverage; see `RuleCoverage.record`.
+    """
+    _coverage.record(filled, llm_skipped, site_id_from_rules)
+
+
+def report_rule_coverage():
+    """
+    Prints the run's rule coverage and starts counting afresh.
+
+    Returns:
+        None
+    """
+    global _coverage
+    _coverage.report()
+    _coverage = RuleCoverage()
@@ -0,0 +1,136 @@
+import queue
+import threading
+
+# Marks the end of the input stream on a stage's inbox.
+_DONE = object()
+
+
+class Stage:
+    """
+    A named step of a streaming pipeline, run by its own pool of worker threads.
+
+    Parameters:
+    ----------
+    name : str
+        Human-readable stage name, used to name its worker threads.
+    func : callable
+        Called as `func(item)` for every item; mutates the item in place.
+    workers : int
+        Number of threads running this stage (default is 1).
+    ordered : bool
+        If True the stage sees items strictly in input order. Ordered stages must have a single worker.
+    """
+
+    def __init__(self, name, func, workers=1, ordered=False):
+        if workers < 1:
+            raise ValueError(f"Stage '{name}' needs at least one worker, got {workers}")
+        if ordered and workers != 1:
+            raise ValueError(f"Ordered stage '{name}' must have exactly one worker, got {workers}")
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.ordered = ordered
+
+
+def run_pipeline(items, stages, queue_size=8, max_in_flight=None, on_complete=None):
+    """
+    Streams items through a chain of stages connected by bounded queues.
+
+    Every stage runs concurrently with the others, so slow stages (e.g. LLM calls) overlap with
+    CPU-bound ones (e.g. PDF extraction) for neighbouring items. Queues are bounded and the number
+    of items inside the pipeline is capped, so memory stays flat however many items are fed in.
+
+    If a stage raises, the exception is recorded and the item skips all remaining stages, but it
+    still reaches `on_complete` in its usual position.
+
+    Parameters:
+    ----------
+    items : iterable
+        Items to process, in input order.
+    stages : list of Stage
+        Stages to apply, in order.
+    queue_size : int
+        Capacity of each inter-stage queue (default is 8).
+    max_in_flight : int, optional
+        Maximum number of items inside the pipeline at once. Defaults to enough to keep every
+        queue and worker busy.
+    on_complete : callable, optional
+        Called as `on_complete(item, error)` when an item leaves the last stage, where `error` is
+        the exception raised by a stage or None. Called in input order if the last stage is ordered.
+
+    Returns:
+    -------
+    None
+    """
+    if max_in_flight is None:
+        max_in_flight = queue_size * len(stages) + sum(stage.workers for stage in stages)
+
+    inboxes = [queue.Queue(maxsize=queue_size) for _ in stages]
+    in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    def emit(position, envelope):
+        if position + 1 < len(stages):
+            inboxes[position + 1].put(envelope)
+            return
+        _, item, error = envelope
+        try:
+            if on_complete is not None:
+                on_complete(item, error)
+        except Exception as ex:
+            print(f"[Pipeline] on_complete failed: {ex}")
+        finally:
+            in_flight.release()
+
+    def apply(stage, envelope):
+        _, item, error = envelope
+        if error is None:
+            try:
+                stage.func(item)
+            except Exception as ex:
+                envelope[2] = ex
+        return envelope
+
+    def unordered_worker(position, stage):
+        inbox = inboxes[position]
+        while True:
+            envelope = inbox.get()
+            if envelope is _DONE:
+                # Hand the marker back so sibling workers also stop.
+                inbox.put(_DONE)
+                return
+            emit(position, apply(stage, envelope))
+
+    def ordered_worker(position, stage):
+        inbox = inboxes[position]
+        pending = {}
+        next_index = 0
+        while True:
+            envelope = inbox.get()
+            if envelope is _DONE:
+                return
+            pending[envelope[0]] = envelope
+            while next_index in pending:
+                emit(position, apply(stage, pending.pop(next_index)))
+                next_index += 1
+
+    threads = []
+    for position, stage in enumerate(stages):
+        target = ordered_worker if stage.ordered else unordered_worker
+        stage_threads = [
+            threading.Thread(target=target, args=(position, stage),
+                             name=f"{stage.name}-{n}", daemon=True)
+            for n in range(stage.workers)
+        ]
+        for thread in stage_threads:
+            thread.start()
+        threads.append(stage_threads)
+
+    for index, item in enumerate(items):
+        in_flight.acquire()
+        inboxes[0].put([index, item, None])
+
+    # Drain stage by stage: a stage can only finish once everything upstream has finished.
+    for position, stage_threads in enumerate(threads):
+        inboxes[position].put(_DONE)
+        for thread in stage_threads:
+            thread.join()
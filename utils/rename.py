@@ -1,7 +1,23 @@
 import re
 from pathlib import Path
 
-def generate_new_filename(file_path: Path, site_id: str = "UNKNOWN", doc_type: str = "REPORT", duplicate: bool = False, output_dir: Path = None) -> tuple[str, str]:
+def parse_filename_date(filename: str) -> tuple[str, str]:
+    """
+    Finds the document date in a filename (YYYYMMDD, YYYY-MM-DD or YYYY_MM_DD).
+
+    Parameters:
+        filename (str): Name of the original file.
+
+    Returns:
+        tuple[str, str]: (Date as "YYYY-MM-DD", year), or ("0000-00-00", "0000") if no date is found.
+    """
+    date_match = re.search(r"(\d{4})[-_]?(\d{2})[-_]?(\d{2})", filename)
+    if date_match:
+        return f"{date_match.group(1)}-{date_match.group(2)}-{date_match.group(3)}", date_match.group(1)
+    return "0000-00-00", "0000"
+
+
+def generate_new_filename(file_path: Path, site_id: str = "UNKNOWN", doc_type: str = "REPORT", duplicate: bool = False, output_dir: Path = None, date: tuple[str, str] = None) -> tuple[str, str]:
     """
     Generates a standardized filename in the format:
     'YYYY-MM-DD – SITE_ID – DOC_TYPE[-DUP][_n].pdf'
@@ -15,19 +31,13 @@ def generate_new_filename(file_path: Path, site_id: str = "UNKNOWN", doc_type: s
         doc_type (str): Classified document type.
         duplicate (bool): Whether the file is a confirmed duplicate.
         output_dir (Path, optional): If provided, checks for filename collisions in this directory.
+        date (tuple[str, str], optional): (Date, year) already parsed from the filename with
+            `parse_filename_date`; parsed from `file_path` if omitted.
 
     Returns:
         tuple[str, str]: (Unique filename, year string for subfolder construction)
     """
-    filename = file_path.name
-
-    date_match = re.search(r"(\d{4})[-_]?(\d{2})[-_]?(\d{2})", filename)
-    if date_match:
-        date_str = f"{date_match.group(1)}-{date_match.group(2)}-{date_match.group(3)}"
-        year_str = date_match.group(1)
-    else:
-        date_str = "0000-00-00"
-        year_str = "0000"
+    date_str, year_str = date if date is not None else parse_filename_date(file_path.name)
 
     suffix = "-DUP" if duplicate else ""
     base_name = f"{date_str} - {site_id} - {doc_type.upper()}{suffix}"
@@ -0,0 +1,177 @@
+import threading
+import time
+
+
+class RetryPolicy:
+    """
+    Run-wide limits on LLM calls, shared by every document of a run.
+
+    Each document gets a `DocumentBudget` from `start_document()`. A call is only made if the
+    document is under its own call limit and its wall-clock deadline, and the run is under its
+    total call limit. Retries are not identical re-sends: each attempt gets its own sampling
+    temperature and seed.
+
+    Parameters:
+    ----------
+    max_retries : int
+        Maximum attempts of any single retry loop (default is 5).
+    max_calls_per_document : int or None
+        Maximum LLM calls for one document, first query included (default is 12; None for no limit).
+    max_calls_per_run : int or None
+        Maximum LLM calls for the whole run (default is None, no limit).
+    document_deadline : float or None
+        Seconds after a document enters the LLM stage past which no new call is started (default is 300).
+    retry_temperature : float
+        Sampling temperature of the first retry (default is 0.4).
+    temperature_step : float
+        Temperature increase for each further retry, capped at 1.0 (default is 0.2).
+    seed : int
+        Seed of the first retry; attempt n uses `seed + n` (default is 0).
+    """
+
+    def __init__(self, max_retries=5, max_calls_per_document=12, max_calls_per_run=None, document_deadline=300,
+                 retry_temperature=0.4, temperature_step=0.2, seed=0):
+        self.max_retries = max_retries
+        self.max_calls_per_document = max_calls_per_document
+        self.max_calls_per_run = max_calls_per_run
+        self.document_deadline = document_deadline
+        self.retry_temperature = retry_temperature
+        self.temperature_step = temperature_step
+        self.seed = seed
+        self.calls = 0
+        self.exhausted = []
+        self._lock = threading.Lock()
+
+    def start_document(self, filename):
+        """
+        Returns the call budget of one document; its deadline starts now.
+        """
+        return DocumentBudget(self, filename)
+
+    def _acquire_run_call(self):
+        with self._lock:
+            if self.max_calls_per_run is not None and self.calls >= self.max_calls_per_run:
+                return False
+            self.calls += 1
+            return True
+
+    def _record_exhausted(self, filename, reason):
+        with self._lock:
+            self.exhausted.append((filename, reason))
+
+    def report(self):
+        """
+        Prints the number of LLM calls made and the documents that ran out of budget.
+        """
+        print(f"[LLM budget] {self.calls} LLM calls, {len(self.exhausted)} documents exhausted their budget")
+        for filename, reason in self.exhausted:
+            print(f"    {filename}: {reason}")
+
+
+class DocumentBudget:
+    """
+    LLM call budget of a single document under a `RetryPolicy`.
+
+    Parameters:
+    ----------
+    policy : RetryPolicy
+        Run-wide policy the budget draws from.
+    filename : str
+        Name of the document, used when reporting exhaustion.
+    """
+
+    def __init__(self, policy, filename):
+        self.policy = policy
+        self.filename = filename
+        self.calls = 0
+        self.started = time.monotonic()
+        self.exhausted_reason = None
+
+    def acquire(self):
+        """
+        Reserves one LLM call.
+
+        Returns:
+        -------
+        bool
+            True if the call may be made; False once the document or run budget is used up or the
+            deadline has passed, after which `exhausted_reason` says why.
+        """
+        if self.exhausted_reason is not None:
+            return False
+        policy = self.policy
+        if policy.max_calls_per_document is not None and self.calls >= policy.max_calls_per_document:
+            return self._exhaust(f"per-document limit of {policy.max_calls_per_document} LLM calls reached")
+        if policy.document_deadline is not None and time.monotonic() - self.started >= policy.document_deadline:
+            return self._exhaust(f"deadline of {policy.document_deadline}s reached after {self.calls} LLM calls")
+        if not policy._acquire_run_call():
+            return self._exhaust(f"per-run limit of {policy.max_calls_per_run} LLM calls reached")
+        self.calls += 1
+        return True
+
+    def _exhaust(self, reason):
+        self.exhausted_reason = reason
+        self.policy._record_exhausted(self.filename, reason)
+        print(f"[LLM budget] {self.filename}: {reason}")
+        return False
+
+    def retry_options(self, attempt):
+        """
+        Returns the Ollama generation options for attempt `attempt` (0 for the first query) of a request.
+
+        The first attempt uses the model defaults. Retries get their own temperature and seed, so they
+        sample a different answer instead of resending the identical request; since the options are
+        part of the response cache key, each retry is still reproducible (and cached) on a rerun.
+
+        Returns:
+        -------
+        dict or None
+            `temperature` and `seed` options, or None for the first attempt.
+        """
+        if attempt == 0:
+            return None
+        policy = self.policy
+        temperature = min(1.0, policy.retry_temperature + policy.temperature_step * (attempt - 1))
+        return {"temperature": round(temperature, 3), "seed": policy.seed + attempt}
+
+
+# Policy of the current run; None until start_retry_policy is called.
+_retry_policy = None
+
+
+def start_retry_policy(**limits):
+    """
+    Starts a new run-wide retry policy; keyword arguments are passed to `RetryPolicy`.
+
+    Returns:
+    -------
+    RetryPolicy
+        The new policy.
+    """
+    global _retry_policy
+    _retry_policy = RetryPolicy(**limits)
+    return _retry_policy
+
+
+def document_budget(filename):
+    """
+    Returns a call budget for `filename` under the current run's policy (default limits if none was started).
+    """
+    global _retry_policy
+    if _retry_policy is None:
+        _retry_policy = RetryPolicy()
+    return _retry_policy.start_document(filename)
+
+
+def close_retry_policy():
+    """
+    Prints the run's LLM call summary and clears the policy, if one was started.
+
+    Returns:
+    -------
+    None
+    """
+    global _retry_policy
+    if _retry_policy is not None:
+        _retry_policy.report()
+        _retry_policy = None
@@ -0,0 +1,113 @@
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from functools import lru_cache
+
+from nltk.stem import porter
+from rouge_score import tokenize
+
+# Tokenization and stemming are exactly those of rouge_score's RougeScorer(use_stemmer=True), so
+# recall values are identical to `RougeScorer(['rouge1'], use_stemmer=True).score(...).recall`
+# (both divide the same integer counts; any difference is below 1e-12).
+ROUGE1_TOLERANCE = 1e-12
+
+
+class _CachingStemmer:
+    """
+    The Porter stemmer used by rouge_score, memoised per distinct word.
+
+    Stemming dominates ROUGE time, and documents of a site share most of their vocabulary.
+    """
+
+    def __init__(self, maxsize=200_000):
+        self.stem = lru_cache(maxsize=maxsize)(porter.PorterStemmer().stem)
+
+
+_stemmer = _CachingStemmer()
+
+# Recently used documents' token counts, keyed by a hash of their text.
+_counts_cache = OrderedDict()
+_counts_cache_size = 256
+_counts_lock = threading.Lock()
+
+
+def rouge1_counts(text):
+    """
+    Returns the stemmed unigram counts of `text`, as used by ROUGE-1.
+
+    Results are cached per distinct text, so a document compared against several others is
+    tokenized and stemmed once.
+
+    Parameters:
+        text (str): Text to tokenize.
+
+    Returns:
+        collections.Counter: Stemmed token -> number of occurrences.
+    """
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    with _counts_lock:
+        counts = _counts_cache.get(key)
+        if counts is not None:
+            _counts_cache.move_to_end(key)
+            return counts
+
+    counts = Counter(tokenize.tokenize(text, _stemmer))
+
+    with _counts_lock:
+        _counts_cache[key] = counts
+        if len(_counts_cache) > _counts_cache_size:
+            _counts_cache.popitem(last=False)
+    return counts
+
+
+def rouge1_recall_upper_bound(target_counts, prediction_counts):
+    """
+    Returns an upper bound on ROUGE-1 recall computed from token totals alone.
+
+    The overlap can never exceed the smaller of the two totals, so recall is at most
+    min(target, prediction) / target. A pair whose bound is below the threshold can be
+    rejected without scoring.
+
+    Parameters:
+        target_counts (Counter): Token counts of the reference text.
+        prediction_counts (Counter): Token counts of the predicted text.
+
+    Returns:
+        float: Upper bound on `rouge1_recall(target_counts, prediction_counts)`.
+    """
+    target_total = target_counts.total()
+    return min(target_total, prediction_counts.total()) / max(target_total, 1)
+
+
+def rouge1_recall(target_counts, prediction_counts):
+    """
+    Computes ROUGE-1 recall from precomputed token counts.
+
+    Parameters:
+        target_counts (Counter): Token counts of the reference text (from `rouge1_counts`).
+        prediction_counts (Counter): Token counts of the predicted text (from `rouge1_counts`).
+
+    Returns:
+        float: Clipped unigram overlap divided by the number of reference tokens.
+    """
+    if len(prediction_counts) < len(target_counts):
+        overlap = sum(min(count, target_counts[token]) for token, count in prediction_counts.items()
+                      if token in target_counts)
+    else:
+        overlap = sum(min(count, prediction_counts[token]) for token, count in target_counts.items()
+                      if token in prediction_counts)
+    return overlap / max(target_counts.total(), 1)
+
+
+def rouge1_recall_text(target, prediction):
+    """
+    Computes ROUGE-1 recall between two strings, matching `RougeScorer(['rouge1'], use_stemmer=True)`.
+
+    Parameters:
+        target (str): Reference text.
+        prediction (str): Predicted text.
+
+    Returns:
+        float: ROUGE-1 recall of `prediction` against `target`.
+    """
+    return rouge1_recall(rouge1_counts(target), rouge1_counts(prediction))
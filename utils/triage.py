@@ -0,0 +1,195 @@
+import math
+import re
+import threading
+from collections import Counter
+import fitz  # PyMuPDF
+from .loader import page_layout
+
+# Triage classes: only text-layer documents are sent to the LLM.
+TEXT_LAYER = "text-layer"
+IMAGE_ONLY = "image-only"
+GARBLED = "garbled"
+
+# Fewer words than this in the extracted pages cannot be read for metadata (same limit as before triage).
+MIN_WORDS = 50
+
+# Pages whose images cover at least this share of the page area are treated as scans.
+SCAN_COVERAGE = 0.5
+
+# Cleaned English prose has a character entropy of about 4 to 4.5 bits; OCR garbage falls outside these bounds.
+MIN_ENTROPY = 3.0
+MAX_ENTROPY = 5.0
+
+# Share of tokens that must be words, numbers, units or sample codes (see `_is_valid_token`).
+# This stands in for a dictionary-word ratio: no wordlist is shipped, so a "word" is any token of
+# a plausible word shape, plus the frequent words below.
+MIN_WORD_RATIO = 0.6
+
+# Frequent words of the corpus (letters, memos, reports); any of these counts as a word whatever its shape.
+COMMON_WORDS = frozenset("""
+a an and are as at be been by for from has have in is it its of on or that the this to was were which will with
+not no all any may shall should would can site report letter memo memorandum ministry environment contaminated
+investigation assessment remediation soil groundwater sample samples property land owner road street avenue
+""".split())
+
+# Measurement units of lab tables, as left by OCR cleaning (which drops "µ" and "%": "µg/L" becomes "g/L").
+UNITS = frozenset("""
+g mg ug ng kg l ml ul m m2 m3 cm mm km ha ppm ppb ppt bgs mbgs mbtoc
+""".split())
+
+_SEPARATOR = re.compile(r"[-/]")
+# Numbers, decimals, dates and times ("12", "0.05", "2019-03-12", "12/03/2019", "10:30").
+_NUMBER = re.compile(r"\d+(?:[.,:/-]\d+)*")
+# Acronyms and sample or well codes ("TPH", "BTEX", "BH1", "MW03", "TP5A").
+_CODE = re.compile(r"[A-Z]{2,6}|[A-Z]{1,4}\d{1,4}[A-Z]?")
+_VOWEL = re.compile(r"[aeiouy]", re.IGNORECASE)
+_REPEAT = re.compile(r"(.)\1\1", re.IGNORECASE)
+
+
+def _is_word(token):
+    # Shape heuristic, not a dictionary lookup: letters only, a plausible length, a vowel, no triple
+    # letters and no case changes inside the word. OCR garbage like "Tbe" or "rnent" passes it.
+    lower = token.lower()
+    if lower in COMMON_WORDS:
+        return True
+    return (token.isalpha() and 2 <= len(token) <= 20 and _VOWEL.search(token) is not None
+            and _REPEAT.search(token) is None and (token[1:].islower() or token.isupper()))
+
+
+def _is_valid_token(token):
+    # A word, number, unit or code; hyphen/slash compounds ("gas-impacted", "mg/kg", "MW-3") if every part is.
+    if _is_word(token) or token.lower() in UNITS or _NUMBER.fullmatch(token) or _CODE.fullmatch(token):
+        return True
+    parts = _SEPARATOR.split(token)
+    return len(parts) > 1 and all(part and _is_valid_token(part) for part in parts)
+
+
+def text_signals(text):
+    """
+    Measures how much a document's cleaned text looks like readable prose.
+
+    Parameters:
+        text (str): OCR-cleaned document text.
+
+    Returns:
+        dict: "words" (number of whitespace-separated words), "entropy" (bits per non-space
+            character) and "word_ratio" (share of tokens that are words, numbers, units or sample
+            codes, see `_is_valid_token`, so lab tables count as readable).
+
+    "word_ratio" is a heuristic substitute for a dictionary-word ratio: words are recognised by
+    their shape and a short list of frequent words (`COMMON_WORDS`), not looked up in a wordlist,
+    so it catches symbol soup and broken character runs but not well-formed OCR misreadings.
+    """
+    characters = Counter(char for char in text.lower() if not char.isspace())
+    total = sum(characters.values())
+    entropy = -sum(count / total * math.log2(count / total) for count in characters.values()) if total else 0.0
+    tokens = [token for token in (word.strip(":,.-/") for word in text.split()) if token]
+    word_ratio = sum(_is_valid_token(token) for token in tokens) / len(tokens) if tokens else 0.0
+    return {"words": len(text.split()), "entropy": entropy, "word_ratio": word_ratio}
+
+
+def page_layout_signals(layout):
+    """
+    Counts text-layer and scanned pages from per-page layout.
+
+    Parameters:
+        layout (list): [uses fonts, share of the page area covered by images] per page, as recorded
+            by the loader during extraction (see `DocumentContext.layout`).
+
+    Returns:
+        dict: "pages" (pages inspected), "pages_with_fonts" (pages that use at least one font,
+            i.e. have a text layer) and "scanned_pages" (pages mostly covered by images).
+    """
+    return {"pages": len(layout), "pages_with_fonts": sum(bool(fonts) for fonts, _ in layout),
+            "scanned_pages": sum(coverage >= SCAN_COVERAGE for _, coverage in layout)}
+
+
+def layout_signals(pdf_path, max_pages=8):
+    """
+    Reads the font and image placement of the first pages of a PDF from PyMuPDF page metadata.
+
+    Opens the PDF again and reads each page with the loader's `page_layout`; only needed when the
+    layout was not recorded during extraction (page cache entries written before it was). No text
+    is extracted or rendered.
+
+    Parameters:
+        pdf_path (Path): Path to the PDF file.
+        max_pages (int): Number of pages to inspect (default: 8).
+
+    Returns:
+        dict: See `page_layout_signals`.
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        pages = doc.page_count if max_pages is None else min(doc.page_count, max_pages)
+        layout = [page_layout(doc[number]) for number in range(pages)]
+    finally:
+        doc.close()
+    return page_layout_signals(layout)
+
+
+def triage_document(pdf_path, text, max_pages=8, layout=None):
+    """
+    Classifies a document as text-layer, image-only or garbled before any LLM call.
+
+    A document with too few words is image-only if its pages are scans or have no fonts, and
+    garbled otherwise. A document with enough words is garbled if its character entropy is out of
+    the range of prose or too few of its tokens look like words (poor OCR layer), and text-layer
+    otherwise. Only text-layer documents are worth sending to the LLM.
+
+    Parameters:
+        pdf_path (Path): Path to the PDF file.
+        text (str): OCR-cleaned text of the pages extracted for the LLM.
+        max_pages (int): Number of pages whose layout is inspected (default: 8).
+        layout (list, optional): Page layout recorded during extraction (see `DocumentContext.layout`);
+            the PDF is only opened again to read it if omitted.
+
+    Returns:
+        dict: "class" (TEXT_LAYER, IMAGE_ONLY or GARBLED), "reason" (short explanation) and the
+            signals from `text_signals` and `layout_signals`.
+    """
+    signals = text_signals(text)
+    if layout is None:
+        signals.update(layout_signals(pdf_path, max_pages))
+    else:
+        signals.update(page_layout_signals(layout[:max_pages]))
+
+    if signals["words"] < MIN_WORDS:
+        if signals["pages"] and (signals["scanned_pages"] or not signals["pages_with_fonts"]):
+            category, reason = IMAGE_ONLY, f"{signals['words']} words, scanned pages without a usable text layer"
+        else:
+            category, reason = GARBLED, f"only {signals['words']} words of text"
+    elif not MIN_ENTROPY <= signals["entropy"] <= MAX_ENTROPY:
+        category, reason = GARBLED, f"character entropy {signals['entropy']:.2f} bits"
+    elif signals["word_ratio"] < MIN_WORD_RATIO:
+        category, reason = GARBLED, f"only {signals['word_ratio']:.0%} of tokens are words, numbers or codes"
+    else:
+        category, reason = TEXT_LAYER, "readable text layer"
+
+    with _lock:
+        _counts[category] += 1
+    return dict(signals, **{"class": category, "reason": reason})
+
+
+# Documents per triage class in the current run (see report_triage).
+_counts = Counter()
+_lock = threading.Lock()
+
+
+def report_triage():
+    """
+    Prints the number of documents in each triage class and starts counting afresh.
+
+    Returns:
+        None
+    """
+    global _counts
+    with _lock:
+        counts, _counts = _counts, Counter()
+    total = sum(counts.values())
+    if not total:
+        return
+    for category in (TEXT_LAYER, IMAGE_ONLY, GARBLED):
+        print(f"[Triage] {category}: {counts[category]} / {total} documents ({counts[category] / total:.1%})")
+    skipped = counts[IMAGE_ONLY] + counts[GARBLED]
+    print(f"[Triage] {skipped} documents sent to review without an LLM call")